@@ -0,0 +1,78 @@
+"""
+Measures the cost of importing `khan_helpers` the way batch worker
+processes do, and checks that heavy plotting, notebook, text-processing
+and compiled-kernel dependencies aren't loaded along with it.
+
+Each measurement runs in a fresh interpreter so module caches don't
+carry over between runs. Exits with a non-zero status if the median
+import time exceeds `--max-seconds` or any heavy module is imported.
+
+Usage:
+    python benchmarks/import_time.py [--repeats N] [--max-seconds S]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+
+PKG_ROOT = Path(__file__).resolve().parents[1]
+
+# dependencies that should only be imported by the functions that use them
+HEAVY_MODULES = ('IPython', 'PIL', 'matplotlib', 'nltk', 'numba', 'scipy',
+                 'sklearn', 'umap')
+
+# what a batch worker imports & uses
+WORKER_CODE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import khan_helpers
+from khan_helpers import Experiment
+from khan_helpers.functions import corr_mean, reconstruct_trace
+Experiment()
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    'seconds': elapsed,
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'heavy': sorted(m for m in %r if m in sys.modules)
+}))
+""" % (HEAVY_MODULES,)
+
+
+def run_once():
+    out = subprocess.run([sys.executable, '-c', WORKER_CODE],
+                         cwd=PKG_ROOT,
+                         capture_output=True,
+                         text=True,
+                         check=True).stdout
+    return json.loads(out.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--max-seconds', type=float, default=1.0)
+    args = parser.parse_args()
+
+    results = [run_once() for _ in range(args.repeats)]
+    seconds = statistics.median(r['seconds'] for r in results)
+    rss = statistics.median(r['max_rss_mb'] for r in results)
+    heavy = sorted(set().union(*(r['heavy'] for r in results)))
+    print(f"import + Experiment(): {seconds:.3f} s (median of {args.repeats}), "
+          f"max RSS {rss:.1f} MB")
+    print(f"heavy modules loaded: {', '.join(heavy) or 'none'}")
+
+    failed = False
+    if seconds > args.max_seconds:
+        print(f"FAIL: import time exceeds {args.max_seconds} s")
+        failed = True
+    if heavy:
+        print("FAIL: heavy modules should be imported lazily")
+        failed = True
+    return int(failed)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,18 +1,12 @@
 from pathlib import Path
 
-from IPython.display import display, Markdown
-
-from .experiment import Experiment
-from .participant import Participant
-from .functions import set_figure_style
-
 
 version_info = (0, 0, 1)
 __version__ = '.'.join(map(str, version_info))
 
 github_link = "https://github.com/contextlab/efficient-learning-khan/tree/master/code/khan_helpers"
 pkg_dir = Path(__file__).resolve().parent
-message = Markdown(
+_message = (
     "Experiment & Participant classes, helper functions, and variables used "
     f"across multiple notebooks can be found in `{pkg_dir}`, or on GitHub, "
     f"[here]({github_link}).<br />You can also view source code directly from "
@@ -20,13 +14,45 @@ message = Markdown(
     "show_source<br />    show_source(foo)</pre>"
 )
 
+# top-level names are imported from their submodules on first access so
+# that `import khan_helpers` (e.g., in worker processes) doesn't load
+# plotting & notebook dependencies
+_lazy_attrs = {
+    'Experiment': 'experiment',
+    'Participant': 'participant',
+    'set_figure_style': 'functions'
+}
+
+
+def __getattr__(name):
+    if name == 'message':
+        from IPython.display import Markdown
+
+        return Markdown(_message)
+    if name in _lazy_attrs:
+        from importlib import import_module
+
+        attr = getattr(import_module(f'.{_lazy_attrs[name]}', __name__), name)
+        globals()[name] = attr
+        return attr
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted({*globals(), *_lazy_attrs, 'message'})
+
+
 try:
     # check whether imported from notebook
     # noinspection PyUnresolvedReferences
     #   function is defined globally by IPython
     get_ipython()
-    display(message)
 except NameError:
     pass
+else:
+    from IPython.display import display
+
+    from .functions import set_figure_style
 
-set_figure_style()
+    display(__getattr__('message'))
+    set_figure_style()
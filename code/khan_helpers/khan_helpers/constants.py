@@ -1,7 +1,5 @@
 from pathlib import Path
 
-from nltk.corpus import stopwords
-
 
 DATA_DIR = Path('/mnt/data')
 EMBS_DIR = DATA_DIR.joinpath('embeddings')
@@ -9,6 +7,7 @@ FONTS_DIR = DATA_DIR.joinpath('fonts')
 MODELS_DIR = DATA_DIR.joinpath('models')
 PARTICIPANTS_DIR = DATA_DIR.joinpath('participants')
 RAW_DIR = DATA_DIR.joinpath('raw')
+STORE_DIR = DATA_DIR.joinpath('participant-store')
 TRAJS_DIR = DATA_DIR.joinpath('trajectories')
 
 FIG_DIR = Path('/mnt/paper/figs/source/')
@@ -17,13 +16,12 @@ FIG_DIR = Path('/mnt/paper/figs/source/')
 # windows
 LECTURE_WSIZE = 30
 
-# standard English stop words + some corpus-specific words
-STOP_WORDS = stopwords.words('english') + ['actual', 'actually', 'also', 'bit',
-                                           'could', 'e', 'even', 'first',
-                                           'four', 'let', 'like', 'mc',
-                                           'really', 'saw', 'see', 'seen',
-                                           'thing', 'things', 'two', 'follow',
-                                           'following']
+# corpus-specific words excluded from text along with standard English
+# stop words (see STOP_WORDS, below)
+_EXTRA_STOP_WORDS = ['actual', 'actually', 'also', 'bit', 'could', 'e', 'even',
+                     'first', 'four', 'let', 'like', 'mc', 'really', 'saw',
+                     'see', 'seen', 'thing', 'things', 'two', 'follow',
+                     'following']
 
 FORCES_LECTURE_COLOR = '#3f54a5'
 BOS_LECTURE_COLOR = '#0f8140'
@@ -35,3 +33,15 @@ WORDLE_COLORS = ('#ffde17', '#ec008c', '#f26522')
 
 CORRECT_ANSWER_COLOR = '#67c4ca'
 INCORRECT_ANSWER_COLOR = '#cb6d67'
+
+
+def __getattr__(name):
+    # STOP_WORDS requires (slow-to-import) nltk, so it's built on first
+    # access (standard English stop words + corpus-specific words)
+    if name == 'STOP_WORDS':
+        from nltk.corpus import stopwords
+
+        stop_words = stopwords.words('english') + _EXTRA_STOP_WORDS
+        globals()['STOP_WORDS'] = stop_words
+        return stop_words
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,18 +1,90 @@
+import os
 import pickle
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import sha1
+from pathlib import Path
 
 import numpy as np
 import pandas as pd
-from PIL.Image import open as open_image
 
 from .constants import (
     DATA_DIR,
     EMBS_DIR,
+    LECTURE_WSIZE,
     MODELS_DIR,
     PARTICIPANTS_DIR,
     RAW_DIR,
+    STORE_DIR,
     TRAJS_DIR
 )
-from .functions import _ts_to_sec
+from .functions import (
+    _stack_responses,
+    _ts_to_sec_array,
+    interp_lecture,
+    preprocess_text,
+    window_term_matrix
+)
+from .participant import (
+    build_question_index,
+    load_question_bank,
+    Participant
+)
+from .store import ParticipantStore
+
+
+# topic vector files in the trajectories data directory, by key
+_TOPIC_VECTOR_FILES = {
+    'forces': 'forces_lecture',
+    'bos': 'bos_lecture',
+    'questions': 'all_questions',
+    'answers': 'all_answers'
+}
+
+# question bank index shared by PsiTurk ingestion worker processes
+_worker_question_index = None
+
+
+def _init_ingest_worker(question_index):
+    global _worker_question_index
+    _worker_question_index = question_index
+
+
+def _ingest_psiturk_row(psiturk_data, subid):
+    return Participant.from_psiturk(psiturk_data,
+                                    subid=subid,
+                                    question_index=_worker_question_index)
+
+
+# fit UMAP model shared by inverse-transform worker processes
+_worker_umap = None
+
+
+def _init_inverse_worker(reducer):
+    global _worker_umap
+    _worker_umap = reducer
+
+
+def _inverse_transform_coord(coord, seed):
+    # reseed for each coordinate so results don't depend on which other
+    # coordinates are transformed alongside it
+    np.random.seed(seed)
+    return np.asarray(_worker_umap.inverse_transform(coord[None, :])[0],
+                      dtype=np.float64)
+
+
+def _word_perplexity(lda, dtm):
+    # perplexity of the words in a document-term matrix under a fit
+    # LDA model, given each document's inferred topic proportions.
+    # Unlike `LatentDirichletAllocation.perplexity`, comparable across
+    # corpora of different sizes
+    doc_topics = lda.transform(dtm)
+    topic_words = lda.components_ / lda.components_.sum(axis=1, keepdims=True)
+    docs, words = dtm.nonzero()
+    word_probs = np.einsum('ij,ji->i', doc_topics[docs], topic_words[:, words])
+    counts = np.asarray(dtm[docs, words]).ravel()
+    return np.exp(-(counts * np.log(word_probs)).sum() / counts.sum())
 
 
 class LazyLoader:
@@ -42,16 +114,110 @@ class LazyLoader:
         return obj.__dict__[self.name]
 
 
+class ParticipantCollection:
+    """
+    Indexable, iterable collection of `Participant` objects that loads
+    each participant on first access and keeps recently accessed ones
+    in a (optionally bounded) least-recently-used cache.
+    """
+    def __init__(self, subids, loader, maxsize=None, _cache=None):
+        """
+        Parameters
+        ----------
+        subids : sequence of str
+            Subject IDs of the participants in the collection, in order.
+        loader : callable
+            Function that takes a subject ID and returns the
+            corresponding `Participant`.
+        maxsize : int, optional
+            The maximum number of participants to keep in memory. If
+            None (default), participants are never evicted once loaded.
+        """
+        self.subids = list(subids)
+        self.maxsize = maxsize
+        self._loader = loader
+        self._cache = OrderedDict() if _cache is None else _cache
+
+    def __contains__(self, subid):
+        return str(subid) in self.subids
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            if key not in self.subids:
+                raise KeyError(f"No participant with subject ID {key}")
+            return self._get(key)
+        elif isinstance(key, (int, np.integer)):
+            return self._get(self.subids[key])
+        elif isinstance(key, slice):
+            subids = self.subids[key]
+        else:
+            key = np.asarray(key)
+            if key.dtype == bool:
+                key = np.flatnonzero(key)
+            if key.dtype.kind in 'iu':
+                subids = [self.subids[ix] for ix in key]
+            else:
+                subids = [str(subid) for subid in key]
+                missing = set(subids).difference(self.subids)
+                if missing:
+                    raise KeyError(
+                        f"No participants with subject IDs {', '.join(missing)}"
+                    )
+        # sub-collections share the parent's cache
+        return ParticipantCollection(subids,
+                                     self._loader,
+                                     maxsize=self.maxsize,
+                                     _cache=self._cache)
+
+    def __iter__(self):
+        for subid in self.subids:
+            yield self._get(subid)
+
+    def __len__(self):
+        return len(self.subids)
+
+    def __repr__(self):
+        return (f'ParticipantCollection(n_participants={len(self)}, '
+                f'n_loaded={self.n_loaded})')
+
+    @property
+    def n_loaded(self):
+        return sum(subid in self._cache for subid in self.subids)
+
+    def iter_data(self):
+        """
+        Yields each participant's graded responses without adding
+        participants that aren't already loaded to the cache.
+        """
+        for subid in self.subids:
+            if subid in self._cache:
+                yield self._cache[subid].data
+            else:
+                yield self._loader(subid).data
+
+    def _get(self, subid):
+        try:
+            self._cache.move_to_end(subid)
+        except KeyError:
+            self._cache[subid] = self._loader(subid)
+            if self.maxsize is not None and len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return self._cache[subid]
+
+
 class Experiment:
     """
     Class used to simplify accessing and managing data from the
     experiment and analyses.
     """
+    participant_store = LazyLoader('_load_participant_store')
     participants = LazyLoader('_load_participants')
     avg_participant = LazyLoader('_load_avg_participant')
 
     forces_transcript = LazyLoader('_load_transcript', 'forces')
     bos_transcript = LazyLoader('_load_transcript', 'bos')
+    forces_transcript_index = LazyLoader('_load_transcript_index', 'forces')
+    bos_transcript_index = LazyLoader('_load_transcript_index', 'bos')
     questions = LazyLoader('_load_questions')
 
     forces_windows = LazyLoader('_load_windows', 'forces')
@@ -69,16 +235,57 @@ class Experiment:
     bos_embedding = LazyLoader('_load_embedding', 'bos')
     question_embeddings = LazyLoader('_load_embedding', 'questions')
 
+    forces_qcorrs = LazyLoader('_load_qcorrs', 'forces')
+    bos_qcorrs = LazyLoader('_load_qcorrs', 'bos')
+    question_qcorrs = LazyLoader('_load_qcorrs', 'questions')
+
     fit_cv = LazyLoader('_load_fit_model', 'CV')
     fit_lda = LazyLoader('_load_fit_model', 'LDA')
-    fit_umap = LazyLoader('_load_fit_model', 'UMAP')
+    fit_umap = LazyLoader('_load_fit_umap')
 
     wordle_mask = LazyLoader('_load_wordle_mask')
 
+    def __init__(self, cache_dir=None, mmap=False, participant_cache_size=None):
+        """
+        Parameters
+        ----------
+        cache_dir : str or pathlib.Path, optional
+            Directory in which to persist derived data (e.g., lecture-
+            question similarity matrices) across sessions. Cached files
+            are keyed by a hash of the data files they were computed
+            from, so they are recomputed automatically when those files
+            change. If None (default), derived data is computed once
+            per `Experiment` instance and not saved.
+        mmap : bool, optional
+            If True (default: False), open lecture windows, timestamps,
+            topic vectors, embeddings, and cached derived data as
+            read-only memory-mapped arrays rather than reading them
+            into memory. This lets multiple processes on the same
+            machine share a single copy of each file through the OS
+            page cache.
+        participant_cache_size : int, optional
+            The maximum number of `Participant` objects to keep in
+            memory (see `ParticipantCollection`). If None (default),
+            participants stay in memory once loaded. Note that changes
+            to participants that are evicted from the cache before
+            being saved are lost.
+        """
+        self.cache_dir = None if cache_dir is None else Path(cache_dir)
+        self.mmap = mmap
+        self.participant_cache_size = participant_cache_size
+        # in-memory layer of the UMAP inverse-transform cache, the UMAP
+        # model it was computed with, and the model's cache key
+        self._inverse_cache = {}
+        self._inverse_reducer = None
+        self._inverse_model_key = None
+
     @property
     def all_data(self):
-        return pd.concat(map(lambda p: p.data, self.participants),
-                         keys=map(str, self.participants))
+        participants = self.participants
+        if self.participant_store.exists and not participants.n_loaded:
+            # read directly from store without building Participants
+            return self.participant_store.load_responses(participants.subids)
+        return pd.concat(participants.iter_data(), keys=participants.subids)
 
     def get_lecture_traj(self, lecture):
         if hasattr(lecture, '__iter__') and not isinstance(lecture, str):
@@ -114,18 +321,38 @@ class Experiment:
             qids = [qid - 1 for qid in qids]
         return self.question_vectors[qids]
 
-    def get_timepoint_text(self, lecture, timepoint, buffer=15):
-        if lecture == 'forces':
-            transcript = self.forces_transcript
-        elif lecture == 'bos':
-            transcript = self.bos_transcript
-        else:
-            raise ValueError("Lecture must be either 'forces' or 'bos'")
+    def get_response_arrays(self, lecture=None):
+        """
+        Arranges all participants' graded responses into arrays suitable
+        for `khan_helpers.functions.reconstruct_traces`.
 
-        # get timestamps and text from transcript
-        transcript = transcript.splitlines()
-        timestamps = np.fromiter(map(_ts_to_sec, transcript[::2]), dtype=float)
-        text = np.array(transcript[1::2])
+        Parameters
+        ----------
+        lecture : str or int, optional
+            If passed, include only responses to questions about the
+            given lecture ('general'/0, 'forces'/1, or 'bos'/2).
+
+        Returns
+        -------
+        qids, accuracy : numpy.ndarray
+            `(n_quizzes, n_participants, n_observations)` arrays of
+            question IDs and accuracy scores, respectively, with
+            participants in the same order as `self.participants`.
+            Participants who answered fewer than `n_observations`
+            questions are padded with `0`s.
+        """
+        lec_keys = {'general': 0, 'forces': 1, 'bos': 2}
+        data = self.all_data
+        if lecture is not None:
+            data = data.loc[data['lecture'] == lec_keys.get(lecture, lecture)]
+
+        (qids, accuracy), _ = _stack_responses(
+            data, ['qID', 'accuracy'], subids=self.participants.subids
+        )
+        return qids, accuracy
+
+    def get_timepoint_text(self, lecture, timepoint, buffer=15):
+        timestamps, text = self.get_transcript_index(lecture)
         # compute start and end time from timepoint and buffer
         onset, offset = timepoint - buffer, timepoint + buffer
         # make sure times are within bounds
@@ -133,16 +360,358 @@ class Experiment:
             onset = 0
         if offset > timestamps[-1]:
             offset = timestamps[-1]
-        # get timestamps of text between those times
-        text_ixs = np.where((timestamps >= onset) & (timestamps <= offset))[0]
-        return ' '.join(text[text_ixs])
+        # get text with timestamps between those times
+        start = np.searchsorted(timestamps, onset, side='left')
+        end = np.searchsorted(timestamps, offset, side='right')
+        return ' '.join(text[start:end])
+
+    def get_timepoints_text(self, lecture, timepoints, buffers=15):
+        """
+        Retrieves the transcript text spoken around each of many
+        timepoints in a lecture (a batched version of
+        `get_timepoint_text`).
+
+        Parameters
+        ----------
+        lecture : {'forces', 'bos'}
+            The lecture from which to retrieve text.
+        timepoints : array_like
+            The timepoints (in seconds) around which to retrieve text.
+        buffers : scalar or array_like, optional
+            The number of seconds before and after each timepoint from
+            which to include text (default: 15). May be a single value
+            or one value per timepoint. To retrieve text within an
+            interval `(onset, offset)`, pass `(onset + offset) / 2` as
+            the timepoint and `(offset - onset) / 2` as the buffer.
+
+        Returns
+        -------
+        list of str
+            The text of the transcript lines whose timestamps fall
+            within each interval.
+        """
+        timestamps, text = self.get_transcript_index(lecture)
+        timepoints, buffers = np.broadcast_arrays(
+            np.asarray(timepoints, dtype=np.float64),
+            np.asarray(buffers, dtype=np.float64)
+        )
+        # compute start and end times (within bounds) from timepoints and
+        # buffers
+        onsets = np.maximum(timepoints - buffers, 0)
+        offsets = np.minimum(timepoints + buffers, timestamps[-1])
+        # get indices of text between those times
+        starts = np.searchsorted(timestamps, onsets, side='left')
+        ends = np.searchsorted(timestamps, offsets, side='right')
+        return [' '.join(text[start:end])
+                for start, end in zip(starts.ravel(), ends.ravel())]
+
+    def get_transcript_index(self, lecture):
+        """
+        Returns the (cached) timestamp index for a lecture's transcript.
+
+        Parameters
+        ----------
+        lecture : {'forces', 'bos'}
+            The lecture whose transcript index to return.
+
+        Returns
+        -------
+        timestamps : numpy.ndarray
+            The sorted onset time (in seconds) of each transcript line.
+        text : numpy.ndarray
+            The text of each transcript line. The transcript's final
+            timestamp (marking the end of the last line) has no
+            corresponding text.
+        """
+        if lecture == 'forces':
+            return self.forces_transcript_index
+        elif lecture == 'bos':
+            return self.bos_transcript_index
+        else:
+            raise ValueError("Lecture must be either 'forces' or 'bos'")
+
+    def ingest_psiturk(
+            self,
+            path=None,
+            n_jobs=None,
+            chunksize=8,
+            allow_overwrite=False
+    ):
+        """
+        Creates participants from raw PsiTurk data, grades their
+        responses, and writes them to the participant store.
+
+        Parameters
+        ----------
+        path : str or pathlib.Path, optional
+            Path to the tab-separated PsiTurk data export (default:
+            `RAW_DIR/psiturk-data-raw.tsv`). Participants are assigned
+            subject IDs "P1", "P2", ..., in row order.
+        n_jobs : int, optional
+            The number of worker processes used to parse and grade
+            participants' data. If None (default) or 1, rows are
+            processed serially. -1 uses all available CPUs.
+        chunksize : int, optional
+            The number of rows sent to each worker process at a time
+            (default: 8).
+        allow_overwrite : bool, optional
+            If True (default: False), replace data for participants who
+            already exist in the store.
+
+        Returns
+        -------
+        ParticipantCollection
+            The (reloaded) participants in the store.
+        """
+        if path is None:
+            path = RAW_DIR.joinpath('psiturk-data-raw.tsv')
+        raw_data = pd.read_csv(path, sep='\t', index_col='Unnamed: 0')
+        # only the columns needed to create participants
+        rows = raw_data[['datastring', 'beginhit']].to_dict('records')
+        subids = [f'P{ix + 1}' for ix in raw_data.index]
+        # index question bank once and share it with all workers
+        question_index = build_question_index(load_question_bank())
+
+        if n_jobs is None or n_jobs == 1:
+            _init_ingest_worker(question_index)
+            participants = list(map(_ingest_psiturk_row, rows, subids))
+        else:
+            max_workers = os.cpu_count() if n_jobs == -1 else n_jobs
+            with ProcessPoolExecutor(max_workers=max_workers,
+                                     initializer=_init_ingest_worker,
+                                     initargs=(question_index,)) as executor:
+                participants = list(executor.map(_ingest_psiturk_row,
+                                                 rows,
+                                                 subids,
+                                                 chunksize=chunksize))
+
+        self.participant_store.write(participants,
+                                     allow_overwrite=allow_overwrite)
+        # reload participants from the updated store
+        self.__dict__.pop('participants', None)
+        return self.participants
+
+    def inverse_transform_coords(self, coords, seed=None, n_jobs=None):
+        """
+        Maps 2D coordinates in the UMAP embedding space back to
+        (log-transformed) topic vectors using `self.fit_umap`.
+
+        Results are cached in memory and, if `self.cache_dir` is set, on
+        disk under a key derived from the fit model, the coordinate, and
+        the random seed, so each location is only inverse-transformed
+        once across sessions. The model is identified by the hash of its
+        saved file, or of the pickled model if `self.fit_umap` has been
+        replaced with a different one. Cached results aren't updated if
+        `self.fit_umap` is modified in place.
+
+        Parameters
+        ----------
+        coords : array_like
+            A 2-element coordinate or an `(n_coords, 2)` array of
+            coordinates.
+        seed : int, optional
+            The random seed set before inverse-transforming each
+            coordinate. Defaults to the fit model's `transform_seed`.
+        n_jobs : int, optional
+            The number of worker processes used to inverse-transform
+            uncached coordinates. If None (default) or 1, coordinates are
+            processed serially. -1 uses all available CPUs.
+
+        Returns
+        -------
+        numpy.ndarray
+            An `(n_coords, n_topics)` array of topic vectors.
+        """
+        coords = np.atleast_2d(np.asarray(coords, dtype=np.float64))
+        reducer = self.fit_umap
+        if reducer is not self._inverse_reducer:
+            # `fit_umap` was replaced since results were last cached
+            self._inverse_cache = {}
+            self._inverse_reducer = reducer
+            self._inverse_model_key = sha1(pickle.dumps(reducer)).hexdigest()
+        if seed is None:
+            seed = reducer.transform_seed
+
+        keys = []
+        to_compute = {}
+        for coord in coords:
+            digest = sha1(self._inverse_model_key.encode())
+            digest.update(coord.tobytes())
+            digest.update(str(seed).encode())
+            key = digest.hexdigest()
+            keys.append(key)
+            if key in self._inverse_cache or key in to_compute:
+                continue
+            if self.cache_dir is not None:
+                cache_path = self.cache_dir.joinpath('umap-inverse', f'{key}.npy')
+                if cache_path.is_file():
+                    self._inverse_cache[key] = self._load_array(cache_path)
+                    continue
+            to_compute[key] = coord
+
+        if to_compute:
+            seeds = [seed] * len(to_compute)
+            if n_jobs is None or n_jobs == 1:
+                _init_inverse_worker(reducer)
+                vectors = list(map(_inverse_transform_coord,
+                                   to_compute.values(),
+                                   seeds))
+            else:
+                max_workers = os.cpu_count() if n_jobs == -1 else n_jobs
+                with ProcessPoolExecutor(max_workers=max_workers,
+                                         initializer=_init_inverse_worker,
+                                         initargs=(reducer,)) as executor:
+                    vectors = list(executor.map(_inverse_transform_coord,
+                                                to_compute.values(),
+                                                seeds))
+            for key, vector in zip(to_compute, vectors):
+                self._inverse_cache[key] = vector
+                if self.cache_dir is not None:
+                    cache_path = self.cache_dir.joinpath('umap-inverse', f'{key}.npy')
+                    cache_path.parent.mkdir(parents=True, exist_ok=True)
+                    np.save(cache_path, vector)
+
+        return np.array([self._inverse_cache[key] for key in keys])
+
+    def project_text(
+            self,
+            text,
+            preprocess=True,
+            wsize=LECTURE_WSIZE,
+            save_as=None,
+            append=False,
+            allow_overwrite=False,
+            n_jobs=None
+    ):
+        """
+        Computes topic vectors for new lectures or quiz questions using
+        the fit CountVectorizer and LDA models (`fit_cv` and `fit_lda`),
+        without refitting them.
+
+        Parameters
+        ----------
+        text : str or sequence of str
+            Either a lecture transcript as a single string, with
+            alternating, '\n'-separated lines of timestamps and
+            transcribed speech, or a sequence of text samples (e.g.,
+            questions or answers) to project individually. A transcript
+            is parsed into sliding windows whose topic vectors are
+            interpolated to 1 per second, like the lecture trajectories.
+        preprocess : bool, optional
+            If True (default), apply `khan_helpers.functions.preprocess_text`
+            to the text (for transcripts, to the lines of speech) first.
+            Set to False if the text has already been preprocessed.
+        wsize : int, optional
+            The number of text lines comprising each transcript sliding
+            window (default: `khan_helpers.constants.LECTURE_WSIZE`).
+            Ignored for sequences of text samples.
+        save_as : str, optional
+            If passed, save the topic vectors in the trajectories data
+            directory under this name (e.g., `'new_questions'`). Saving
+            under the name of a file the Experiment loads itself (e.g.,
+            `'all_questions'`) issues a warning: data paired with those
+            topic vectors (e.g., `questions`, `question_embeddings`, and
+            participants' question IDs) are not updated to match.
+        append : bool, optional
+            If True (default: False) and a file named `save_as` exists,
+            append the topic vectors to the existing ones (along the
+            first axis). The existing vectors must have the same shape
+            apart from the first axis (e.g., 2-D vectors can't be
+            appended to the 3-D `all_answers` file).
+        allow_overwrite : bool, optional
+            If True (default: False) and a file named `save_as` exists,
+            replace it. Ignored if `append` is True.
+        n_jobs : int, optional
+            The number of worker processes used to preprocess the text
+            (see `khan_helpers.functions.preprocess_text`).
+
+        Returns
+        -------
+        numpy.ndarray
+            A (timepoints, topics) trajectory for a transcript, or a
+            (samples, topics) array of topic vectors for a sequence of
+            text samples.
+
+        Raises
+        ------
+        FileExistsError
+            If a file named `save_as` exists and neither `append` nor
+            `allow_overwrite` is True.
+        ValueError
+            If `append` is True and the topic vectors in the existing
+            file named `save_as` don't match the new ones' shape.
+        """
+        if save_as is not None:
+            path = TRAJS_DIR.joinpath(f'{save_as}.npy')
+            # check before doing any work
+            if path.is_file() and not (append or allow_overwrite):
+                raise FileExistsError(
+                    f"{path} already exists. Set append to True to add to the "
+                    "existing topic vectors, or allow_overwrite to True to "
+                    "replace them"
+                )
+            if path.is_file() and append:
+                # transcripts and text samples both give 2-D arrays
+                vectors_shape = (self.fit_lda.n_components,)
+                existing_shape = np.load(path, mmap_mode='r').shape
+                if existing_shape[1:] != vectors_shape:
+                    raise ValueError(
+                        f"Can't append topic vectors of shape (n, "
+                        f"{vectors_shape[0]}) to {path}, which has shape "
+                        f"{existing_shape}"
+                    )
+            if save_as in _TOPIC_VECTOR_FILES.values():
+                warnings.warn(
+                    f"{save_as!r} is loaded by the Experiment alongside "
+                    "other data (e.g., the question table and embeddings) "
+                    "that won't be updated to match the new topic vectors. "
+                    "Pass a different `save_as` name to keep them in sync",
+                    stacklevel=2
+                )
+
+        if isinstance(text, str):
+            if preprocess:
+                lines = text.splitlines()
+                lines[1::2] = preprocess_text(lines[1::2], n_jobs=n_jobs)
+                text = '\n'.join(lines)
+            dtm, timestamps = window_term_matrix(text, self.fit_cv, wsize=wsize)
+            vectors = interp_lecture(self.fit_lda.transform(dtm), timestamps)
+        else:
+            text = list(text)
+            if preprocess:
+                text = preprocess_text(text, n_jobs=n_jobs)
+            vectors = self.fit_lda.transform(self.fit_cv.transform(text))
+
+        if save_as is not None:
+            if path.is_file() and append:
+                vectors_to_save = np.concatenate((np.load(path), vectors))
+            else:
+                vectors_to_save = vectors
+            # write to a temporary file first so existing memory maps of
+            # the old file remain valid
+            tmp_path = path.with_name(f'{path.stem}.tmp.npy')
+            np.save(tmp_path, vectors_to_save)
+            tmp_path.replace(path)
+            # reload topic vectors (and data derived from them) on next
+            # access
+            for name, attr in vars(type(self)).items():
+                if (
+                        isinstance(attr, LazyLoader) and
+                        attr.loader in ('_load_topic_vectors', '_load_qcorrs')
+                ):
+                    self.__dict__.pop(name, None)
+        return vectors
 
     def save_participants(self, filepaths=None, allow_overwrite=False):
+        # writes to the participant store, or to individual pickle files
+        # if `filepaths` is passed
         to_save = list(self.participants)
         if 'avg_participant' in self.__dict__:
             to_save.append(self.avg_participant)
         if filepaths is None:
-            filepaths = [None] * len(to_save)
+            self.participant_store.write(to_save,
+                                         allow_overwrite=allow_overwrite)
+            return
         elif len(filepaths) != len(to_save):
             msg = "`filepaths` must contain one path per participant"
             if self.avg_participant is not None:
@@ -151,25 +720,116 @@ class Experiment:
         for p, fpath in zip(to_save, filepaths):
             p.save(filepath=fpath, allow_overwrite=allow_overwrite)
 
+    def update_topic_model(
+            self,
+            texts,
+            preprocess=True,
+            min_perplexity_ratio=None,
+            n_jobs=None
+    ):
+        """
+        Updates the fit LDA model (`fit_lda`) in place with a step of
+        online variational Bayes on new text
+        (`LatentDirichletAllocation.partial_fit`), so topics can adapt
+        to new content without refitting the model from scratch. The
+        vocabulary of the fit CountVectorizer (`fit_cv`) is unchanged,
+        so words it doesn't contain are ignored.
+
+        Topic vectors computed before the update (including those
+        loaded from the trajectories data directory) are not updated.
+        Text samples that contain no words in the vocabulary are
+        ignored.
+
+        Parameters
+        ----------
+        texts : sequence of str
+            The new text samples (e.g., lecture transcript windows or
+            quiz questions).
+        preprocess : bool, optional
+            If True (default), apply `khan_helpers.functions.preprocess_text`
+            to the text first. Set to False if the text has already been
+            preprocessed.
+        min_perplexity_ratio : float, optional
+            If passed, only update the model if the ratio of its
+            perplexity on the new text to its perplexity on the lecture
+            windows it was fit to is at least this large (i.e., the new
+            text has drifted from the content the topics describe). If
+            None (default), always update the model.
+        n_jobs : int, optional
+            The number of worker processes used to preprocess the text
+            (see `khan_helpers.functions.preprocess_text`).
+
+        Returns
+        -------
+        float
+            The ratio of the model's perplexity on the new text to its
+            perplexity on the lecture windows, before updating (`inf`,
+            without updating, if no text sample contains any words in
+            the vocabulary).
+        """
+        texts = list(texts)
+        if preprocess:
+            texts = preprocess_text(texts, n_jobs=n_jobs)
+        new_dtm = self.fit_cv.transform(texts)
+        # samples with no words in the vocabulary carry no information
+        new_dtm = new_dtm[np.flatnonzero(new_dtm.getnnz(axis=1))]
+        if new_dtm.shape[0] == 0:
+            return np.inf
+        ref_dtm = self.fit_cv.transform(
+            np.concatenate((self.forces_windows, self.bos_windows))
+        )
+        ratio = _word_perplexity(self.fit_lda, new_dtm) \
+                / _word_perplexity(self.fit_lda, ref_dtm)
+        if min_perplexity_ratio is None or ratio >= min_perplexity_ratio:
+            # weight the update by the new samples' share of the full
+            # corpus (rather than sklearn's default of 1e6 documents)
+            self.fit_lda.set_params(total_samples=ref_dtm.shape[0] + new_dtm.shape[0])
+            self.fit_lda.partial_fit(new_dtm)
+        return ratio
+
     ##########################################
     #              DATA LOADERS              #
     ##########################################
+    def _load_array(self, path):
+        # loads a (non-object) .npy file, memory-mapped if requested
+        return np.load(path, mmap_mode='r' if self.mmap else None)
+
+    def _load_participant_store(self):
+        return ParticipantStore(STORE_DIR, mmap=self.mmap)
+
     def _load_participants(self):
-        participants = []
-        for pid in range(1, 51):
-            path = PARTICIPANTS_DIR.joinpath(f'P{pid}.p')
-            participants.append(pickle.loads(path.read_bytes()))
-        return np.array(participants)
+        store = self.participant_store
+        if store.exists:
+            subids = [subid for subid in store.subids if subid != 'avg']
+            loader = store.load_participant
+        else:
+            # fall back to individual pickle files
+            subids = [f'P{pid}' for pid in range(1, 51)]
+            loader = self._load_participant_pickle
+        return ParticipantCollection(subids,
+                                     loader,
+                                     maxsize=self.participant_cache_size)
 
-    def _load_avg_participant(self):
-        path = PARTICIPANTS_DIR.joinpath('avg.p')
+    def _load_participant_pickle(self, subid):
+        path = PARTICIPANTS_DIR.joinpath(f'{subid}.p')
         return pickle.loads(path.read_bytes())
 
+    def _load_avg_participant(self):
+        if 'avg' in self.participant_store:
+            return self.participant_store.load_participant('avg')
+        return self._load_participant_pickle('avg')
+
     def _load_transcript(self, lecture):
         path = RAW_DIR.joinpath(f'{lecture}_transcript_timestamped.txt')
         with path.open() as f:
             return f.read()
 
+    def _load_transcript_index(self, lecture):
+        transcript = getattr(self, f'{lecture}_transcript').splitlines()
+        timestamps = _ts_to_sec_array(transcript[::2])
+        text = np.array(transcript[1::2])
+        return timestamps, text
+
     def _load_questions(self):
         path = RAW_DIR.joinpath('questions.tsv')
         return pd.read_csv(path,
@@ -184,31 +844,76 @@ class Experiment:
                            index_col='index')
 
     def _load_windows(self, lecture):
-        return np.load(RAW_DIR.joinpath(f'{lecture}_windows.npy'))
+        return self._load_array(RAW_DIR.joinpath(f'{lecture}_windows.npy'))
 
     def _load_timestamps(self, lecture):
-        return np.load(RAW_DIR.joinpath(f'{lecture}_timestamps.npy'))
+        return self._load_array(RAW_DIR.joinpath(f'{lecture}_timestamps.npy'))
 
     def _load_topic_vectors(self, file_key):
+        return self._load_array(
+            TRAJS_DIR.joinpath(f'{_TOPIC_VECTOR_FILES[file_key]}.npy')
+        )
+
+    def _load_embedding(self, file_key):
         filename_map = {
             'forces': 'forces_lecture',
             'bos': 'bos_lecture',
-            'questions': 'all_questions',
-            'answers': 'all_answers'
+            'questions': 'questions',
         }
-        return np.load(TRAJS_DIR.joinpath(f'{filename_map[file_key]}.npy'))
+        return self._load_array(
+            EMBS_DIR.joinpath(f'{filename_map[file_key]}.npy')
+        )
 
-    def _load_embedding(self, file_key):
-        filename_map = {
+    def _load_qcorrs(self, file_key):
+        # correlations between lecture timepoints (or questions) and
+        # questions about the same lecture (or all questions)
+        from scipy.spatial.distance import cdist
+
+        traj_files = {
             'forces': 'forces_lecture',
             'bos': 'bos_lecture',
-            'questions': 'questions',
+            'questions': 'all_questions'
         }
-        return np.load(EMBS_DIR.joinpath(f'{filename_map[file_key]}.npy'))
+        if self.cache_dir is not None:
+            digest = sha1()
+            for fname in (traj_files[file_key], 'all_questions'):
+                digest.update(TRAJS_DIR.joinpath(f'{fname}.npy').read_bytes())
+            cache_path = self.cache_dir.joinpath(
+                f'{file_key}_qcorrs_{digest.hexdigest()[:16]}.npy'
+            )
+            if cache_path.is_file():
+                return self._load_array(cache_path)
+
+        if file_key == 'questions':
+            coords = questions = self.question_vectors
+        else:
+            coords = self.get_lecture_traj(file_key)
+            questions = self.get_question_vecs(lectures=[file_key])
+        qcorrs = 1 - cdist(coords, questions, 'correlation')
+
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            np.save(cache_path, qcorrs)
+        return qcorrs
 
     def _load_fit_model(self, model):
         return np.load(MODELS_DIR.joinpath(f'fit_{model}.npy'),
                        allow_pickle=True).item()
 
+    def _load_fit_umap(self):
+        reducer = self._load_fit_model('UMAP')
+        # inverse transforms computed with the saved model are cached
+        # under its file's hash (see `inverse_transform_coords`)
+        self._inverse_cache = {}
+        self._inverse_reducer = reducer
+        self._inverse_model_key = self._hash_fit_model('UMAP')
+        return reducer
+
+    def _hash_fit_model(self, model):
+        model_path = MODELS_DIR.joinpath(f'fit_{model}.npy')
+        return sha1(model_path.read_bytes()).hexdigest()
+
     def _load_wordle_mask(self):
+        from PIL.Image import open as open_image
+
         return np.array(open_image(DATA_DIR.joinpath('wordle-mask.jpg')))
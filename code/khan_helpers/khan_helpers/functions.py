@@ -1,28 +1,36 @@
 import logging
-import math
+import os
+import pickle
 import re
 import warnings
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import contextmanager, nullcontext
 from datetime import timedelta
 from difflib import get_close_matches
+from functools import lru_cache
 from inspect import getsource
+from itertools import repeat
+from pathlib import Path
 from typing import Iterator
 
-import matplotlib.pyplot as plt
-import numba
 import numpy as np
 import pandas as pd
-from IPython.display import display, HTML
-from IPython.core.oinspect import pylight
-from matplotlib import font_manager
-from nltk import pos_tag
-from nltk.corpus import wordnet
-from nltk.stem import WordNetLemmatizer
-from scipy.interpolate import interp1d
-from scipy.spatial.distance import cdist
 
-from .constants import FONTS_DIR, LECTURE_WSIZE, STOP_WORDS
+from .constants import FONTS_DIR, LECTURE_WSIZE
+
+# Dependencies only needed by some functions (matplotlib, numba, NLTK,
+# IPython, scipy) are imported inside those functions so that importing
+# `khan_helpers` stays fast for code that doesn't use them.
+
+
+def __getattr__(name):
+    # numba-compiled functions are imported (along with numba) on first
+    # access
+    if name == 'correlation_exp':
+        from .kernels import correlation_exp
+        return correlation_exp
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def _ts_to_sec(ts):
@@ -45,6 +53,354 @@ def _ts_to_sec(ts):
     return timedelta(minutes=int(mins), seconds=float(secs)).total_seconds()
 
 
+def _ts_to_sec_array(timestamps):
+    """
+    Vectorized version of `_ts_to_sec`. Converts a sequence of
+    "MM:SS[.ss]" timestamps to an array of elapsed seconds.
+
+    Parameters
+    ----------
+    timestamps : sequence of str
+        Timestamps consisting of minutes and seconds, separated by a
+        colon, where seconds may be a whole number or a decimal.
+
+    Returns
+    -------
+    numpy.ndarray
+        A 1-D array of the total number of seconds represented by each
+        timestamp.
+    """
+    parts = np.char.partition(np.asarray(timestamps, dtype=str), ':')
+    # round to whole microseconds, as `datetime.timedelta` does
+    microsecs = parts[:, 0].astype(np.int64) * 60_000_000
+    microsecs = microsecs + np.round(parts[:, 2].astype(float) * 1e6)
+    return microsecs / 1e6
+
+
+def _split_transcript(transcript):
+    """
+    Splits a lecture transcript into its lines of text and their
+    timestamps (in seconds, shifted so the first is 0s).
+    """
+    lines = transcript.splitlines()
+    text_lines = lines[1::2]
+    ts_lines = _ts_to_sec_array(lines[::2])
+    # linearly shift all timestamps so the first one is 0s
+    ts_lines = (ts_lines - ts_lines[0]).tolist()
+    return text_lines, ts_lines
+
+
+def _window_bounds(n_timestamps, n_lines, wsize):
+    """
+    Returns the (start, end) line indices of each sliding window over a
+    transcript (see `iter_windows`). Windows taper in size at the
+    beginning and end of the transcript.
+    """
+    bounds = [(0, ix) for ix in range(1, wsize)]
+    bounds.extend((ix, min(ix + wsize, n_lines)) for ix in range(n_timestamps))
+    return bounds
+
+
+# suffixes to look for when correcting lemmatization errors
+_CORRECTABLE_SFXS = ('s', 'ing', 'ly', 'ed', 'er', 'est')
+# corpus-specific words to exclude from lemma correction
+_DONT_LEMMATIZE = ('stronger', 'strongest', 'strongly', 'especially')
+# identifies the lemmatization rules in persisted lemma caches (see
+# `preprocess_text`). Increment the version when changing how
+# `_lemmatize` or `synset_match` find lemmas
+_LEMMA_RULES = (1, _CORRECTABLE_SFXS, _DONT_LEMMATIZE)
+
+
+def _lemmatize(word, tag, lemmatizer):
+    """
+    Lemmatizes a word given its WordNet POS tag, falling back to
+    `synset_match` when the `WordNetLemmatizer` likely failed due to a
+    mis-tagged word (see `preprocess_text`).
+    """
+    lemma = lemmatizer.lemmatize(word, tag)
+    # handles most cases where POS tagger misidentifies a word,
+    # causing WordNet Morphy to use the wrong syntactic
+    # transformation and fail
+    if (
+            lemma == word and
+            any(word.endswith(sfx) for sfx in _CORRECTABLE_SFXS) and
+            len(word) > 4
+    ):
+        lemma = synset_match(word)
+        return lemma, lemma != word
+    return lemma, False
+
+
+def _load_lemma_cache(path):
+    """
+    Loads lemmas persisted by `preprocess_text`. Returns an empty cache
+    if the file doesn't exist or was written using different
+    lemmatization rules or NLTK version.
+    """
+    import nltk
+
+    if path.is_file():
+        cached = pickle.loads(path.read_bytes())
+        # caches saved before rules were recorded are plain dicts
+        if (
+                isinstance(cached, tuple) and
+                cached[0] == (_LEMMA_RULES, nltk.__version__)
+        ):
+            return cached[1]
+    return {}
+
+
+def _save_lemma_cache(path, lemma_cache):
+    """
+    Persists lemmas cached by `preprocess_text`, along with the rules
+    and NLTK version used to find them (see `_load_lemma_cache`).
+    """
+    import nltk
+
+    path.write_bytes(
+        pickle.dumps(((_LEMMA_RULES, nltk.__version__), lemma_cache))
+    )
+
+
+def _preprocess_chunks(textlist, lemma_cache):
+    """
+    Runs the preprocessing steps of `preprocess_text` on a list of text
+    samples in the current process, using and updating `lemma_cache`, a
+    dict mapping (word, WordNet POS tag) to (lemma, whether lemma was
+    corrected via `synset_match`).
+
+    Returns
+    -------
+    processed : list of str
+        The processed text samples.
+    corrections : collections.defaultdict
+        Counts of (word, lemma) corrections made via `synset_match`.
+    new_lemmas : dict
+        Entries added to the lemma cache while processing.
+    """
+    from nltk import pos_tag
+    from nltk.stem import WordNetLemmatizer
+
+    from .constants import STOP_WORDS
+
+    lemmatizer = WordNetLemmatizer()
+    # POS tag mapping, format: {Treebank tag (1st letter only): Wordnet}
+    tagset_mapping = defaultdict(
+        lambda: 'n',   # defaults to noun
+        {
+            'N': 'n',  # noun types
+            'P': 'n',  # pronoun types, predeterminers
+            'V': 'v',  # verb types
+            'J': 'a',  # adjective types
+            'D': 'a',  # determiner
+            'R': 'r'   # adverb types
+        })
+    corrections = defaultdict(int)
+    new_lemmas = {}
+
+    # insert delimiters between text samples to map processed text back
+    # to original chunk
+    chunk_delimiter = 'chunkdelimiter'
+    processed_chunks = [[] for _ in textlist]
+    # clean spacing, normalize case, strip punctuation
+    # (temporarily leave punctuation useful for POS tagging)
+    full_text = f' {chunk_delimiter} '.join(textlist).lower()
+    punc_stripped = re.sub("[^a-zA-Z\s']+", '', full_text.replace('-', ' '))
+    # POS tagging (works better on full transcript, more context provided)
+    words_tags = pos_tag(punc_stripped.split())
+
+    chunk_ix = 0
+    for word, tag in words_tags:
+        if word == chunk_delimiter:
+            # denotes end of a text chunk
+            chunk_ix += 1
+            continue
+
+        # discard contraction clitics (always stop words or possessive)
+        # irregular stems (don, isn, etc.) handled by stop word removal
+        elif "'" in word:
+            word = word.split("'")[0]
+        # remove stop words & digits
+        if word in STOP_WORDS or word[0].isdigit():
+            continue
+
+        if word not in _DONT_LEMMATIZE:
+            # convert Treebank POS tags to WordNet POS tags; lemmatize
+            tag = tagset_mapping[tag[0]]
+            try:
+                lemma, corrected = lemma_cache[(word, tag)]
+            except KeyError:
+                lemma, corrected = _lemmatize(word, tag, lemmatizer)
+                lemma_cache[(word, tag)] = (lemma, corrected)
+                new_lemmas[(word, tag)] = (lemma, corrected)
+            if corrected:
+                # record changes made this way to spot-check later
+                corrections[(word, lemma)] += 1
+        else:
+            lemma = word
+
+        # place back in correct text chunk
+        processed_chunks[chunk_ix].append(lemma)
+
+    # join words within each chunk
+    return [' '.join(c) for c in processed_chunks], corrections, new_lemmas
+
+
+def _stack_responses(data, columns, subids=None):
+    """
+    Arranges participants' graded responses (as returned by
+    `Experiment.all_data`) into dense arrays indexed by quiz,
+    participant, and response.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        Graded response data, indexed by (participant ID, row number).
+    columns : sequence of str
+        The columns of `data` to arrange into arrays.
+    subids : sequence of str, optional
+        The order of participants along the second axis of the
+        returned arrays. Defaults to the order in which participants
+        appear in `data`.
+
+    Returns
+    -------
+    arrays : list of numpy.ndarray
+        One `(n_quizzes, n_participants, n_observations)` array for
+        each column in `columns`. Participants with fewer than
+        `n_observations` responses on a quiz are padded with `0`s.
+    subids : list of str
+        The participant ID for each index along the second axis.
+    """
+    part_ids = data.index.get_level_values(0)
+    if subids is None:
+        subids = list(pd.unique(part_ids))
+    part_ix = pd.Categorical(part_ids, categories=subids).codes
+    quiz_ix = data['quiz'].to_numpy()
+    # position of each response within its (quiz, participant) group
+    obs_ix = data.groupby([quiz_ix, part_ix]).cumcount().to_numpy()
+
+    shape = (quiz_ix.max() + 1, len(subids), obs_ix.max() + 1)
+    arrays = []
+    for col in columns:
+        arr = np.zeros(shape, dtype=data[col].dtype)
+        arr[quiz_ix, part_ix, obs_ix] = data[col]
+        arrays.append(arr)
+    return arrays, subids
+
+
+def _sparse_rbf(obs_coords, pred_coords, width, tol, dtype=np.float64):
+    """
+    Evaluates Gaussian radial basis functions centered on each observed
+    coordinate at each predicted coordinate, keeping only values of at
+    least `tol`.
+
+    Parameters
+    ----------
+    obs_coords : numpy.ndarray or scipy.spatial.cKDTree
+        An (x, z) array of coordinates for `x` nodes in `z` dimensions,
+        or a KD-tree built from them.
+    pred_coords : numpy.ndarray or scipy.spatial.cKDTree
+        A (y, z) array of `y` coordinates in `z` dimensions at which to
+        evaluate the RBFs, or a KD-tree built from them.
+    width : scalar
+        The width of the Gaussian kernel.
+    tol : float
+        The smallest kernel value to keep. Only pairs of coordinates
+        within `sqrt(-width * log(tol))` of each other are evaluated.
+    dtype : numpy.dtype, optional
+        The dtype of the returned values (default: `numpy.float64`).
+
+    Returns
+    -------
+    scipy.sparse.csr_matrix
+        An (x, y) sparse matrix of RBF values.
+    """
+    from scipy.sparse import csr_matrix
+    from scipy.spatial import cKDTree
+
+    obs_tree = obs_coords if isinstance(obs_coords, cKDTree) else cKDTree(obs_coords)
+    pred_tree = pred_coords if isinstance(pred_coords, cKDTree) else cKDTree(pred_coords)
+    radius = np.sqrt(-width * np.log(tol))
+    pairs = obs_tree.sparse_distance_matrix(pred_tree,
+                                            radius,
+                                            output_type='ndarray')
+    dtype = np.dtype(dtype)
+    vals = np.exp(-pairs['v'].astype(dtype) ** 2 / dtype.type(width))
+    return csr_matrix((vals, (pairs['i'], pairs['j'])),
+                      shape=(obs_tree.n, pred_tree.n))
+
+
+def bootstrap_ci(
+        M,
+        ci=95,
+        n_boots=1000,
+        ignore_nan=False,
+        chunk_size=None,
+        random_state=None
+):
+    """
+    Computes the bootstrap-estimated confidence interval of the mean of
+    a set of observations at each of a series of timepoints.
+
+    Parameters
+    ----------
+    M : numpy.ndarray
+        A (timepoints, observations) array of values.
+    ci : int, optional
+        The size of the confidence interval as a percentage (default:
+        95).
+    n_boots : int, optional
+        The number of bootstraps to use for computing the confidence
+        interval (default: 1,000). Full-size resamples of observations
+        are constructed (with replacement) independently for each
+        timepoint.
+    ignore_nan : bool, optional
+        If True (default: False), ignore NaNs in all calculations.
+    chunk_size : int, optional
+        The maximum number of bootstrap means to hold in memory at once.
+        If passed, timepoints are processed in batches of
+        `chunk_size // n_boots` (resampled observations themselves are
+        never materialized; see `khan_helpers.stats`). Doesn't affect
+        the results. If None (default), all timepoints are processed at
+        once.
+    random_state : int, optional
+        The random seed to use for reproducibility. If None (default), a
+        seed is drawn from numpy's global random state.
+
+    Returns
+    -------
+    ci_low, ci_high : numpy.ndarray
+        1-D arrays of the lower and upper bounds of the confidence
+        interval at each timepoint.
+    """
+    from .stats import bootstrap_mean_ci
+
+    n_tpts = M.shape[0]
+    if chunk_size is None:
+        tpts_per_chunk = n_tpts
+    else:
+        tpts_per_chunk = max(chunk_size // n_boots, 1)
+    if random_state is None:
+        random_state = np.random.randint(0, 2 ** 32 - 1)
+
+    ci_low = np.empty(n_tpts)
+    ci_high = np.empty(n_tpts)
+    for tpt_start in range(0, n_tpts, tpts_per_chunk):
+        tpts = slice(tpt_start, tpt_start + tpts_per_chunk)
+        # each timepoint's random stream is seeded from its index in `M`,
+        # so results don't depend on `chunk_size`
+        ci_low[tpts], ci_high[tpts] = bootstrap_mean_ci(
+            M[tpts],
+            ci=ci,
+            n_boots=n_boots,
+            ignore_nan=ignore_nan,
+            random_state=random_state,
+            row_offset=tpt_start
+        )
+    return ci_low, ci_high
+
+
 def bootstrap_ci_plot(
         M,
         ci=95,
@@ -56,7 +412,9 @@ def bootstrap_ci_plot(
         label=None,
         ax=None,
         line_kwargs=None,
-        ribbon_kwargs=None
+        ribbon_kwargs=None,
+        chunk_size=None,
+        random_state=None
 ):
     """
     Plots a timeseries of observations with error ribbons denoting the
@@ -102,6 +460,13 @@ def bootstrap_ci_plot(
     ribbon_kwargs : dict, optional
         Additional keyword arguments forwarded to
         `matplotlib.axes.Axes.fill_between`.
+    chunk_size : int, optional
+        The maximum number of bootstrap means to hold in memory at once
+        (see `bootstrap_ci`). If None (default), all timepoints are
+        processed at once.
+    random_state : int, optional
+        The random seed to use for reproducibility. If None (default), a
+        seed is drawn from numpy's global random state.
 
     Returns
     -------
@@ -113,15 +478,15 @@ def bootstrap_ci_plot(
         containing the lower and upper bounds of the confidence interval
         at each timepoint.
     """
+    import matplotlib.pyplot as plt
+
     # set defaults
     if ignore_nan:
         nan_context = filter_nan_warnings
         mean_func = np.nanmean
-        percentile_func = np.nanpercentile
     else:
         nan_context = nullcontext
         mean_func = np.mean
-        percentile_func = np.percentile
     if ax is None:
         ax = plt.gca()
     if line_kwargs is None:
@@ -137,15 +502,12 @@ def bootstrap_ci_plot(
     with nan_context():
         obs_mean = mean_func(M, axis=1)
 
-    # (n_tpts, n_obs, n_boots) column indices to subsample each row of M
-    rand_ixs = np.random.randint(0, M.shape[1], size=(*M.shape, n_boots))
-    # (n_tpts, n_boots) subsample means for each timepoint
-    boots = np.take_along_axis(M[:, None], rand_ixs, axis=2)
-    with nan_context():
-        boot_means = mean_func(boots, axis=1)
-
-        ci_low = percentile_func(boot_means, (100 - ci) / 2, axis=1)
-        ci_high = percentile_func(boot_means, (100 + ci) / 2, axis=1)
+    ci_low, ci_high = bootstrap_ci(M,
+                                   ci=ci,
+                                   n_boots=n_boots,
+                                   ignore_nan=ignore_nan,
+                                   chunk_size=chunk_size,
+                                   random_state=random_state)
 
     ax.fill_between(timepoints, ci_low, ci_high, alpha=alpha, **ribbon_kwargs)
     ax.plot(timepoints, obs_mean, color=color, label=label, **line_kwargs)
@@ -187,60 +549,6 @@ def corr_mean(rs, axis=None, fix_inf=False, **kwargs):
     return z2r(zmean)
 
 
-@numba.njit
-def correlation_exp(x, y):
-    """
-    Computes the correlation distance between two n-dimensional
-    vectors, exponentiating each element first. Returns the result and
-    the gradient of the distance function with respect to `x`.
-
-    Parameters
-    ----------
-    x, y : numpy.ndarray
-        The two vectors to compare. Must have the same shape.
-
-    Returns
-    -------
-    dist : float
-        Correlation distance between the two vectors.
-    grad : numpy.ndarray
-        Gradient of the distance with respect to `x`.
-    """
-    x = math.e ** x
-    y = math.e ** y
-    mu_x = 0.0
-    mu_y = 0.0
-    norm_x = 0.0
-    norm_y = 0.0
-    dot_product = 0.0
-
-    for i in range(x.shape[0]):
-        mu_x += x[i]
-        mu_y += y[i]
-
-    mu_x /= x.shape[0]
-    mu_y /= x.shape[0]
-
-    for i in range(x.shape[0]):
-        shifted_x = x[i] - mu_x
-        shifted_y = y[i] - mu_y
-        norm_x += shifted_x ** 2
-        norm_y += shifted_y ** 2
-        dot_product += shifted_x * shifted_y
-
-    if norm_x == 0.0 and norm_y == 0.0:
-        dist = 0.0
-        grad = np.zeros(x.shape)
-    elif dot_product == 0.0:
-        dist = 1.0
-        grad = np.zeros(x.shape)
-    else:
-        dist = 1.0 - (dot_product / np.sqrt(norm_x * norm_y))
-        grad = ((x - mu_x) / norm_x - (y - mu_y) / dot_product) * dist
-
-    return dist, grad
-
-
 @contextmanager
 def disable_logging(module, level='CRITICAL'):
     """
@@ -315,6 +623,8 @@ def multicol_display(*outputs,
         Additional CSS properties to be applied to each table *cell*
         ('<td>') element.
     """
+    from IPython.display import display, HTML
+
     def _fmt_python_types(obj):
         # formats some common Python objects for display
         if isinstance(obj, str):
@@ -418,6 +728,107 @@ def filter_nan_warnings():
         yield
 
 
+def find_correlation_peaks(
+        qcorrs,
+        min_prominence=0.1,
+        min_width=15,
+        rel_height=0.5,
+        decimals=2
+):
+    """
+    Finds peaks in the correlation timeseries between a lecture and each
+    of a set of questions, and the intervals of lecture timepoints
+    around them.
+
+    Each column of `qcorrs` is padded on both sides with its minimum
+    value (so that peaks at the beginning and end of the lecture can be
+    detected) and rounded to `decimals` decimal places (to remove some
+    noise within peaks) before detecting peaks. Peaks are identified
+    and their widths measured as with `scipy.signal.find_peaks` (using
+    its `prominence`, `width`, and `rel_height` arguments), but for all
+    columns at once in a compiled loop.
+
+    The interval around each peak spans the timepoints where the
+    contour line at the width evaluation height (`rel_height` times the
+    peak's prominence) intersects the timeseries, rounded away from the
+    peak. Overlapping intervals for the same question are merged.
+
+    Parameters
+    ----------
+    qcorrs : numpy.ndarray
+        A (timepoints, questions) array of correlations (e.g.,
+        `Experiment.forces_qcorrs`).
+    min_prominence : float, optional
+        The minimum prominence of a peak (default: 0.1).
+    min_width : float, optional
+        The minimum width of a peak, in timepoints (default: 15).
+    rel_height : float, optional
+        The relative height at which peak widths are measured, as a
+        proportion of the peak's prominence (default: 0.5).
+    decimals : int, optional
+        The number of decimal places to which correlations are rounded
+        before finding peaks (default: 2). If None, correlations aren't
+        rounded.
+
+    Returns
+    -------
+    peaks : numpy.ndarray
+        A structured array with one record per peak and fields
+        `'question'` (column index in `qcorrs`), `'timepoint'` (row
+        index in `qcorrs`), `'prominence'`, `'width'`, `'left_ip'`, and
+        `'right_ip'` (interpolated positions of the width evaluation
+        line's left and right intersections, in timepoints of the
+        padded timeseries).
+    intervals : numpy.ndarray
+        A structured array with one record per merged interval and
+        fields `'question'`, `'onset'`, and `'offset'` (timepoints).
+    """
+    from .kernels import _find_peaks_2d
+
+    qcorrs = np.asarray(qcorrs, dtype=np.float64)
+    col_mins = qcorrs.min(axis=0, keepdims=True)
+    padded = np.concatenate((col_mins, qcorrs, col_mins))
+    if decimals is not None:
+        padded = padded.round(decimals)
+
+    (
+        peak_cols,
+        peak_tpts,
+        prominences,
+        widths,
+        left_ips,
+        right_ips,
+        interval_cols,
+        onsets,
+        offsets
+    ) = _find_peaks_2d(np.ascontiguousarray(padded),
+                       float(min_prominence),
+                       float(min_width),
+                       float(rel_height))
+
+    peaks = np.empty(len(peak_cols), dtype=[('question', np.int64),
+                                            ('timepoint', np.int64),
+                                            ('prominence', np.float64),
+                                            ('width', np.float64),
+                                            ('left_ip', np.float64),
+                                            ('right_ip', np.float64)])
+    peaks['question'] = peak_cols
+    # correct for padding
+    peaks['timepoint'] = peak_tpts - 1
+    peaks['prominence'] = prominences
+    peaks['width'] = widths
+    peaks['left_ip'] = left_ips
+    peaks['right_ip'] = right_ips
+
+    intervals = np.empty(len(interval_cols), dtype=[('question', np.int64),
+                                                    ('onset', np.int64),
+                                                    ('offset', np.int64)])
+    intervals['question'] = interval_cols
+    intervals['onset'] = onsets
+    intervals['offset'] = offsets
+    return peaks, intervals
+
+
 def format_stats(stat, p, stat_name, df=None, n_decimals=3, p_min=0.001):
     """
     General function to format the test statistic and p-value from a
@@ -507,6 +918,8 @@ def interp_lecture(lec_traj, timestamps):
         A (timepoints, features) array with a feature vector for each
         second.
     """
+    from scipy.interpolate import interp1d
+
     new_tpts = np.arange(timestamps[-1])
     interp_func = interp1d(timestamps,
                            lec_traj,
@@ -515,11 +928,153 @@ def interp_lecture(lec_traj, timestamps):
     return interp_func(new_tpts)
 
 
+def iter_windows(transcript, wsize=LECTURE_WSIZE):
+    """
+    Generates overlapping sliding windows of lecture transcript text and
+    their timestamps one at a time. Yields the same windows as
+    `parse_windows` without holding them all in memory.
+
+    Rather than re-joining each window's lines, the transcript text is
+    joined once and each window is sliced out of it using the offsets
+    of its first and last lines, so the window can slide without any
+    per-line string building.
+
+    Parameters
+    ----------
+    transcript : str
+        The lecture transcript as a single string, with alternating,
+        '\n'-separated lines of timestamps and transcribed speech.
+    wsize : int, optional
+        The number of text lines comprising each sliding window (with
+        tapering window sizes at the beginning and end).  Defaults to
+        `khan_helpers.constants.LECTURE_WSIZE`.
+
+    Yields
+    ------
+    window : str
+        The text of the sliding window.
+    timestamp : float
+        The timestamp assigned to the window (the midpoint between the
+        timestamps of its first and last lines).
+    """
+    text_lines, ts_lines = _split_transcript(transcript)
+    text = ' '.join(text_lines)
+    # character offset of the start of each line in the joined text
+    # (plus one past the end of the last line)
+    line_offsets = [0]
+    for line in text_lines:
+        line_offsets.append(line_offsets[-1] + len(line) + 1)
+
+    for start, end in _window_bounds(len(ts_lines), len(text_lines), wsize):
+        stop = min(end, len(text_lines))
+        if start >= stop:
+            window = ''
+        else:
+            window = text[line_offsets[start]:line_offsets[stop] - 1]
+        # each window assigned to midpoint between timestamp of first
+        # line and last lines
+        yield window, (ts_lines[start] + ts_lines[end - 1]) / 2
+
+
+def leave_one_out_knowledge(all_data, question_vectors, exclude_qids=None):
+    """
+    Estimates each participant's knowledge at the embedding coordinate
+    of each question they answered, based on their performance on all
+    *other* questions from the same quiz. Produces the same estimates as
+    calling `reconstruct_trace` with the target question's topic vector
+    once for each held-out question, but derives all of them from a
+    single question-by-question weight matrix.
+
+    Estimates are computed from three sets of held-out questions: all
+    other questions on the quiz ("all"), other questions about the same
+    lecture as the target question ("same"), and questions about the
+    other lecture ("other"). "same" and "other" estimates are NaN for
+    general physics knowledge questions.
+
+    Parameters
+    ----------
+    all_data : pandas.DataFrame
+        Graded response data for all participants, as returned by
+        `Experiment.all_data`.
+    question_vectors : numpy.ndarray
+        `(n_questions, n_features)` matrix of topic vectors for all quiz
+        questions, ordered by question ID.
+    exclude_qids : sequence of int, optional
+        IDs of questions for which not to return estimates. These are
+        still used to estimate knowledge for other questions.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per (quiz, participant, target question), with columns
+        'quiz', 'qID', 'participant_id', 'lecture', 'accuracy',
+        'pcorrect_all', 'knowledge_all', 'pcorrect_same',
+        'knowledge_same', 'pcorrect_other', and 'knowledge_other'.
+    """
+    from scipy.spatial.distance import cdist
+
+    (qids, acc, lecs), subids = _stack_responses(
+        all_data, ['qID', 'accuracy', 'lecture']
+    )
+    valid = qids > 0
+    acc = acc.astype(float)
+    # question-by-question weights for each pair of responses within a
+    # (quiz, participant) group
+    qq_weights = 1 - cdist(question_vectors, question_vectors, 'correlation')
+    w = qq_weights[qids[..., :, None] - 1, qids[..., None, :] - 1]
+
+    # (..., target, other) masks for each set of held-out questions
+    lec_i, lec_j = lecs[..., :, None], lecs[..., None, :]
+    held_out = valid[..., :, None] & valid[..., None, :]
+    held_out &= ~np.eye(qids.shape[2], dtype=bool)
+    lecture_related = held_out & (lec_i != 0) & (lec_j != 0)
+    masks = {
+        'all': held_out,
+        'same': lecture_related & (lec_i == lec_j),
+        'other': lecture_related & (lec_i != lec_j)
+    }
+
+    results = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for key, mask in masks.items():
+            n_total = mask.sum(axis=-1)
+            n_correct = (mask * acc[..., None, :]).sum(axis=-1)
+            # `reconstruct_trace` min-max normalizes the weights for the
+            # held-out questions; the scaling term cancels out of the
+            # ratio, so only the minimum is needed
+            w_min = np.where(mask, w, np.inf).min(axis=-1)
+            # sum over held-out questions (total possible weight) and
+            # over correctly answered held-out questions
+            a = (mask * w).sum(axis=-1) - w_min * n_total
+            b = (mask * acc[..., None, :] * w).sum(axis=-1) - w_min * n_correct
+            results[f'pcorrect_{key}'] = n_correct / n_total
+            results[f'knowledge_{key}'] = b / a
+
+    keep = valid.copy()
+    if exclude_qids is not None:
+        keep &= ~np.isin(qids, exclude_qids)
+    quiz_ix, part_ix, _ = np.nonzero(keep)
+    return pd.DataFrame({
+        'quiz': [f'Quiz{q + 1}' for q in quiz_ix],
+        'qID': [f'Q{qid}' for qid in qids[keep]],
+        'participant_id': np.asarray(subids)[part_ix],
+        'lecture': lecs[keep],
+        'accuracy': acc[keep].astype(int),
+        'pcorrect_all': results['pcorrect_all'][keep],
+        'knowledge_all': results['knowledge_all'][keep],
+        'pcorrect_same': results['pcorrect_same'][keep],
+        'knowledge_same': results['knowledge_same'][keep],
+        'pcorrect_other': results['pcorrect_other'][keep],
+        'knowledge_other': results['knowledge_other'][keep]
+    })
+
+
 def parse_windows(transcript, wsize=LECTURE_WSIZE):
     """
     Formats lecture transcripts as overlapping sliding windows to feed
     as documents to topic model.  Also assigns a timestamp to each
-    window used for interpolating the topic trajectory.
+    window used for interpolating the topic trajectory.  See
+    `iter_windows` to generate windows one at a time instead.
 
     Parameters
     ----------
@@ -539,27 +1094,11 @@ def parse_windows(transcript, wsize=LECTURE_WSIZE):
         The timestamps corresponding to each window.
 
     """
-    lines = transcript.splitlines()
-    text_lines = lines[1::2]
-    ts_lines = list(map(_ts_to_sec, lines[::2]))
-    # linearly shift all timestamps so the first one is 0s
-    ts_lines = [ts - ts_lines[0] for ts in ts_lines]
-
     windows = []
     timestamps = []
-    for ix in range(1, wsize):
-        start, end = 0, ix
-        windows.append(' '.join(text_lines[start:end]))
-        # each window assigned to midpoint between timestamp of first
-        # line and last lines
-        timestamps.append((ts_lines[start] + ts_lines[end - 1]) / 2)
-
-    for ix in range(len(ts_lines)):
-        start = ix
-        end = ix + wsize if ix + wsize <= len(text_lines) else len(text_lines)
-        windows.append(' '.join(text_lines[start:end]))
-        timestamps.append((ts_lines[start] + ts_lines[end - 1]) / 2)
-
+    for window, timestamp in iter_windows(transcript, wsize=wsize):
+        windows.append(window)
+        timestamps.append(timestamp)
     return windows, timestamps
 
 
@@ -572,49 +1111,41 @@ def pearsonr_ci(x, y, ci=95, n_boots=10000, random_state=0):
     Parameters
     ----------
     x, y : array_like
-        The two arrays of data to correlate.
+        The two arrays of data to correlate. May also be two (pairs,
+        observations) arrays, to compute confidence intervals for many
+        pairs of rows in a single call.
     ci : float, optional
         The confidence interval to calculate, as a percentage (default:
         95).
     n_boots : int, optional
         The number of bootstrap samples to draw (default: 10,000).
     random_state : int or array_like, optional
-        The random seed to use for reproducibility (default: 0). Must be
-        convertible to 32-bit unsigned integer(s).
+        The random seed to use for reproducibility (default: 0). May be
+        anything accepted by `numpy.random.seed`. Note that results for
+        a given seed differ from those of earlier versions of this
+        function (see `khan_helpers.stats.bootstrap_pearsonr_ci`).
 
     Returns
     -------
-    ci_low, ci_high : tuple of float
-        The lower and upper bounds of the confidence interval.
+    ci_low, ci_high : tuple of float or numpy.ndarray
+        The lower and upper bounds of the confidence interval (1-D
+        arrays if `x` and `y` are 2-D).
     """
-    x = np.asarray(x)
-    y = np.asarray(y)
-    np.random.seed(random_state)
-
-    # (n_boots, n_observations) paired arrays
-    rand_ixs = np.random.randint(0, x.shape[0], size=(n_boots, x.shape[0]))
-    x_boots = x[rand_ixs]
-    y_boots = y[rand_ixs]
+    from .stats import bootstrap_pearsonr_ci
 
-    # differences from mean
-    x_mdiffs = x_boots - x_boots.mean(axis=1)[:, None]
-    y_mdiffs = y_boots - y_boots.mean(axis=1)[:, None]
+    return bootstrap_pearsonr_ci(x,
+                                 y,
+                                 ci=ci,
+                                 n_boots=n_boots,
+                                 random_state=random_state)
 
-    # sums of squares
-    x_ss = np.einsum('ij, ij -> i', x_mdiffs, x_mdiffs)
-    y_ss = np.einsum('ij, ij -> i', y_mdiffs, y_mdiffs)
 
-    # pearson correlations
-    r_boots = np.einsum('ij, ij -> i', x_mdiffs, y_mdiffs) / np.sqrt(
-        x_ss * y_ss)
-
-    # upper and lower bounds for confidence interval
-    ci_low = np.percentile(r_boots, (100 - ci) / 2)
-    ci_high = np.percentile(r_boots, (ci + 100) / 2)
-    return ci_low, ci_high
-
-
-def preprocess_text(textlist, correction_counter=None):
+def preprocess_text(
+        textlist,
+        correction_counter=None,
+        n_jobs=None,
+        lemma_cache=None
+):
     """
     Handles text preprocessing of lecture transcripts and quiz questions
     & answers. Performs case and whitespace normalization, punctuation
@@ -628,6 +1159,10 @@ def preprocess_text(textlist, correction_counter=None):
     instances and can optionally record corrections made this way for
     visual inspection to ensure no improper substitutions were made.
 
+    The lemma found for each (word, POS tag) pair is cached for the
+    duration of the call (and optionally across calls; see
+    `lemma_cache`), so each distinct word is only lemmatized once.
+
     Parameters
     ----------
     textlist : sequence of str
@@ -641,6 +1176,19 @@ def preprocess_text(textlist, correction_counter=None):
         function). If provided, keys of (word, lemma) will be added or
         incremented for each correction. Useful for spot-checking
         corrections to ensure only proper substitutions were made.
+    n_jobs : int, optional
+        The number of worker processes across which to split `textlist`
+        (into contiguous shards of whole text samples). If None
+        (default) or 1, all text is processed in a single process. -1
+        uses all available CPUs. Note that the POS tagger doesn't see
+        context across shard boundaries, so tags for words at the edges
+        of shards may occasionally differ from those assigned when
+        processing all text at once.
+    lemma_cache : str or pathlib.Path, optional
+        Path to a file in which to persist cached lemmas across calls
+        and sessions. Read before processing (if it exists) and updated
+        afterward. Lemmas saved using different lemmatization rules or
+        a different NLTK version are discarded.
 
     Returns
     -------
@@ -661,75 +1209,39 @@ def preprocess_text(textlist, correction_counter=None):
                 "with 'default_factory=int'"
             )
 
-    # define some constants only used in this function:
-    lemmatizer = WordNetLemmatizer()
-    # suffixes to look for when correcting lemmatization errors
-    correctable_sfxs = ('s', 'ing', 'ly', 'ed', 'er', 'est')
-    # corpus-specific words to exclude from lemma correction
-    dont_lemmatize = ['stronger', 'strongest', 'strongly', 'especially']
-    # POS tag mapping, format: {Treebank tag (1st letter only): Wordnet}
-    tagset_mapping = defaultdict(
-        lambda: 'n',   # defaults to noun
-        {
-            'N': 'n',  # noun types
-            'P': 'n',  # pronoun types, predeterminers
-            'V': 'v',  # verb types
-            'J': 'a',  # adjective types
-            'D': 'a',  # determiner
-            'R': 'r'   # adverb types
-        })
-
-    # insert delimiters between text samples to map processed text back
-    # to original chunk
-    chunk_delimiter = 'chunkdelimiter'
-    processed_chunks = [[] for _ in textlist]
-    # clean spacing, normalize case, strip punctuation
-    # (temporarily leave punctuation useful for POS tagging)
-    full_text = f' {chunk_delimiter} '.join(textlist).lower()
-    punc_stripped = re.sub("[^a-zA-Z\s']+", '', full_text.replace('-', ' '))
-    # POS tagging (works better on full transcript, more context provided)
-    words_tags = pos_tag(punc_stripped.split())
-
-    chunk_ix = 0
-    for word, tag in words_tags:
-        if word == chunk_delimiter:
-            # denotes end of a text chunk
-            chunk_ix += 1
-            continue
-
-        # discard contraction clitics (always stop words or possessive)
-        # irregular stems (don, isn, etc.) handled by stop word removal
-        elif "'" in word:
-            word = word.split("'")[0]
-        # remove stop words & digits
-        if word in STOP_WORDS or word[0].isdigit():
-            continue
+    if lemma_cache is None:
+        lemmas = {}
+    else:
+        lemma_cache = Path(lemma_cache)
+        lemmas = _load_lemma_cache(lemma_cache)
 
-        if word not in dont_lemmatize:
-            # convert Treebank POS tags to WordNet POS tags; lemmatize
-            tag = tagset_mapping[tag[0]]
-            lemma = lemmatizer.lemmatize(word, tag)
-
-            # handles most cases where POS tagger misidentifies a word,
-            # causing WordNet Morphy to use the wrong syntactic
-            # transformation and fail
-            if (
-                    lemma == word and
-                    any(word.endswith(sfx) for sfx in correctable_sfxs) and
-                    len(word) > 4
+    if n_jobs is None or n_jobs == 1:
+        processed, corrections, _ = _preprocess_chunks(textlist, lemmas)
+    else:
+        max_workers = os.cpu_count() if n_jobs == -1 else n_jobs
+        # split text into contiguous shards of whole text samples
+        shard_bounds = np.linspace(0, len(textlist), max_workers + 1).astype(int)
+        shards = [textlist[start:end]
+                  for start, end in zip(shard_bounds[:-1], shard_bounds[1:])
+                  if end > start]
+        processed = []
+        corrections = defaultdict(int)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for shard_processed, shard_corrections, new_lemmas in executor.map(
+                    _preprocess_chunks, shards, repeat(lemmas, len(shards))
             ):
-                lemma = synset_match(word)
-                if lemma != word and correction_counter is not None:
-                    # record changes made this way to spot-check later
-                    correction_counter[(word, lemma)] += 1
-        else:
-            lemma = word
+                processed.extend(shard_processed)
+                for key, count in shard_corrections.items():
+                    corrections[key] += count
+                # collect lemmas cached by workers
+                lemmas.update(new_lemmas)
 
-        # place back in correct text chunk
-        processed_chunks[chunk_ix].append(lemma)
-
-    # join words within each chunk
-    return [' '.join(c) for c in processed_chunks]
+    if correction_counter is not None:
+        for key, count in corrections.items():
+            correction_counter[key] += count
+    if lemma_cache is not None:
+        _save_lemma_cache(lemma_cache, lemmas)
+    return processed
 
 
 def r2z(r, fix_inf=False):
@@ -766,7 +1278,15 @@ def r2z(r, fix_inf=False):
     return zs
 
 
-def rbf_sum(obs_coords, pred_coords, width, metric='euclidean'):
+def rbf_sum(
+        obs_coords,
+        pred_coords,
+        width,
+        metric='euclidean',
+        tol=None,
+        dtype=np.float64,
+        chunk_size=1000
+):
     """
     Given a set of observed coordinates and predicted coordinates,
     computes the (unweighted) sum of Gaussian radial basis functions
@@ -787,6 +1307,20 @@ def rbf_sum(obs_coords, pred_coords, width, metric='euclidean'):
         coordinates (default: `'euclidean'`, Euclidean distance). May be
         any named metric accepted by `scipy.spatial.distance.cdist` or a
         callable that takes two `array_like` arguments.
+    tol : float, optional
+        If passed, truncate each RBF where its value falls below `tol`.
+        Pairs of coordinates farther apart than `sqrt(-width *
+        log(tol))` are skipped using a KD-tree neighbor search rather
+        than evaluated, so the full (x, y) distance matrix is never
+        constructed. Requires `metric='euclidean'`. If None (default),
+        every pair of coordinates is evaluated.
+    dtype : numpy.dtype, optional
+        The dtype used to evaluate the kernel and of the returned array
+        (default: `numpy.float64`). Passing `numpy.float32` halves the
+        memory needed for kernel values.
+    chunk_size : int, optional
+        When `tol` is passed, the number of observed coordinates whose
+        RBFs are evaluated at once (default: 1,000).
 
     Returns
     -------
@@ -794,8 +1328,30 @@ def rbf_sum(obs_coords, pred_coords, width, metric='euclidean'):
         A 1-d array of summed RBFs evaluated at each coordinate given by
         `pred_coords`.
     """
-    dmat = cdist(obs_coords, pred_coords, metric=metric)
-    return np.exp(-dmat ** 2 / width).sum(axis=0)
+    from scipy.spatial import cKDTree
+    from scipy.spatial.distance import cdist
+
+    dtype = np.dtype(dtype)
+    if tol is None:
+        dmat = cdist(obs_coords, pred_coords, metric=metric).astype(dtype, copy=False)
+        return np.exp(-dmat ** 2 / dtype.type(width)).sum(axis=0)
+    if metric != 'euclidean':
+        raise ValueError("Truncated RBFs (tol is not None) require "
+                         "metric='euclidean'")
+
+    obs_coords = np.asarray(obs_coords)
+    pred_tree = cKDTree(pred_coords)
+    summed = np.zeros(pred_tree.n, dtype=dtype)
+    for start in range(0, len(obs_coords), chunk_size):
+        rbfs = _sparse_rbf(obs_coords[start:start + chunk_size],
+                           pred_tree,
+                           width=width,
+                           tol=tol,
+                           dtype=dtype)
+        summed += np.bincount(rbfs.indices,
+                              weights=rbfs.data,
+                              minlength=pred_tree.n).astype(dtype, copy=False)
+    return summed
 
 
 def reconstruct_trace(lecture, questions, accuracy):
@@ -818,6 +1374,8 @@ def reconstruct_trace(lecture, questions, accuracy):
         was answered correctly (`True`|`1`) or incorrectly
         (`False`/`0`).
     """
+    from scipy.spatial.distance import cdist
+
     assert len(questions) == len(accuracy)
     acc = np.array(accuracy, dtype=bool)
 
@@ -834,15 +1392,89 @@ def reconstruct_trace(lecture, questions, accuracy):
     return b / a
 
 
+def reconstruct_traces(lecture, question_vectors, qid_matrix, accuracy_matrix):
+    """
+    Reconstructs knowledge traces for many participants and quizzes at
+    once. Equivalent to calling `reconstruct_trace` separately for each
+    (quiz, participant) pair, but computes the lecture-question
+    correlation matrix only once and builds all traces from a single
+    masked matrix product.
+
+    Parameters
+    ----------
+    lecture : numpy.ndarray
+        `(n_coordinates, n_features)` matrix of coordinates for which to
+        estimate knowledge.
+    question_vectors : numpy.ndarray
+        `(n_questions, n_features)` matrix of coordinates for *all*
+        quiz questions, ordered by question ID (i.e., the row for
+        question ID `q` is `question_vectors[q - 1]`).
+    qid_matrix : array_like
+        `(n_quizzes, n_participants, n_observations)` integer array of
+        (1-indexed) IDs of the questions used to estimate each
+        participant's knowledge on each quiz. Participants who answered
+        fewer than `n_observations` questions may be padded with `0`s,
+        which are ignored.
+    accuracy_matrix : array_like
+        `(n_quizzes, n_participants, n_observations)` binary array
+        denoting whether each question in `qid_matrix` was answered
+        correctly (`True`|`1`) or incorrectly (`False`/`0`).
+
+    Returns
+    -------
+    numpy.ndarray
+        A C-contiguous `(n_quizzes, n_participants, n_coordinates)`
+        array of knowledge traces.
+    """
+    from scipy.spatial.distance import cdist
+
+    qids = np.asarray(qid_matrix, dtype=int)
+    acc = np.asarray(accuracy_matrix, dtype=bool)
+    assert qids.shape == acc.shape and qids.ndim == 3
+
+    # compute timepoints by questions weights matrix (shared by all
+    # participants)
+    wz = 1 - cdist(lecture, question_vectors, metric='correlation')
+    # (n_quizzes, n_participants, n_questions) number of times each
+    # participant answered each question (correctly) on each quiz.
+    # Repeated questions are weighted once per response, as in
+    # `reconstruct_trace`
+    quiz_ix, part_ix, obs_ix = np.nonzero(qids > 0)
+    q_ix = qids[quiz_ix, part_ix, obs_ix] - 1
+    seen = np.zeros((*qids.shape[:2], len(question_vectors)))
+    np.add.at(seen, (quiz_ix, part_ix, q_ix), 1)
+    correct = np.zeros_like(seen)
+    np.add.at(correct, (quiz_ix, part_ix, q_ix), acc[quiz_ix, part_ix, obs_ix])
+    # `reconstruct_trace` min-max normalizes the weights for each
+    # participant's questions. The scaling term cancels out of the
+    # ratio, so only the minimum over each participant's questions is
+    # needed
+    wz_min = np.where(seen.astype(bool), wz.min(axis=0), np.inf).min(axis=2)
+    wz_min = wz_min[:, :, None]
+    # sum over questions (total possible weights for each timepoint)
+    a = seen @ wz.T
+    a -= wz_min * seen.sum(axis=2, keepdims=True)
+    # sum weights from correctly answered questions at each timepoint
+    b = correct @ wz.T
+    b -= wz_min * correct.sum(axis=2, keepdims=True)
+    # divide weight from correct answers by total possible weight
+    b /= a
+    return b
+
+
 def set_figure_style():
     """
     Sets some helpful `matplotlib`  options for figures generated for
     the paper. This gets called automatically whenever `khan_helpers` is
-    imported, but occasionally needs to be called again manually when
+    imported from an IPython session (e.g., a notebook), but
+    occasionally needs to be called again manually when
     some other function has overwritten the relevant
     `matplotlib.rcParams` (e.g., inside `seaborn.axes_style` context
     managers).
     """
+    import matplotlib.pyplot as plt
+    from matplotlib import font_manager
+
     # embed text in PDFs for illustrator
     plt.rcParams['pdf.fonttype'] = 42
 
@@ -881,6 +1513,9 @@ def show_source(obj):
         If `obj` is a code object, an `IPython.display.HTML` object.
         Otherwise, the original `obj`.
     """
+    from IPython.core.oinspect import pylight
+    from IPython.display import HTML
+
     try:
         src = getsource(obj)
     except TypeError as e:
@@ -893,6 +1528,7 @@ def show_source(obj):
         return src
 
 
+@lru_cache(maxsize=4096)
 def synset_match(word, min_similarity=0.6):
     """
     Attempts to identify the proper lemma for a given `word`. Searches
@@ -919,6 +1555,8 @@ def synset_match(word, min_similarity=0.6):
         The lemma for the given `word`, if one was identified.
         Otherwise, the original `word`.
     """
+    from nltk.corpus import wordnet
+
     possible_matches = []
     for synset in wordnet.synsets(word):
         for lemma in synset.lemmas():
@@ -948,6 +1586,68 @@ def synset_match(word, min_similarity=0.6):
         return close_matches[0]
 
 
+def window_term_matrix(transcript, cv, wsize=LECTURE_WSIZE):
+    """
+    Computes the document-term matrix of a lecture transcript's sliding
+    windows (i.e., `cv.transform(parse_windows(transcript, wsize)[0])`)
+    without tokenizing each overlapping window separately.
+
+    Each line of the transcript is tokenized and counted once, and each
+    window's counts are computed as the sum of the counts for the lines
+    it spans (a sparse product with a banded window-by-line indicator
+    matrix). This gives identical results to transforming the joined
+    windows when `cv` counts single words, since windows are joined
+    with spaces and words can't span lines. For other analyzers (e.g.,
+    n-grams of more than one word, which can span lines), the joined
+    windows are transformed directly.
+
+    Parameters
+    ----------
+    transcript : str
+        The lecture transcript as a single string, with alternating,
+        '\n'-separated lines of timestamps and transcribed speech.
+    cv : sklearn.feature_extraction.text.CountVectorizer
+        A fit `CountVectorizer`.
+    wsize : int, optional
+        The number of text lines comprising each sliding window (with
+        tapering window sizes at the beginning and end).  Defaults to
+        `khan_helpers.constants.LECTURE_WSIZE`.
+
+    Returns
+    -------
+    dtm : scipy.sparse.csr_matrix
+        The (windows, vocabulary) document-term matrix.
+    timestamps : list of float
+        The timestamps corresponding to each window.
+    """
+    from scipy.sparse import csr_matrix
+
+    text_lines, ts_lines = _split_transcript(transcript)
+    bounds = np.array(_window_bounds(len(ts_lines), len(text_lines), wsize))
+    starts, ends = bounds.T
+    timestamps = list((np.take(ts_lines, starts) + np.take(ts_lines, ends - 1)) / 2)
+
+    if cv.analyzer != 'word' or tuple(cv.ngram_range) != (1, 1):
+        windows = (window for window, _ in iter_windows(transcript, wsize))
+        return cv.transform(windows), timestamps
+
+    line_counts = cv.transform(text_lines)
+    # (n_windows, n_lines) indicator of the lines in each window
+    n_win_lines = np.clip(np.minimum(ends, len(text_lines)) - starts, 0, None)
+    rows = np.repeat(np.arange(len(bounds)), n_win_lines)
+    win_offsets = np.repeat(np.cumsum(n_win_lines) - n_win_lines, n_win_lines)
+    cols = np.arange(n_win_lines.sum()) - win_offsets + np.repeat(starts, n_win_lines)
+    window_lines = csr_matrix(
+        (np.ones(len(rows), dtype=line_counts.dtype), (rows, cols)),
+        shape=(len(bounds), len(text_lines))
+    )
+    dtm = (window_lines @ line_counts).tocsr()
+    if cv.binary:
+        dtm.data[:] = 1
+    dtm.sort_indices()
+    return dtm, timestamps
+
+
 def z2r(z):
     """
     Computes the inverse Fisher *z*-transformation.
@@ -0,0 +1,186 @@
+"""
+numba-compiled functions. Kept separate from `khan_helpers.functions`
+so that numba is only imported once one of them is needed.
+
+All kernels in the package (here and in `khan_helpers.stats`) cache
+their compiled code on disk, so only the first process to use a kernel
+after it changes pays to compile it. Worker processes can call
+`warm_up` at startup (e.g., as a pool `initializer`) to load every
+kernel before their first job.
+"""
+import math
+
+import numba
+import numpy as np
+
+
+@numba.njit(cache=True)
+def _find_peaks_2d(M, min_prominence, min_width, rel_height):
+    """
+    Finds peaks (and merged intervals around them) in each column of
+    `M`. Follows the algorithms used by `scipy.signal.find_peaks` with
+    the `prominence`, `width`, and `rel_height` arguments.
+    """
+    n_tpts, n_cols = M.shape
+    max_peaks = n_cols * (n_tpts // 2 + 1)
+    peak_cols = np.empty(max_peaks, dtype=np.int64)
+    peaks = np.empty(max_peaks, dtype=np.int64)
+    prominences = np.empty(max_peaks)
+    widths = np.empty(max_peaks)
+    left_ips = np.empty(max_peaks)
+    right_ips = np.empty(max_peaks)
+    interval_cols = np.empty(max_peaks, dtype=np.int64)
+    onsets = np.empty(max_peaks, dtype=np.int64)
+    offsets = np.empty(max_peaks, dtype=np.int64)
+    n_peaks = 0
+    n_intervals = 0
+
+    for col in range(n_cols):
+        x = M[:, col]
+        col_start = n_peaks
+        # local maxima (middle of flat peaks)
+        i = 1
+        while i < n_tpts - 1:
+            if x[i - 1] < x[i]:
+                i_ahead = i + 1
+                while i_ahead < n_tpts - 1 and x[i_ahead] == x[i]:
+                    i_ahead += 1
+                if x[i_ahead] < x[i]:
+                    peak = (i + i_ahead - 1) // 2
+                    # prominence
+                    left_min = x[peak]
+                    left_base = peak
+                    j = peak
+                    while 0 <= j and x[j] <= x[peak]:
+                        if x[j] < left_min:
+                            left_min = x[j]
+                            left_base = j
+                        j -= 1
+                    right_min = x[peak]
+                    right_base = peak
+                    j = peak
+                    while j < n_tpts and x[j] <= x[peak]:
+                        if x[j] < right_min:
+                            right_min = x[j]
+                            right_base = j
+                        j += 1
+                    prominence = x[peak] - max(left_min, right_min)
+                    if prominence >= min_prominence:
+                        # width at `rel_height` of prominence
+                        height = x[peak] - prominence * rel_height
+                        j = peak
+                        while left_base < j and height < x[j]:
+                            j -= 1
+                        left_ip = float(j)
+                        if x[j] < height:
+                            left_ip += (height - x[j]) / (x[j + 1] - x[j])
+                        j = peak
+                        while j < right_base and height < x[j]:
+                            j += 1
+                        right_ip = float(j)
+                        if x[j] < height:
+                            right_ip -= (height - x[j]) / (x[j - 1] - x[j])
+                        if right_ip - left_ip >= min_width:
+                            peak_cols[n_peaks] = col
+                            peaks[n_peaks] = peak
+                            prominences[n_peaks] = prominence
+                            widths[n_peaks] = right_ip - left_ip
+                            left_ips[n_peaks] = left_ip
+                            right_ips[n_peaks] = right_ip
+                            n_peaks += 1
+                    i = i_ahead
+            i += 1
+
+        # merge overlapping intervals around this column's peaks
+        for k in range(col_start, n_peaks):
+            onset = max(int(np.floor(left_ips[k])) - 1, 0)
+            offset = int(np.ceil(right_ips[k])) - 1
+            if (
+                    k > col_start and
+                    onsets[n_intervals - 1] <= onset <= offsets[n_intervals - 1]
+            ):
+                offsets[n_intervals - 1] = max(offsets[n_intervals - 1], offset)
+            else:
+                interval_cols[n_intervals] = col
+                onsets[n_intervals] = onset
+                offsets[n_intervals] = offset
+                n_intervals += 1
+
+    return (peak_cols[:n_peaks], peaks[:n_peaks], prominences[:n_peaks],
+            widths[:n_peaks], left_ips[:n_peaks], right_ips[:n_peaks],
+            interval_cols[:n_intervals], onsets[:n_intervals],
+            offsets[:n_intervals])
+
+
+@numba.njit(cache=True)
+def correlation_exp(x, y):
+    """
+    Computes the correlation distance between two n-dimensional
+    vectors, exponentiating each element first. Returns the result and
+    the gradient of the distance function with respect to `x`.
+
+    Parameters
+    ----------
+    x, y : numpy.ndarray
+        The two vectors to compare. Must have the same shape.
+
+    Returns
+    -------
+    dist : float
+        Correlation distance between the two vectors.
+    grad : numpy.ndarray
+        Gradient of the distance with respect to `x`.
+    """
+    x = math.e ** x
+    y = math.e ** y
+    mu_x = 0.0
+    mu_y = 0.0
+    norm_x = 0.0
+    norm_y = 0.0
+    dot_product = 0.0
+
+    for i in range(x.shape[0]):
+        mu_x += x[i]
+        mu_y += y[i]
+
+    mu_x /= x.shape[0]
+    mu_y /= x.shape[0]
+
+    for i in range(x.shape[0]):
+        shifted_x = x[i] - mu_x
+        shifted_y = y[i] - mu_y
+        norm_x += shifted_x ** 2
+        norm_y += shifted_y ** 2
+        dot_product += shifted_x * shifted_y
+
+    if norm_x == 0.0 and norm_y == 0.0:
+        dist = 0.0
+        grad = np.zeros(x.shape)
+    elif dot_product == 0.0:
+        dist = 1.0
+        grad = np.zeros(x.shape)
+    else:
+        dist = 1.0 - (dot_product / np.sqrt(norm_x * norm_y))
+        grad = ((x - mu_x) / norm_x - (y - mu_y) / dot_product) * dist
+
+    return dist, grad
+
+
+def warm_up():
+    """
+    Compiles, or loads from numba's on-disk cache, every numba kernel
+    in the package for the argument types the package calls it with.
+    Can be passed as the `initializer` of a process pool so workers
+    don't compile kernels during their first jobs.
+    """
+    from . import stats
+
+    # UMAP calls metrics with float32 data, other callers use float64
+    for dtype in (np.float32, np.float64):
+        x = np.arange(1, 4, dtype=dtype)
+        correlation_exp(x, x[::-1].copy())
+    _find_peaks_2d(np.zeros((3, 1)), 0.0, 0.0, 0.5)
+    M = np.arange(4, dtype=np.float64).reshape(2, 2)
+    stats._bootstrap_means(M, 2, 0, False, 0)
+    stats._bootstrap_pearsonr(M, M, 2, 0)
+    stats._percentiles(M, 2.5, 97.5, False)
@@ -0,0 +1,259 @@
+import numpy as np
+
+from .experiment import LazyLoader
+from .functions import _sparse_rbf
+
+
+class MapGrid:
+    """
+    A regular 2D grid of vertices spanning a region of embedding space,
+    at which knowledge maps are evaluated.
+
+    Vertex `(i, j)` of the grid lies at `(xs[j], ys[i])`, so row `i` of
+    a map corresponds to the `i`th y-coordinate. Coordinates can be
+    converted between embedding ("world") space and the grid's pixel
+    space for overlaying lectures and questions on plotted maps.
+    """
+    vertices = LazyLoader('_build_vertices')
+
+    def __init__(self, lower, upper, resolution):
+        """
+        Parameters
+        ----------
+        lower, upper : array_like
+            The (x, y) coordinates of the grid's lower and upper bounds.
+        resolution : int
+            The number of vertices along each side of the grid.
+        """
+        self.lower = np.asarray(lower, dtype=np.float64)
+        self.upper = np.asarray(upper, dtype=np.float64)
+        self.resolution = int(resolution)
+
+    def __repr__(self):
+        return (f'MapGrid(lower={self.lower.tolist()}, '
+                f'upper={self.upper.tolist()}, resolution={self.resolution})')
+
+    @classmethod
+    def from_embeddings(cls, *embeddings, resolution, padding=3):
+        """
+        Creates a grid spanning one or more sets of embedded coordinates.
+
+        Parameters
+        ----------
+        *embeddings : numpy.ndarray
+            `(n, 2)` arrays of embedded coordinates (e.g., lecture
+            trajectories and question embeddings) the grid should cover.
+        resolution : int
+            The number of vertices along each side of the grid.
+        padding : scalar, optional
+            The distance to pad the grid beyond the (floored) bounds of
+            the embeddings so that extreme points aren't on the edges of
+            plotted maps (default: 3).
+
+        Returns
+        -------
+        khan_helpers.knowledge_maps.MapGrid
+            The grid.
+        """
+        coords = np.vstack(embeddings)
+        lower = coords.min(axis=0) // 1 - padding
+        upper = coords.max(axis=0) // 1 + padding
+        return cls(lower, upper, resolution)
+
+    @property
+    def xs(self):
+        return np.linspace(self.lower[0], self.upper[0], self.resolution)
+
+    @property
+    def ys(self):
+        return np.linspace(self.lower[1], self.upper[1], self.resolution)
+
+    @property
+    def shape(self):
+        return self.resolution, self.resolution
+
+    @property
+    def grid(self):
+        """An `(H, W, 2)` view of the grid's vertex coordinates"""
+        return self.vertices.reshape(*self.shape, 2)
+
+    def pixel_to_world(self, coords):
+        """
+        Converts coordinates in the grid's pixel space to embedding
+        space (the inverse of `world_to_pixel`).
+
+        Parameters
+        ----------
+        coords : array_like
+            An `(..., 2)` array of pixel-space coordinates.
+
+        Returns
+        -------
+        numpy.ndarray
+            The corresponding embedding-space coordinates.
+        """
+        coords = np.asarray(coords, dtype=np.float64)
+        return coords * ((self.upper - self.lower) / self.resolution) + self.lower
+
+    def world_to_pixel(self, coords):
+        """
+        Converts coordinates in embedding space to the grid's pixel
+        space, in which the grid's bounds lie at `0` and `resolution`
+        along each axis (matching the extent of a plotted map).
+
+        Parameters
+        ----------
+        coords : array_like
+            An `(..., 2)` array of embedding-space coordinates.
+
+        Returns
+        -------
+        numpy.ndarray
+            The corresponding pixel-space coordinates.
+        """
+        coords = np.asarray(coords, dtype=np.float64)
+        return (coords - self.lower) * (self.resolution / (self.upper - self.lower))
+
+    def _build_vertices(self):
+        # (H * W, 2) vertex coordinates in row-major order
+        xs, ys = self.xs, self.ys
+        return np.column_stack((np.tile(xs, len(ys)), np.repeat(ys, len(xs))))
+
+
+class KnowledgeMapper:
+    """
+    Constructs knowledge maps for many participants at once.
+
+    A participant's knowledge map is the sum of Gaussian RBFs centered
+    on the embeddings of the questions they answered correctly, divided
+    by the sum of RBFs centered on all questions they answered, each
+    evaluated at every vertex of a 2D grid (see
+    `khan_helpers.functions.rbf_sum`). Since every participant answers
+    questions from the same set, the RBF for each question is evaluated
+    once and stored as a `(n_questions, n_vertices)` basis, and all
+    participants' maps are computed as matrix products with it.
+    """
+    def __init__(
+            self,
+            question_embeddings,
+            map_grid,
+            width,
+            metric='euclidean',
+            tol=None,
+            dtype=np.float64
+    ):
+        """
+        Parameters
+        ----------
+        question_embeddings : numpy.ndarray
+            An `(n_questions, 2)` array of embedded question coordinates,
+            where row `i` corresponds to question ID `i + 1`.
+        map_grid : khan_helpers.knowledge_maps.MapGrid or numpy.ndarray
+            The grid, or an `(H, W, 2)` array of grid vertex coordinates,
+            at which to evaluate knowledge.
+        width : scalar
+            The width of the Gaussian kernel.
+        metric : str or callable, optional
+            The metric used to compute distances between questions and
+            vertices (default: `'euclidean'`). May be any named metric
+            accepted by `scipy.spatial.distance.cdist` or a callable that
+            takes two `array_like` arguments.
+        tol : float, optional
+            If passed, truncate each RBF where its value falls below
+            `tol` and store the basis as a sparse matrix (see
+            `khan_helpers.functions.rbf_sum`). Requires
+            `metric='euclidean'`. Vertices beyond the truncation radius
+            of all questions a participant answered are NaN in their
+            map. If None (default), the basis is dense.
+        dtype : numpy.dtype, optional
+            The dtype of the basis and of the constructed maps (default:
+            `numpy.float64`).
+        """
+        self.question_embeddings = np.asarray(question_embeddings)
+        if isinstance(map_grid, MapGrid):
+            map_grid = map_grid.grid
+        self.map_grid = np.asarray(map_grid)
+        self.width = width
+        self.metric = metric
+        self.tol = tol
+        self.dtype = np.dtype(dtype)
+        vertices = self.map_grid.reshape(-1, self.map_grid.shape[-1])
+        # RBF centered on each question, evaluated at each vertex
+        if tol is None:
+            from scipy.spatial.distance import cdist
+
+            dmat = cdist(self.question_embeddings, vertices, metric=metric)
+            self.basis = np.exp(-dmat.astype(self.dtype, copy=False) ** 2
+                                / self.dtype.type(width))
+        elif metric != 'euclidean':
+            raise ValueError("Truncated RBFs (tol is not None) require "
+                             "metric='euclidean'")
+        else:
+            self.basis = _sparse_rbf(self.question_embeddings,
+                                     vertices,
+                                     width=width,
+                                     tol=tol,
+                                     dtype=self.dtype)
+
+    def __repr__(self):
+        return (f'KnowledgeMapper(n_questions={self.n_questions}, '
+                f'grid_shape={self.grid_shape}, width={self.width})')
+
+    @property
+    def grid_shape(self):
+        return self.map_grid.shape[:-1]
+
+    @property
+    def n_questions(self):
+        return self.basis.shape[0]
+
+    def construct_maps(self, qid_matrix, accuracy_matrix, chunk_size=64):
+        """
+        Computes knowledge maps from participants' graded responses.
+
+        Parameters
+        ----------
+        qid_matrix : array_like
+            An array of question IDs whose last axis indexes responses,
+            e.g. the `(n_quizzes, n_participants, n_observations)` array
+            returned by `Experiment.get_response_arrays`. Question IDs of
+            `0` are treated as padding and ignored.
+        accuracy_matrix : array_like
+            An array of the same shape as `qid_matrix` containing the
+            accuracy of each response.
+        chunk_size : int, optional
+            The number of maps to compute at once (default: 64). Limits
+            the size of intermediate arrays for large grids.
+
+        Returns
+        -------
+        numpy.ndarray
+            An array of knowledge maps with shape `(*qid_matrix.shape[:-1],
+            H, W)` (e.g., `(n_quizzes, n_participants, H, W)`). Maps with
+            no responses are filled with NaN.
+        """
+        qids = np.asarray(qid_matrix, dtype=int)
+        acc = np.asarray(accuracy_matrix, dtype=bool)
+        assert qids.shape == acc.shape, "qid_matrix and accuracy_matrix must " \
+                                        "have the same shape"
+        lead_shape = qids.shape[:-1]
+        qids = qids.reshape(-1, qids.shape[-1])
+        acc = acc.reshape(qids.shape)
+
+        # number of times each question was answered (correctly) for
+        # each map
+        map_ix, obs_ix = np.nonzero(qids > 0)
+        q_ix = qids[map_ix, obs_ix] - 1
+        seen = np.zeros((len(qids), self.n_questions), dtype=self.dtype)
+        np.add.at(seen, (map_ix, q_ix), 1)
+        correct = np.zeros_like(seen)
+        np.add.at(correct, (map_ix, q_ix), acc[map_ix, obs_ix])
+
+        maps = np.empty((len(qids), self.basis.shape[1]), dtype=self.dtype)
+        with np.errstate(invalid='ignore'):
+            for start in range(0, len(qids), chunk_size):
+                chunk = slice(start, start + chunk_size)
+                np.divide(correct[chunk] @ self.basis,
+                          seen[chunk] @ self.basis,
+                          out=maps[chunk])
+        return maps.reshape(*lead_shape, *self.grid_shape)
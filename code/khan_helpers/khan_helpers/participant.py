@@ -1,5 +1,6 @@
 import pickle
 from ast import literal_eval
+from functools import lru_cache
 from html import unescape
 from pathlib import Path
 
@@ -8,41 +9,108 @@ import pandas as pd
 from .constants import PARTICIPANTS_DIR, RAW_DIR
 
 
+_FALLBACK_MSG = "Attribute only set for participant created from raw PsiTurk data"
+
+
+def load_question_bank(questions_path=None):
+    # quiz questions & answers in the format used for grading
+    if questions_path is None:
+        questions_path = RAW_DIR.joinpath('questions.tsv')
+    return pd.read_csv(questions_path,
+                       sep='\t',
+                       names=['index', 'video', 'question',
+                              'A', 'B', 'C', 'D'],
+                       index_col='index')
+
+
+def build_question_index(all_questions):
+    """
+    Builds a lookup table for grading participants' responses.
+
+    Parameters
+    ----------
+    all_questions : pandas.DataFrame
+        The question bank, as returned by `load_question_bank`.
+
+    Returns
+    -------
+    dict
+        Maps the normalized text of each question to a 3-tuple of its
+        question ID, the lecture it's about, and a dict that maps the
+        normalized text of each answer choice to its letter.
+    """
+    question_index = {}
+    for qid, row in all_questions.iterrows():
+        answers = {}
+        for letter in 'ABCD':
+            answers.setdefault(_normalize_text(row[letter]), letter)
+        question_index.setdefault(_normalize_text(row['question']),
+                                  (qid, row['video'], answers))
+    return question_index
+
+
+@lru_cache(maxsize=None)
+def _default_question_index():
+    # built once per process and shared by all participants
+    return build_question_index(load_question_bank())
+
+
+def _normalize_text(text):
+    # deal with HTML characters & curly apostrophes
+    return unescape(text).replace(chr(8217), "'")
+
+
 class Participant:
     """Class to manage data for individual participants"""
-    def __init__(self, subid, data=None, raw_data=None, date_collected=None):
+    def __init__(
+            self,
+            subid,
+            data=None,
+            raw_data=None,
+            date_collected=None,
+            raw_data_loader=None
+    ):
         self.subID = subid
         self.data = data
-        _fallback_msg = ("Attribute only set for participant created from raw "
-                         "PsiTurk data")
-        if raw_data is None:
-            self.raw_data = _fallback_msg
-        else:
+        if raw_data is not None:
             self.raw_data = raw_data
+        elif raw_data_loader is not None:
+            # raw data is read on first access (see `__getattr__`)
+            self._raw_data_loader = raw_data_loader
+        else:
+            self.raw_data = _FALLBACK_MSG
         if date_collected is None:
-            self.date_collected = _fallback_msg
+            self.date_collected = _FALLBACK_MSG
         else:
             self.date_collected = date_collected
         self.traces = {}
         self.knowledge_maps = {}
 
+    def __getattr__(self, name):
+        # only called if normal attribute lookup fails. Defers loading
+        # raw data for participants created with a `raw_data_loader`
+        # until it's actually needed
+        loader = self.__dict__.get('_raw_data_loader')
+        if name == 'raw_data' and loader is not None:
+            self.raw_data = loader(self.subID)
+            return self.raw_data
+        raise AttributeError(
+            f"'{type(self).__name__}' object has no attribute '{name}'"
+        )
+
     @classmethod
-    def from_psiturk(cls, psiturk_data, subid):
+    def from_psiturk(cls, psiturk_data, subid, question_index=None):
+        # `question_index` (see `build_question_index`) may be passed to
+        # grade against a question bank other than the default one
         raw_data = literal_eval(psiturk_data['datastring'])
         date_collected = psiturk_data['beginhit'].split()[0]
         p = cls(subid=subid, raw_data=raw_data, date_collected=date_collected)
-        p.data = p._grade()
+        p.data = p._grade(question_index=question_index)
         return p
 
     @property
-    def all_questions(self, questions_path=None):
-        if questions_path is None:
-            questions_path = RAW_DIR.joinpath('questions.tsv')
-        return pd.read_csv(questions_path,
-                           sep='\t',
-                           names=['index', 'video', 'question',
-                                  'A', 'B', 'C', 'D'],
-                           index_col='index')
+    def all_questions(self):
+        return load_question_bank()
 
     def __repr__(self):
         output = f'Participant(subid="{self}"'
@@ -56,39 +124,36 @@ class Participant:
     def __eq__(self, other):
         return self.subID == other
 
-    def _grade(self):
+    def _grade(self, question_index=None):
         # grades raw data to set self.data
         data = []
         question_blocks = (3, 8, 13)
-        all_qs = self.all_questions
+        if question_index is None:
+            question_index = _default_question_index()
         for set_num, qblock in enumerate(question_blocks):
             question_block = self.raw_data['data'][qblock]['trialdata']
             answer_block = literal_eval(
                 self.raw_data['data'][qblock + 1]['trialdata']['responses']
             )
             for q_num, q in enumerate(question_block):
-                # deal with HTML characters
-                q_text = unescape(q['prompt']).replace(chr(8217), "'")
-                # match question text to question in dataset
-                q_info = all_qs.loc[all_qs.question == q_text]
-                # error on failure to match questions
-                if not q_info.values.any():
-                    raise KeyError(f"failed to find question matching {q_text}")
-                # set qID and reference lecture
-                qid = q_info.index[0]
-                lec = q_info.loc[qid, 'video']
+                q_text = _normalize_text(q['prompt'])
+                # match question text to question in dataset to get qID,
+                # reference lecture, and answer choices
+                try:
+                    qid, lec, answers = question_index[q_text]
+                except KeyError as e:
+                    raise KeyError(
+                        f"failed to find question matching {q_text}"
+                    ) from e
                 # get answer
-                ans_text = unescape(answer_block[f'Q{q_num}'])
-                ans_text = ans_text.replace(chr(8217), "'")
-                # error on failure to match question or unexpected letter
+                ans_text = _normalize_text(answer_block[f'Q{q_num}'])
+                # error on failure to match answer
                 try:
-                    ans_let = q_info.squeeze()[q_info.squeeze() == ans_text].index[0]
-                except IndexError as e:
+                    ans_let = answers[ans_text]
+                except KeyError as e:
                     raise KeyError(
                         f"failed to find answer matching {ans_text}"
                     ) from e
-                assert ans_let in 'ABCD', f"found answer code {ans_let}, " \
-                                          f"expected one of: 'A', 'B', 'C', 'D'"
                 # set accuracy for response
                 acc = 1 if ans_let == 'A' else 0
                 data.append([qid, acc, ans_let, set_num, lec])
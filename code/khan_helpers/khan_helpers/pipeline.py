@@ -0,0 +1,471 @@
+"""
+Pipeline for (re)fitting the text and embedding models used across the
+notebooks: lecture sliding windows -> CountVectorizer -> LDA -> topic
+trajectories, plus a higher-dimensional LDA model whose topic vectors
+are embedded in 2D with UMAP.
+
+Each stage's artifact is cached on disk under a key that hashes the
+content of the pipeline's input data, the stage's hyperparameters, and
+the keys of the stages it depends on. Changing, e.g., the question bank
+therefore only reruns the stages downstream of the question text, and
+rerunning an unchanged pipeline only loads its cached artifacts.
+"""
+import os
+import pickle
+from functools import partial
+from hashlib import sha1
+from pathlib import Path
+from types import CodeType
+
+import numpy as np
+
+from .constants import EMBS_DIR, MODELS_DIR, RAW_DIR, TRAJS_DIR
+from .functions import interp_lecture
+
+
+def _package_version(package):
+    # installed version of a distribution (None if it isn't installed),
+    # read from its metadata rather than by importing it
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        return version(package)
+    except PackageNotFoundError:
+        return None
+
+
+def _update_hash(digest, obj):
+    # feeds a (nested) parameter value or input dataset into `digest`
+    # in a way that doesn't depend on object identity
+    if isinstance(obj, np.ndarray):
+        obj = np.ascontiguousarray(obj)
+        digest.update(f'ndarray{obj.dtype.str}{obj.shape}'.encode())
+        if obj.dtype == object:
+            digest.update(pickle.dumps(obj.tolist()))
+        else:
+            digest.update(obj.tobytes())
+    elif isinstance(obj, dict):
+        # in a fixed order, so equal dicts get the same hash regardless
+        # of insertion order
+        digest.update(b'dict')
+        for key, value in sorted(obj.items(), key=lambda item: repr(item[0])):
+            _update_hash(digest, key)
+            _update_hash(digest, value)
+    elif isinstance(obj, (list, tuple)):
+        digest.update(type(obj).__name__.encode())
+        for item in obj:
+            _update_hash(digest, item)
+    elif isinstance(obj, CodeType):
+        digest.update(obj.co_code)
+        digest.update(repr(obj.co_names).encode())
+        for const in obj.co_consts:
+            _update_hash(digest, const)
+    elif isinstance(obj, partial):
+        digest.update(b'partial')
+        _update_hash(digest, (obj.func, obj.args, obj.keywords))
+    elif callable(obj):
+        func = getattr(obj, 'py_func', obj)
+        if hasattr(func, '__qualname__'):
+            # functions (including numba-compiled functions) and classes
+            # by name, and functions by compiled code, so editing a
+            # function's body changes the key. Builtin methods have no
+            # `__module__`
+            module = getattr(func, '__module__', None)
+            digest.update(f'{module}.{func.__qualname__}'.encode())
+            if hasattr(func, '__code__'):
+                _update_hash(digest, func.__code__)
+        else:
+            # callable instances by class, `__call__` method, and
+            # attributes
+            cls = type(func)
+            digest.update(f'{cls.__module__}.{cls.__qualname__}'.encode())
+            _update_hash(digest, cls.__call__)
+            _update_hash(digest, getattr(func, '__dict__', {}))
+    else:
+        digest.update(repr(obj).encode())
+
+
+class Stage:
+    """
+    Descriptor class that declares a step of a `ModelPipeline`.
+    Accessing the attribute returns the stage's artifact, which is
+    loaded from the pipeline's cache if one was previously computed
+    from the same inputs and hyperparameters, or computed (along with
+    any invalidated upstream stages) otherwise.
+    """
+    def __init__(self, runner, deps=(), params=(), packages=()):
+        """
+        Parameters
+        ----------
+        runner : str
+            The name of the pipeline method that computes the artifact.
+        deps : tuple of str, optional
+            The names of the stages and pipeline inputs the stage uses.
+        params : tuple of str, optional
+            The names of pipeline attributes holding the stage's
+            hyperparameters.
+        packages : tuple of str, optional
+            The distribution names of packages whose installed versions
+            affect the artifact (e.g., the library that fits a model).
+        """
+        self.runner = runner
+        self.deps = deps
+        self.params = params
+        self.packages = packages
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        return obj._get_artifact(self.name)
+
+
+class ModelPipeline:
+    """
+    Fits the CountVectorizer, LDA, and UMAP models and computes the
+    topic trajectories and 2D embeddings stored in `MODELS_DIR`,
+    `TRAJS_DIR`, and `EMBS_DIR`, following notebooks 1 and 7.
+
+    Stages are attributes whose values are computed on first access.
+    Artifacts are cached in memory and, if `cache_dir` is set, on disk,
+    keyed by a content hash of everything they were computed from (see
+    `stage_key`).
+    """
+    inputs = ('lectures', 'quiz_text')
+
+    corpus = Stage('_build_corpus', deps=('lectures',))
+    cv = Stage('_fit_cv',
+               deps=('corpus',),
+               params=('cv_params',),
+               packages=('scikit-learn',))
+    lda = Stage('_fit_lda',
+                deps=('cv', 'corpus'),
+                params=('n_topics', 'lda_params'),
+                packages=('scikit-learn',))
+    trajectories = Stage('_transform_trajectories',
+                         deps=('cv', 'lda', 'lectures', 'quiz_text'),
+                         packages=('scipy', 'scikit-learn'))
+    embedding_lda = Stage('_fit_embedding_lda',
+                          deps=('cv', 'corpus'),
+                          params=('embedding_n_topics', 'lda_params'),
+                          packages=('scikit-learn',))
+    embedding_vectors = Stage('_transform_embedding_vectors',
+                              deps=('cv', 'embedding_lda', 'lectures',
+                                    'quiz_text'),
+                              packages=('scipy', 'scikit-learn'))
+    umap = Stage('_fit_umap',
+                 deps=('embedding_vectors',),
+                 params=('umap_params',),
+                 packages=('numba', 'umap-learn'))
+    embeddings = Stage('_split_embeddings', deps=('umap', 'embedding_vectors'))
+
+    def __init__(
+            self,
+            lectures,
+            quiz_text,
+            cache_dir=None,
+            n_topics=15,
+            embedding_n_topics=100,
+            cv_params=None,
+            lda_params=None,
+            umap_params=None,
+            n_jobs=None
+    ):
+        """
+        Parameters
+        ----------
+        lectures : dict
+            Maps each lecture's name (e.g., `'forces'`) to a tuple of its
+            preprocessed sliding windows and their timestamps (see
+            `khan_helpers.functions.parse_windows`). The models are fit
+            to all lectures' windows, in order.
+        quiz_text : numpy.ndarray
+            An `(n_questions, 5)` array of preprocessed quiz text, where
+            the first column contains question text and the remaining
+            columns contain the text of each answer choice.
+        cache_dir : str or pathlib.Path, optional
+            Directory in which to persist stage artifacts across
+            sessions. If None (default), artifacts are computed once per
+            `ModelPipeline` instance and not saved.
+        n_topics : int, optional
+            The number of topics in the LDA model used to compute topic
+            trajectories (default: 15).
+        embedding_n_topics : int, optional
+            The number of topics in the LDA model whose topic vectors
+            are embedded with UMAP (default: 100).
+        cv_params : dict, optional
+            Keyword arguments passed to
+            `sklearn.feature_extraction.text.CountVectorizer`.
+        lda_params : dict, optional
+            Keyword arguments passed to both
+            `sklearn.decomposition.LatentDirichletAllocation` models
+            (default: `{'random_state': 0}`).
+        umap_params : dict, optional
+            Keyword arguments passed to `umap.UMAP` (default:
+            `{'metric': correlation_exp, 'random_state': 15}`). If
+            `'random_state'` is set, numpy's global random state is also
+            seeded with it before fitting.
+        n_jobs : int, optional
+            The number of CPU cores used to fit the LDA models and the
+            UMAP model. If None (default), models are fit on a single
+            core; `-1` uses all available cores. Note that `umap.UMAP`
+            only runs in parallel if `umap_params['random_state']` is
+            None. Doesn't affect stages' cache keys.
+        """
+        from .kernels import correlation_exp
+
+        self.lectures = {name: (np.asarray(windows), np.asarray(timestamps))
+                         for name, (windows, timestamps) in lectures.items()}
+        self.quiz_text = np.asarray(quiz_text)
+        self.cache_dir = None if cache_dir is None else Path(cache_dir)
+        self.n_topics = n_topics
+        self.embedding_n_topics = embedding_n_topics
+        self.cv_params = {} if cv_params is None else dict(cv_params)
+        self.lda_params = {'random_state': 0} if lda_params is None else dict(lda_params)
+        self.umap_params = {
+            'metric': correlation_exp,
+            'random_state': 15
+        } if umap_params is None else dict(umap_params)
+        self.n_jobs = n_jobs
+        # stage name -> (key, artifact)
+        self._artifacts = {}
+        # input datasets are assumed not to change after initialization
+        self._input_keys = {}
+
+    def __repr__(self):
+        return (f'ModelPipeline(lectures={list(self.lectures)}, '
+                f'n_questions={len(self.quiz_text)}, cache_dir={self.cache_dir})')
+
+    @classmethod
+    def from_experiment(cls, exp=None, **kwargs):
+        """
+        Creates a pipeline from the preprocessed lecture windows and
+        quiz text saved by notebook 1.
+
+        Parameters
+        ----------
+        exp : khan_helpers.Experiment, optional
+            The `Experiment` from which to load the lecture windows and
+            timestamps. If None (default), a new one is created.
+        **kwargs
+            Keyword arguments passed to `ModelPipeline`.
+
+        Returns
+        -------
+        khan_helpers.pipeline.ModelPipeline
+            The pipeline.
+        """
+        if exp is None:
+            from .experiment import Experiment
+
+            exp = Experiment()
+        lectures = {lecture: (getattr(exp, f'{lecture}_windows'),
+                              getattr(exp, f'{lecture}_timestamps'))
+                    for lecture in ('forces', 'bos')}
+        quiz_text = np.load(RAW_DIR.joinpath('quiz_text_processed.npy'))
+        return cls(lectures, quiz_text, **kwargs)
+
+    @property
+    def stage_names(self):
+        # stages in the order they're declared (upstream first)
+        return [name for name, attr in vars(type(self)).items()
+                if isinstance(attr, Stage)]
+
+    def export(self, models_dir=MODELS_DIR, trajs_dir=TRAJS_DIR, embs_dir=EMBS_DIR):
+        """
+        Saves the fit models, topic trajectories, and 2D embeddings
+        under the file names `Experiment` loads them from, running any
+        invalidated stages first.
+
+        Parameters
+        ----------
+        models_dir, trajs_dir, embs_dir : str or pathlib.Path, optional
+            The directories in which to save the fit models, topic
+            trajectories, and embeddings, respectively (default:
+            `khan_helpers.constants.MODELS_DIR`, `TRAJS_DIR`, and
+            `EMBS_DIR`).
+        """
+        for model, stage in (('CV', 'cv'), ('LDA', 'lda'), ('UMAP', 'umap')):
+            np.save(Path(models_dir).joinpath(f'fit_{model}.npy'),
+                    getattr(self, stage))
+        for dirpath, stage in ((trajs_dir, 'trajectories'),
+                               (embs_dir, 'embeddings')):
+            for fname, arr in getattr(self, stage).items():
+                np.save(Path(dirpath).joinpath(f'{fname}.npy'), arr)
+
+    def run(self, stages=None):
+        """
+        Runs (or loads the cached artifacts of) pipeline stages and
+        their upstream stages.
+
+        Parameters
+        ----------
+        stages : sequence of str, optional
+            The names of the stages to run. Defaults to all stages.
+
+        Returns
+        -------
+        dict
+            Maps each requested stage's name to its artifact.
+        """
+        stages = self.stage_names if stages is None else list(stages)
+        return {stage: getattr(self, stage) for stage in stages}
+
+    def stage_key(self, name):
+        """
+        Computes the cache key for a stage's artifact (or an input
+        dataset) from a hash of the input data, hyperparameters, and
+        package versions it depends on.
+
+        Parameters
+        ----------
+        name : str
+            The name of the stage or input.
+
+        Returns
+        -------
+        str
+            The key.
+        """
+        if name in self.inputs:
+            if name not in self._input_keys:
+                digest = sha1()
+                _update_hash(digest, getattr(self, name))
+                self._input_keys[name] = digest.hexdigest()
+            return self._input_keys[name]
+
+        stage = getattr(type(self), name)
+        digest = sha1(name.encode())
+        for param in stage.params:
+            _update_hash(digest, (param, getattr(self, param)))
+        for package in stage.packages:
+            _update_hash(digest, (package, _package_version(package)))
+        for dep in stage.deps:
+            _update_hash(digest, (dep, self.stage_key(dep)))
+        return digest.hexdigest()
+
+    def stale_stages(self):
+        """
+        Lists the stages that would be (re)computed when the pipeline is
+        run because no artifact matching their current inputs and
+        hyperparameters is cached.
+
+        Returns
+        -------
+        list of str
+            The names of the stale stages.
+        """
+        stale = []
+        for name in self.stage_names:
+            key = self.stage_key(name)
+            in_memory = self._artifacts.get(name, (None,))[0] == key
+            on_disk = (self.cache_dir is not None
+                       and self._artifact_path(name, key).is_file())
+            if not (in_memory or on_disk):
+                stale.append(name)
+        return stale
+
+    def _artifact_path(self, name, key):
+        return self.cache_dir.joinpath(name, f'{key[:16]}.p')
+
+    def _get_artifact(self, name):
+        key = self.stage_key(name)
+        if self._artifacts.get(name, (None,))[0] == key:
+            return self._artifacts[name][1]
+
+        path = None if self.cache_dir is None else self._artifact_path(name, key)
+        if path is not None and path.is_file():
+            artifact = pickle.loads(path.read_bytes())
+        else:
+            artifact = getattr(self, getattr(type(self), name).runner)()
+            if path is not None:
+                # write to a temporary file first so an interrupted write
+                # is never loaded as a complete artifact
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_suffix('.tmp')
+                tmp_path.write_bytes(pickle.dumps(artifact))
+                tmp_path.replace(path)
+        self._artifacts[name] = (key, artifact)
+        return artifact
+
+    def _n_jobs(self):
+        if self.n_jobs is None:
+            return 1
+        elif self.n_jobs == -1:
+            return os.cpu_count()
+        return self.n_jobs
+
+    ##########################################
+    #                 STAGES                 #
+    ##########################################
+    def _build_corpus(self):
+        return np.concatenate([windows for windows, _ in self.lectures.values()])
+
+    def _fit_cv(self):
+        from sklearn.feature_extraction.text import CountVectorizer
+
+        return CountVectorizer(**self.cv_params).fit(self.corpus)
+
+    def _fit_lda(self):
+        return self._run_lda(self.n_topics)
+
+    def _fit_embedding_lda(self):
+        return self._run_lda(self.embedding_n_topics)
+
+    def _run_lda(self, n_components):
+        from sklearn.decomposition import LatentDirichletAllocation
+
+        lda = LatentDirichletAllocation(n_components=n_components,
+                                        n_jobs=self._n_jobs(),
+                                        **self.lda_params)
+        lda.fit(self.cv.transform(self.corpus))
+        # don't store the number of cores used with the fit model
+        return lda.set_params(n_jobs=None)
+
+    def _transform(self, lda, texts):
+        return lda.transform(self.cv.transform(np.ravel(texts)))
+
+    def _transform_trajectories(self):
+        lda = self.lda
+        trajs = {
+            f'{lecture}_lecture': interp_lecture(self._transform(lda, windows),
+                                                 timestamps)
+            for lecture, (windows, timestamps) in self.lectures.items()
+        }
+        trajs['all_questions'] = self._transform(lda, self.quiz_text[:, 0])
+        answers = self.quiz_text[:, 1:]
+        trajs['all_answers'] = self._transform(lda, answers).reshape(
+            *answers.shape, -1
+        )
+        return trajs
+
+    def _transform_embedding_vectors(self):
+        lda = self.embedding_lda
+        vectors = {
+            f'{lecture}_lecture': interp_lecture(self._transform(lda, windows),
+                                                 timestamps)
+            for lecture, (windows, timestamps) in self.lectures.items()
+        }
+        vectors['questions'] = self._transform(lda, self.quiz_text[:, 0])
+        return vectors
+
+    def _fit_umap(self):
+        from umap import UMAP
+
+        # lectures & questions are embedded in a common space
+        to_reduce = np.log(np.vstack(list(self.embedding_vectors.values())))
+        random_state = self.umap_params.get('random_state')
+        if random_state is not None:
+            np.random.seed(random_state)
+            # umap-learn can't fit in parallel reproducibly
+            n_jobs = 1
+        else:
+            n_jobs = self._n_jobs()
+        return UMAP(n_jobs=n_jobs, **self.umap_params).fit(to_reduce)
+
+    def _split_embeddings(self):
+        vectors = self.embedding_vectors
+        split_inds = np.cumsum([len(vecs) for vecs in vectors.values()])[:-1]
+        return dict(zip(vectors, np.vsplit(self.umap.embedding_, split_inds)))
@@ -0,0 +1,295 @@
+"""
+Bootstrap resampling kernels shared by the plotting and statistics
+helpers in `khan_helpers.functions`.
+
+Resamples are drawn index-by-index inside compiled loops, so resampled
+copies of the data are never materialized. Each row (or pair of rows)
+of the input gets its own random stream, seeded from `random_state` and
+the row's index, so results are reproducible regardless of the number
+of threads numba runs on.
+"""
+import numba
+import numpy as np
+
+
+@numba.njit(cache=True)
+def _row_seed(seed, row):
+    # derive a distinct 32-bit seed for each row's random stream
+    return (seed + row * 2654435761) % 4294967296
+
+
+@numba.njit(parallel=True, error_model='numpy', cache=True)
+def _bootstrap_means(M, n_boots, seed, ignore_nan, row_offset):
+    n_rows, n_obs = M.shape
+    boot_means = np.empty((n_rows, n_boots))
+    for row in numba.prange(n_rows):
+        np.random.seed(_row_seed(seed, row_offset + row))
+        for boot in range(n_boots):
+            total = 0.0
+            count = 0
+            for _ in range(n_obs):
+                val = M[row, np.random.randint(0, n_obs)]
+                if ignore_nan and np.isnan(val):
+                    continue
+                total += val
+                count += 1
+            boot_means[row, boot] = total / count
+    return boot_means
+
+
+@numba.njit(parallel=True, error_model='numpy', cache=True)
+def _bootstrap_pearsonr(X, Y, n_boots, seed):
+    n_pairs, n_obs = X.shape
+    boot_rs = np.empty((n_pairs, n_boots))
+    for row in numba.prange(n_pairs):
+        np.random.seed(_row_seed(seed, row))
+        # shift by the first observation to reduce cancellation error in
+        # the single-pass sums of squares
+        x_shift = X[row, 0]
+        y_shift = Y[row, 0]
+        for boot in range(n_boots):
+            sum_x = 0.0
+            sum_y = 0.0
+            sum_xx = 0.0
+            sum_yy = 0.0
+            sum_xy = 0.0
+            for _ in range(n_obs):
+                ix = np.random.randint(0, n_obs)
+                x = X[row, ix] - x_shift
+                y = Y[row, ix] - y_shift
+                sum_x += x
+                sum_y += y
+                sum_xx += x * x
+                sum_yy += y * y
+                sum_xy += x * y
+            x_ss = sum_xx - sum_x * sum_x / n_obs
+            y_ss = sum_yy - sum_y * sum_y / n_obs
+            xy_sp = sum_xy - sum_x * sum_y / n_obs
+            boot_rs[row, boot] = xy_sp / np.sqrt(x_ss * y_ss)
+    return boot_rs
+
+
+@numba.njit(parallel=True, cache=True)
+def _percentiles(boots, q_low, q_high, ignore_nan):
+    n_rows = boots.shape[0]
+    ci_low = np.empty(n_rows)
+    ci_high = np.empty(n_rows)
+    for row in numba.prange(n_rows):
+        if ignore_nan:
+            ci_low[row] = np.nanpercentile(boots[row], q_low)
+            ci_high[row] = np.nanpercentile(boots[row], q_high)
+        else:
+            ci_low[row] = np.percentile(boots[row], q_low)
+            ci_high[row] = np.percentile(boots[row], q_high)
+    return ci_low, ci_high
+
+
+def _as_rows(arr):
+    arr = np.ascontiguousarray(arr, dtype=np.float64)
+    return np.atleast_2d(arr), arr.ndim == 1
+
+
+def _resolve_seed(random_state):
+    if random_state is None:
+        # draw from numpy's global random state so `np.random.seed` still
+        # makes results reproducible
+        return np.random.randint(0, 2 ** 32 - 1)
+    elif np.ndim(random_state) == 0:
+        return int(random_state) % 2 ** 32
+    # derive a single seed from a sequence of seeds (anything accepted by
+    # `np.random.seed`)
+    return int(np.random.RandomState(random_state).randint(0, 2 ** 32 - 1,
+                                                            dtype=np.int64))
+
+
+def bootstrap_means(
+        M,
+        n_boots=1000,
+        ignore_nan=False,
+        random_state=0,
+        row_offset=0
+):
+    """
+    Computes the means of full-size bootstrap resamples (drawn with
+    replacement) of each row of `M`.
+
+    Parameters
+    ----------
+    M : array_like
+        A 1-D array of observations, or a (rows, observations) array to
+        resample each row independently.
+    n_boots : int, optional
+        The number of bootstrap resamples to draw (default: 1,000).
+    ignore_nan : bool, optional
+        If True (default: False), exclude NaNs from each resample's mean.
+    random_state : int or array_like, optional
+        The random seed to use for reproducibility (default: 0). May be
+        anything accepted by `numpy.random.seed`. If None, a seed is
+        drawn from numpy's global random state.
+    row_offset : int, optional
+        The index of `M`'s first row within a larger array (default: 0).
+        Each row's random stream is seeded from its index in the larger
+        array, so processing the array in blocks of rows gives the same
+        results as processing it all at once.
+
+    Returns
+    -------
+    numpy.ndarray
+        A (rows, n_boots) array of resample means (or a 1-D array of
+        length `n_boots` if `M` is 1-D).
+    """
+    M, squeeze = _as_rows(M)
+    boot_means = _bootstrap_means(M, n_boots, _resolve_seed(random_state),
+                                  ignore_nan, row_offset)
+    return boot_means[0] if squeeze else boot_means
+
+
+def bootstrap_pearsonr(x, y, n_boots=10000, random_state=0):
+    """
+    Computes the Pearson correlation between paired bootstrap resamples
+    (drawn with replacement) of `x` and `y`.
+
+    Parameters
+    ----------
+    x, y : array_like
+        The two 1-D arrays of data to correlate, or two (pairs,
+        observations) arrays to compute correlations for many pairs of
+        rows at once.
+    n_boots : int, optional
+        The number of bootstrap resamples to draw (default: 10,000).
+    random_state : int or array_like, optional
+        The random seed to use for reproducibility (default: 0). May be
+        anything accepted by `numpy.random.seed`. If None, a seed is
+        drawn from numpy's global random state.
+
+    Returns
+    -------
+    numpy.ndarray
+        A (pairs, n_boots) array of correlation coefficients (or a 1-D
+        array of length `n_boots` if `x` and `y` are 1-D).
+    """
+    x, squeeze = _as_rows(x)
+    y, _ = _as_rows(y)
+    if x.shape != y.shape:
+        raise ValueError(
+            f"x and y must have the same shape (got {x.shape} and {y.shape})"
+        )
+    boot_rs = _bootstrap_pearsonr(x, y, n_boots, _resolve_seed(random_state))
+    return boot_rs[0] if squeeze else boot_rs
+
+
+def percentile_ci(boots, ci=95, ignore_nan=False):
+    """
+    Computes the bounds of a percentile confidence interval from a set of
+    bootstrap estimates.
+
+    Parameters
+    ----------
+    boots : array_like
+        A 1-D array of bootstrap estimates, or a (rows, n_boots) array to
+        compute an interval for each row.
+    ci : float, optional
+        The size of the confidence interval as a percentage (default:
+        95).
+    ignore_nan : bool, optional
+        If True (default: False), ignore NaNs in the bootstrap estimates.
+
+    Returns
+    -------
+    ci_low, ci_high : float or numpy.ndarray
+        The lower and upper bounds of the confidence interval (1-D arrays
+        if `boots` is 2-D).
+    """
+    boots, squeeze = _as_rows(boots)
+    ci_low, ci_high = _percentiles(boots, (100 - ci) / 2, (100 + ci) / 2,
+                                   ignore_nan)
+    if squeeze:
+        return ci_low[0], ci_high[0]
+    return ci_low, ci_high
+
+
+def bootstrap_mean_ci(
+        M,
+        ci=95,
+        n_boots=1000,
+        ignore_nan=False,
+        random_state=0,
+        row_offset=0
+):
+    """
+    Computes the bootstrap-estimated confidence interval of the mean of
+    each row of `M`.
+
+    Parameters
+    ----------
+    M : array_like
+        A 1-D array of observations, or a (rows, observations) array.
+    ci : float, optional
+        The size of the confidence interval as a percentage (default:
+        95).
+    n_boots : int, optional
+        The number of bootstrap resamples to draw (default: 1,000).
+    ignore_nan : bool, optional
+        If True (default: False), ignore NaNs in all calculations.
+    random_state : int or array_like, optional
+        The random seed to use for reproducibility (default: 0). May be
+        anything accepted by `numpy.random.seed`, but a sequence of
+        seeds is reduced to a single derived seed, and each row is
+        resampled from its own stream (see `khan_helpers.stats`). So a
+        given seed doesn't reproduce intervals computed with
+        `numpy.random.seed(random_state)` and a single resampling
+        matrix, as `khan_helpers.functions.pearsonr_ci` and the
+        notebooks previously did. If None, a seed is drawn from numpy's
+        global random state.
+    row_offset : int, optional
+        The index of `M`'s first row within a larger array (default: 0;
+        see `bootstrap_means`).
+
+    Returns
+    -------
+    ci_low, ci_high : float or numpy.ndarray
+        The lower and upper bounds of the confidence interval (1-D arrays
+        if `M` is 2-D).
+    """
+    boot_means = bootstrap_means(M, n_boots=n_boots, ignore_nan=ignore_nan,
+                                 random_state=random_state,
+                                 row_offset=row_offset)
+    return percentile_ci(boot_means, ci=ci, ignore_nan=ignore_nan)
+
+
+def bootstrap_pearsonr_ci(x, y, ci=95, n_boots=10000, random_state=0):
+    """
+    Computes the bootstrap-estimated confidence interval of the Pearson
+    correlation between `x` and `y`.
+
+    Parameters
+    ----------
+    x, y : array_like
+        The two 1-D arrays of data to correlate, or two (pairs,
+        observations) arrays to compute intervals for many pairs of rows
+        at once.
+    ci : float, optional
+        The size of the confidence interval as a percentage (default:
+        95).
+    n_boots : int, optional
+        The number of bootstrap resamples to draw (default: 10,000).
+    random_state : int or array_like, optional
+        The random seed to use for reproducibility (default: 0). May be
+        anything accepted by `numpy.random.seed`, but a sequence of
+        seeds is reduced to a single derived seed, and each row is
+        resampled from its own stream (see `khan_helpers.stats`). So a
+        given seed doesn't reproduce intervals computed with
+        `numpy.random.seed(random_state)` and a single resampling
+        matrix, as `khan_helpers.functions.pearsonr_ci` and the
+        notebooks previously did. If None, a seed is drawn from numpy's
+        global random state.
+
+    Returns
+    -------
+    ci_low, ci_high : float or numpy.ndarray
+        The lower and upper bounds of the confidence interval (1-D arrays
+        if `x` and `y` are 2-D).
+    """
+    boot_rs = bootstrap_pearsonr(x, y, n_boots=n_boots,
+                                 random_state=random_state)
+    return percentile_ci(boot_rs, ci=ci)
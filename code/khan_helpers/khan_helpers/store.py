@@ -0,0 +1,337 @@
+import json
+import pickle
+import shutil
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .constants import STORE_DIR
+from .participant import _FALLBACK_MSG, Participant
+
+
+class ParticipantStore:
+    """
+    Columnar on-disk storage for all participants' data.
+
+    Graded responses are stored as one table with a separate `.npy`
+    file per column, and each set of knowledge traces or knowledge
+    maps (e.g., `'forces_quiz0'`) as a single array stacked along the
+    first axis in participant order. Each participant's raw PsiTurk
+    data is pickled separately and only read when accessed.
+    `Participant` objects built from the store hold views over these
+    arrays rather than their own copies of the data.
+
+    Each write creates a new generation of the store's arrays in a
+    fresh directory, then points the store's manifest at it. The
+    manifest is replaced atomically, so an interrupted write leaves the
+    previous generation intact.
+    """
+    response_columns = ('qID', 'accuracy', 'response', 'quiz', 'lecture')
+
+    def __init__(self, path=STORE_DIR, mmap=False):
+        """
+        Parameters
+        ----------
+        path : str or pathlib.Path, optional
+            The directory containing the store (default:
+            `khan_helpers.constants.STORE_DIR`). Created on first write
+            if it doesn't exist.
+        mmap : bool, optional
+            If True (default: False), open stored arrays as read-only
+            memory-mapped arrays.
+        """
+        self.path = Path(path)
+        self.mmap = mmap
+        self._arrays = {}
+
+    def __contains__(self, subid):
+        return self.exists and str(subid) in self._subid_rows
+
+    def __getstate__(self):
+        # don't pickle loaded (possibly memory-mapped) arrays
+        return {'path': self.path, 'mmap': self.mmap}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._arrays = {}
+
+    def __len__(self):
+        return len(self.subids) if self.exists else 0
+
+    def __repr__(self):
+        return f'ParticipantStore(path="{self.path}", n_participants={len(self)})'
+
+    @property
+    def exists(self):
+        return self._manifest_path.is_file()
+
+    @property
+    def subids(self):
+        return self._load('subids').tolist()
+
+    @property
+    def trace_keys(self):
+        return self._array_keys('traces')
+
+    @property
+    def kmap_keys(self):
+        return self._array_keys('knowledge_maps')
+
+    @property
+    def _manifest_path(self):
+        return self.path.joinpath('manifest.json')
+
+    @property
+    def _data_dir(self):
+        # the current generation's directory. Cached with the loaded
+        # arrays so they're all read from the same generation
+        if '_data_dir' not in self._arrays:
+            manifest = json.loads(self._manifest_path.read_text())
+            self._arrays['_data_dir'] = self.path.joinpath(manifest['generation'])
+        return self._arrays['_data_dir']
+
+    @property
+    def _subid_rows(self):
+        if '_subid_rows' not in self._arrays:
+            self._arrays['_subid_rows'] = {s: i for i, s in enumerate(self.subids)}
+        return self._arrays['_subid_rows']
+
+    @property
+    def _offsets(self):
+        # start and end row of each participant's responses
+        if '_offsets' not in self._arrays:
+            counts = self._load('n_responses')
+            self._arrays['_offsets'] = np.concatenate(([0], np.cumsum(counts)))
+        return self._arrays['_offsets']
+
+    def load_participant(self, subid):
+        """
+        Builds a `Participant` from the stored data.
+
+        Parameters
+        ----------
+        subid : str
+            The participant's subject ID.
+
+        Returns
+        -------
+        khan_helpers.Participant
+            The participant. Its `traces` and `knowledge_maps` are views
+            over the stored arrays and its `raw_data` is read from disk
+            on first access.
+        """
+        try:
+            row = self._subid_rows[str(subid)]
+        except KeyError as e:
+            raise KeyError(f"No participant stored under {subid}") from e
+
+        start, end = self._offsets[row:row + 2]
+        if start == end:
+            data = None
+        else:
+            data = pd.DataFrame({
+                col: self._load(f'responses/{col}')[start:end]
+                for col in self.response_columns
+            })
+        p = Participant(subid=str(subid),
+                        data=data,
+                        date_collected=str(self._load('dates')[row]),
+                        raw_data_loader=self.load_raw_data)
+        for key in self.trace_keys:
+            trace = self._load(f'traces/{key}')[row]
+            if not np.isnan(trace).all():
+                p.store_trace(trace=trace, store_key=key)
+        for key in self.kmap_keys:
+            kmap = self._load(f'knowledge_maps/{key}')[row]
+            if not np.isnan(kmap).all():
+                p.store_kmap(kmap=kmap, store_key=key)
+        return p
+
+    def load_raw_data(self, subid):
+        """Reads a participant's raw PsiTurk data from the store."""
+        fname = self._load('raw_files')[self._subid_rows[str(subid)]]
+        if not fname:
+            return _FALLBACK_MSG
+        return pickle.loads(self.path.joinpath('raw', fname).read_bytes())
+
+    def load_responses(self, subids=None):
+        """
+        Loads (a subset of) participants' graded responses as a single
+        table.
+
+        Parameters
+        ----------
+        subids : sequence of str, optional
+            The participants whose responses to load. Defaults to all
+            participants in the store.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Graded responses, indexed by (subject ID, response number),
+            in the same format as `Experiment.all_data`.
+        """
+        counts = self._load('n_responses')
+        subid_col = np.repeat(self._load('subids'), counts)
+        resp_num = np.arange(len(subid_col)) - np.repeat(self._offsets[:-1], counts)
+        data = pd.DataFrame(
+            {col: self._load(f'responses/{col}') for col in self.response_columns},
+            index=pd.MultiIndex.from_arrays([subid_col, resp_num])
+        )
+        if subids is not None:
+            data = data.loc[list(map(str, subids))]
+        return data
+
+    def write(self, participants, allow_overwrite=False):
+        """
+        Adds participants to the store, or updates stored participants.
+        All stored response columns, traces, and knowledge maps are
+        rewritten (to a new generation of the store), but raw data is
+        only written for the given participants.
+
+        Parameters
+        ----------
+        participants : iterable of khan_helpers.Participant
+            The participants to write.
+        allow_overwrite : bool, optional
+            If True (default: False), replace the stored data for any
+            participants already in the store. Otherwise, those
+            participants are skipped with a warning.
+        """
+        to_write = {}
+        skipped = []
+        for p in participants:
+            if str(p) in self and not allow_overwrite:
+                skipped.append(str(p))
+            else:
+                to_write[str(p)] = p
+        if skipped:
+            warnings.warn(f"{len(skipped)} participant(s) not saved because they "
+                          f"already exist in {self}: {', '.join(skipped)}. Set "
+                          "allow_overwrite to True to replace the existing data")
+        if not to_write:
+            return
+
+        old_rows = dict(self._subid_rows) if self.exists else {}
+        subids = list(old_rows) + [s for s in to_write if s not in old_rows]
+
+        if self.exists:
+            generation = int(self._data_dir.name.split('-')[1]) + 1
+        else:
+            generation = 0
+        gen_dir = self.path.joinpath(f'gen-{generation:06d}')
+        # remove files left by a previously interrupted write
+        shutil.rmtree(gen_dir, ignore_errors=True)
+
+        # raw data (only for participants whose raw data is in memory)
+        self.path.joinpath('raw').mkdir(parents=True, exist_ok=True)
+        raw_files = {}
+        for subid, p in to_write.items():
+            raw_data = p.__dict__.get('raw_data')
+            if isinstance(raw_data, dict):
+                raw_files[subid] = f'{subid}.{generation}.p'
+                self.path.joinpath('raw', raw_files[subid]).write_bytes(
+                    pickle.dumps(raw_data)
+                )
+
+        # graded responses & participant info
+        response_cols = {col: [] for col in self.response_columns}
+        n_responses = []
+        dates = []
+        for subid in subids:
+            if subid in to_write:
+                p = to_write[subid]
+                data = {} if p.data is None else p.data
+                n_responses.append(len(data))
+                dates.append(p.date_collected)
+                for col, values in response_cols.items():
+                    if len(data):
+                        values.append(np.asarray(data[col]))
+            else:
+                row = old_rows[subid]
+                start, end = self._offsets[row:row + 2]
+                n_responses.append(end - start)
+                dates.append(self._load('dates')[row])
+                for col, values in response_cols.items():
+                    values.append(self._load(f'responses/{col}')[start:end])
+
+        # traces & knowledge maps
+        stacked = {}
+        for attr, dirname, keys in (('traces', 'traces', self.trace_keys),
+                                    ('knowledge_maps', 'knowledge_maps', self.kmap_keys)):
+            new_keys = {k for p in to_write.values() for k in getattr(p, attr)}
+            for key in new_keys.union(keys):
+                old_arr = self._load(f'{dirname}/{key}') if key in keys else None
+                if old_arr is not None:
+                    item_shape = old_arr.shape[1:]
+                else:
+                    item_shape = next(np.shape(getattr(p, attr)[key])
+                                      for p in to_write.values()
+                                      if key in getattr(p, attr))
+                arr = np.full((len(subids), *item_shape), np.nan)
+                for row, subid in enumerate(subids):
+                    if subid in to_write:
+                        p_arrs = getattr(to_write[subid], attr)
+                        if key in p_arrs:
+                            arr[row] = p_arrs[key]
+                    elif old_arr is not None:
+                        arr[row] = old_arr[old_rows[subid]]
+                stacked[f'{dirname}/{key}'] = arr
+
+        # participants whose raw data wasn't written keep their old file
+        for subid in subids:
+            if subid not in raw_files:
+                if subid in old_rows:
+                    raw_files[subid] = self._load('raw_files')[old_rows[subid]]
+                else:
+                    raw_files[subid] = ''
+
+        for col, values in response_cols.items():
+            values = np.concatenate(values) if values else np.array([], dtype=int)
+            if values.dtype == object:
+                values = values.astype(str)
+            self._save(gen_dir, f'responses/{col}', values)
+        for relpath, arr in stacked.items():
+            self._save(gen_dir, relpath, arr)
+        self._save(gen_dir, 'n_responses', np.array(n_responses, dtype=int))
+        self._save(gen_dir, 'dates', np.array(dates, dtype=str))
+        self._save(gen_dir, 'raw_files',
+                   np.array([raw_files[subid] for subid in subids], dtype=str))
+        self._save(gen_dir, 'subids', np.array(subids, dtype=str))
+
+        # switch to the new generation. Replacing the manifest is atomic,
+        # so readers see either the old generation or the new one
+        tmp_path = self._manifest_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps({'generation': gen_dir.name}))
+        tmp_path.replace(self._manifest_path)
+        self._arrays = {}
+
+        # remove the previous generation & raw data files it alone used.
+        # Existing memory maps of removed files remain valid
+        for old_dir in self.path.glob('gen-*'):
+            if old_dir != gen_dir:
+                shutil.rmtree(old_dir, ignore_errors=True)
+        current_raw_files = set(raw_files.values())
+        for raw_path in self.path.glob('raw/*.p'):
+            if raw_path.name not in current_raw_files:
+                raw_path.unlink()
+
+    def _array_keys(self, dirname):
+        if not self.exists:
+            return []
+        return sorted(f.stem for f in self._data_dir.glob(f'{dirname}/*.npy'))
+
+    def _load(self, relpath):
+        if relpath not in self._arrays:
+            path = self._data_dir.joinpath(f'{relpath}.npy')
+            self._arrays[relpath] = np.load(path,
+                                            mmap_mode='r' if self.mmap else None)
+        return self._arrays[relpath]
+
+    @staticmethod
+    def _save(gen_dir, relpath, arr):
+        path = gen_dir.joinpath(f'{relpath}.npy')
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.save(path, arr)
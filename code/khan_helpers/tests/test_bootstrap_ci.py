@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from khan_helpers.functions import bootstrap_ci
+from khan_helpers.stats import bootstrap_mean_ci
+
+
+@pytest.fixture
+def M():
+    rng = np.random.default_rng(0)
+    M = rng.normal(size=(37, 20))
+    M[rng.random(M.shape) < 0.05] = np.nan
+    return M
+
+
+@pytest.mark.parametrize('chunk_size', [100, 700, 1000, 3000, 10 ** 6])
+def test_chunk_size_invariance(M, chunk_size):
+    # chunks of 1, 7, 10, 30 and all timepoints
+    unchunked = bootstrap_ci(M, n_boots=100, ignore_nan=True, random_state=0)
+    chunked = bootstrap_ci(M, n_boots=100, ignore_nan=True,
+                           chunk_size=chunk_size, random_state=0)
+    np.testing.assert_array_equal(chunked, unchunked)
+
+
+def test_matches_bootstrap_mean_ci(M):
+    ci_low, ci_high = bootstrap_ci(M, ci=90, n_boots=200, ignore_nan=True,
+                                   random_state=4)
+    expected = bootstrap_mean_ci(M, ci=90, n_boots=200, ignore_nan=True,
+                                 random_state=4)
+    np.testing.assert_array_equal(ci_low, expected[0])
+    np.testing.assert_array_equal(ci_high, expected[1])
+    assert (ci_low <= np.nanmean(M, axis=1)).all()
+    assert (ci_high >= np.nanmean(M, axis=1)).all()
+
+
+def test_global_random_state(M):
+    np.random.seed(0)
+    first = bootstrap_ci(M, n_boots=100, ignore_nan=True, chunk_size=500)
+    np.random.seed(0)
+    second = bootstrap_ci(M, n_boots=100, ignore_nan=True)
+    np.testing.assert_array_equal(first, second)
+
+
+def test_plot_positional_args(M):
+    # arguments that predate `chunk_size`/`random_state` keep their positions
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from khan_helpers.functions import bootstrap_ci_plot
+
+    fig, ax = plt.subplots()
+    try:
+        ax_, ci_low, ci_high = bootstrap_ci_plot(M, 95, 100, True, 'C1', 0.3,
+                                                 True, 'obs', ax,
+                                                 random_state=0)
+    finally:
+        plt.close(fig)
+    assert ax_ is ax
+    assert ax.get_lines()[0].get_label() == 'obs'
+    expected = bootstrap_ci(M, ci=95, n_boots=100, ignore_nan=True,
+                            random_state=0)
+    np.testing.assert_array_equal(ci_low, expected[0])
+    np.testing.assert_array_equal(ci_high, expected[1])
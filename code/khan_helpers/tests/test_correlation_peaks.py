@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from scipy.signal import find_peaks
+
+from khan_helpers.functions import find_correlation_peaks
+
+
+@pytest.fixture
+def qcorrs():
+    # smooth timeseries with several bumps each, plus noise
+    rng = np.random.default_rng(0)
+    tpts = np.arange(400)[:, None]
+    n_cols = 30
+    qcorrs = np.zeros((len(tpts), n_cols))
+    for _ in range(6):
+        centers = rng.uniform(-20, 420, n_cols)
+        widths = rng.uniform(5, 40, n_cols)
+        heights = rng.uniform(0, 0.6, n_cols)
+        qcorrs += heights * np.exp(-(tpts - centers) ** 2 / (2 * widths ** 2))
+    qcorrs += rng.normal(scale=0.01, size=qcorrs.shape)
+    # a flat column (no peaks)
+    qcorrs[:, -1] = 0.2
+    return qcorrs
+
+
+def _reference(qcorrs, min_prominence, min_width, rel_height, decimals):
+    # peak detection & interval merging, one question at a time
+    peaks = []
+    intervals = []
+    for q_ix, tpt_corrs in enumerate(qcorrs.T):
+        padded = np.concatenate(([tpt_corrs.min()], tpt_corrs, [tpt_corrs.min()]))
+        if decimals is not None:
+            padded = padded.round(decimals)
+        q_peaks, peak_data = find_peaks(padded,
+                                        prominence=min_prominence,
+                                        width=min_width,
+                                        rel_height=rel_height)
+        for i, peak in enumerate(q_peaks):
+            peaks.append((q_ix, peak - 1, peak_data['prominences'][i],
+                          peak_data['widths'][i], peak_data['left_ips'][i],
+                          peak_data['right_ips'][i]))
+        if len(q_peaks) == 0:
+            continue
+
+        left_tpts = [max(int(np.floor(i) - 1), 0) for i in peak_data['left_ips']]
+        right_tpts = [int(np.ceil(i) - 1) for i in peak_data['right_ips']]
+        tpt_intervals = [[left_tpts[0], right_tpts[0]]]
+        for (onset_tpt, offset_tpt) in zip(left_tpts[1:], right_tpts[1:]):
+            if tpt_intervals[-1][0] <= onset_tpt <= tpt_intervals[-1][1]:
+                tpt_intervals[-1][1] = max(tpt_intervals[-1][1], offset_tpt)
+            else:
+                tpt_intervals.append([onset_tpt, offset_tpt])
+        intervals.extend((q_ix, onset, offset) for onset, offset in tpt_intervals)
+    return np.array(peaks).reshape(-1, 6), np.array(intervals).reshape(-1, 3)
+
+
+@pytest.mark.parametrize('min_prominence, min_width, rel_height, decimals', [
+    (0.1, 15, 0.5, 2),
+    (0.05, 5, 0.8, 2),
+    (0.02, 1, 1.0, None),
+    (0.1, 15, 0.3, 1)
+])
+def test_matches_scipy(qcorrs, min_prominence, min_width, rel_height, decimals):
+    peaks, intervals = find_correlation_peaks(qcorrs,
+                                              min_prominence=min_prominence,
+                                              min_width=min_width,
+                                              rel_height=rel_height,
+                                              decimals=decimals)
+    expected_peaks, expected_intervals = _reference(qcorrs, min_prominence,
+                                                    min_width, rel_height,
+                                                    decimals)
+    assert len(peaks) == len(expected_peaks) > 0
+    np.testing.assert_array_equal(peaks['question'], expected_peaks[:, 0])
+    np.testing.assert_array_equal(peaks['timepoint'], expected_peaks[:, 1])
+    for i, field in enumerate(['prominence', 'width', 'left_ip', 'right_ip'], start=2):
+        np.testing.assert_allclose(peaks[field], expected_peaks[:, i], rtol=1e-12)
+    np.testing.assert_array_equal(
+        np.column_stack((intervals['question'], intervals['onset'], intervals['offset'])),
+        expected_intervals
+    )
+
+
+def test_no_peaks(qcorrs):
+    peaks, intervals = find_correlation_peaks(qcorrs[:, -1:])
+    assert len(peaks) == len(intervals) == 0
+    assert peaks.dtype.names == ('question', 'timepoint', 'prominence', 'width',
+                                 'left_ip', 'right_ip')
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+import khan_helpers.experiment
+from khan_helpers import Experiment
+
+
+class StubReducer:
+    # stands in for a fit UMAP model; output depends on the global
+    # random state, like `UMAP.inverse_transform`
+    calls = 0
+
+    def __init__(self, scale=1, transform_seed=42):
+        self.scale = scale
+        self.transform_seed = transform_seed
+
+    def inverse_transform(self, X):
+        type(self).calls += 1
+        noise = np.random.random_sample((len(X), 3))
+        return np.hstack((X, noise)) * self.scale
+
+
+@pytest.fixture(autouse=True)
+def reset_calls():
+    StubReducer.calls = 0
+
+
+@pytest.fixture
+def coords():
+    return np.random.default_rng(0).uniform(-5, 5, (6, 2))
+
+
+def expected_vector(coord, seed, scale=1):
+    np.random.seed(seed)
+    return StubReducer(scale).inverse_transform(coord[None, :])[0]
+
+
+def test_caching(coords):
+    exp = Experiment()
+    exp.fit_umap = StubReducer()
+    first = exp.inverse_transform_coords(np.vstack((coords, coords[:2])))
+    assert StubReducer.calls == len(coords)
+    np.testing.assert_array_equal(first[-2:], first[:2])
+
+    second = exp.inverse_transform_coords(coords[::-1])
+    assert StubReducer.calls == len(coords)
+    np.testing.assert_array_equal(second, first[:len(coords)][::-1])
+
+
+def test_seeding(coords):
+    exp = Experiment()
+    exp.fit_umap = StubReducer(transform_seed=7)
+    vectors = exp.inverse_transform_coords(coords)
+    for coord, vector in zip(coords, vectors):
+        np.testing.assert_array_equal(vector, expected_vector(coord, 7))
+    # results don't depend on which coordinates are transformed together
+    alone = Experiment()
+    alone.fit_umap = StubReducer(transform_seed=7)
+    np.testing.assert_array_equal(alone.inverse_transform_coords(coords[3])[0],
+                                  vectors[3])
+
+    other_seed = exp.inverse_transform_coords(coords, seed=8)
+    np.testing.assert_array_equal(other_seed[0], expected_vector(coords[0], 8))
+    assert not np.array_equal(other_seed, vectors)
+
+
+def test_replaced_model(coords):
+    exp = Experiment()
+    exp.fit_umap = StubReducer()
+    exp.inverse_transform_coords(coords)
+    exp.fit_umap = StubReducer(scale=2)
+    vectors = exp.inverse_transform_coords(coords)
+    assert StubReducer.calls == 2 * len(coords)
+    np.testing.assert_array_equal(vectors[0],
+                                  expected_vector(coords[0], 42, scale=2))
+
+
+def test_disk_cache(coords, tmp_path, monkeypatch):
+    models_dir = tmp_path.joinpath('models')
+    models_dir.mkdir()
+    np.save(models_dir.joinpath('fit_UMAP.npy'), StubReducer(scale=3),
+            allow_pickle=True)
+    monkeypatch.setattr(khan_helpers.experiment, 'MODELS_DIR', models_dir)
+    cache_dir = tmp_path.joinpath('cache')
+
+    # saved model
+    vectors = Experiment(cache_dir=cache_dir).inverse_transform_coords(coords)
+    reloaded = Experiment(cache_dir=cache_dir).inverse_transform_coords(coords)
+    assert StubReducer.calls == len(coords)
+    np.testing.assert_array_equal(reloaded, vectors)
+
+    # a model that differs from the saved one isn't served its results
+    exp = Experiment(cache_dir=cache_dir)
+    exp.fit_umap = StubReducer(scale=4)
+    replaced = exp.inverse_transform_coords(coords)
+    assert StubReducer.calls == 2 * len(coords)
+    np.testing.assert_allclose(replaced, vectors / 3 * 4)
+    # ...but its own results are reused
+    exp = Experiment(cache_dir=cache_dir)
+    exp.fit_umap = StubReducer(scale=4)
+    exp.inverse_transform_coords(coords)
+    assert StubReducer.calls == 2 * len(coords)
+
@@ -0,0 +1,76 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import khan_helpers
+
+# prints the signatures each kernel has been compiled (or loaded from
+# numba's cache) for, after running the code it's appended to
+REPORT_SIGNATURES = """
+import json
+from numba.core.dispatcher import Dispatcher
+from khan_helpers import kernels, stats
+
+signatures = {}
+for module in (kernels, stats):
+    for name, obj in vars(module).items():
+        if isinstance(obj, Dispatcher):
+            signatures[f'{module.__name__}.{name}'] = sorted(
+                str(sig) for sig in obj.signatures
+            )
+print(json.dumps(signatures))
+"""
+
+WARM_UP = """
+from khan_helpers.kernels import warm_up
+warm_up()
+"""
+
+# the package's calls to each kernel, with typical arguments
+PUBLIC_CALLS = """
+import numpy as np
+from khan_helpers import functions, stats
+
+rng = np.random.default_rng(0)
+M = rng.random((5, 8))
+M_nan = M.copy()
+M_nan[0, 0] = np.nan
+
+functions.bootstrap_ci(M, n_boots=10, random_state=0)
+functions.bootstrap_ci(M_nan, n_boots=10, ignore_nan=True, chunk_size=20)
+stats.bootstrap_mean_ci(M[0], n_boots=10, random_state=[1, 2])
+functions.pearsonr_ci(M[0], M[1], n_boots=10)
+functions.pearsonr_ci(M[:2], M[2:4], n_boots=10, random_state=None)
+functions.find_correlation_peaks(M)
+functions.find_correlation_peaks(M, min_prominence=0, min_width=1,
+                                 decimals=None)
+# UMAP calls metrics on rows of float32 data
+for dtype in (np.float32, np.float64):
+    X = M.astype(dtype)
+    functions.correlation_exp(X[0], X[1])
+"""
+
+
+def kernel_signatures(code):
+    env = dict(os.environ)
+    package_root = str(Path(khan_helpers.__file__).parents[1])
+    env['PYTHONPATH'] = os.pathsep.join(
+        filter(None, (package_root, env.get('PYTHONPATH')))
+    )
+    # run in a fresh interpreter so kernels start with no signatures
+    result = subprocess.run([sys.executable, '-c', code + REPORT_SIGNATURES],
+                            env=env, capture_output=True, text=True,
+                            check=True)
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def test_warm_up_signatures():
+    warmed_up = kernel_signatures(WARM_UP)
+    # only called from other kernels, so compiled into them
+    assert warmed_up.pop('khan_helpers.stats._row_seed') == []
+    assert all(warmed_up.values())
+    public = kernel_signatures(PUBLIC_CALLS)
+    public.pop('khan_helpers.stats._row_seed')
+    assert warmed_up == public
@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+from khan_helpers.functions import rbf_sum
+from khan_helpers.knowledge_maps import KnowledgeMapper, MapGrid
+
+
+@pytest.fixture
+def question_embeddings():
+    return np.random.default_rng(0).uniform(-5, 5, (39, 2))
+
+
+@pytest.fixture
+def grid():
+    xs = np.linspace(-8, 8, 30)
+    ys = np.linspace(-7, 9, 30)
+    return np.stack(np.meshgrid(xs, ys), axis=-1)
+
+
+@pytest.fixture
+def responses():
+    rng = np.random.default_rng(1)
+    qids = np.zeros((2, 5, 13), dtype=int)
+    acc = np.zeros_like(qids, dtype=bool)
+    for ix in np.ndindex(qids.shape[:2]):
+        n = rng.integers(1, 14)
+        qids[ix][:n] = rng.choice(np.arange(1, 40), n, replace=False)
+        acc[ix][:n] = rng.random(n) < 0.6
+    # a map with no responses
+    qids[1, 4] = 0
+    return qids, acc
+
+
+def _reference_map(question_embeddings, grid, qids, acc, width, metric='euclidean'):
+    # knowledge map from the RBF sums over correct and all responses
+    vertices = grid.reshape(-1, 2)
+    answered = qids > 0
+    weights = rbf_sum(question_embeddings[qids[answered] - 1], vertices,
+                      width=width, metric=metric)
+    raw = rbf_sum(question_embeddings[qids[answered & acc] - 1], vertices,
+                  width=width, metric=metric)
+    return (raw / weights).reshape(grid.shape[:2])
+
+
+@pytest.mark.parametrize('metric', ['euclidean', 'cityblock'])
+def test_construct_maps(question_embeddings, grid, responses, metric):
+    qids, acc = responses
+    mapper = KnowledgeMapper(question_embeddings, grid, width=4, metric=metric)
+    assert mapper.grid_shape == grid.shape[:2]
+    assert mapper.n_questions == len(question_embeddings)
+    # chunk size smaller than & not dividing the number of maps
+    maps = mapper.construct_maps(qids, acc, chunk_size=3)
+    assert maps.shape == (*qids.shape[:2], *grid.shape[:2])
+    assert np.isnan(maps[1, 4]).all()
+    for ix in np.ndindex(qids.shape[:2]):
+        if ix == (1, 4):
+            continue
+        expected = _reference_map(question_embeddings, grid, qids[ix], acc[ix],
+                                  width=4, metric=metric)
+        np.testing.assert_allclose(maps[ix], expected, rtol=1e-10)
+
+
+def test_float32(question_embeddings, grid, responses):
+    qids, acc = responses
+    maps = KnowledgeMapper(question_embeddings, grid, width=4).construct_maps(qids, acc)
+    maps32 = KnowledgeMapper(question_embeddings, grid, width=4,
+                             dtype=np.float32).construct_maps(qids, acc)
+    assert maps32.dtype == np.float32
+    np.testing.assert_allclose(maps32, maps, rtol=1e-4)
+
+
+def test_map_grid(question_embeddings):
+    lecture_embedding = np.random.default_rng(2).uniform(-9, 3, (100, 2))
+    map_grid = MapGrid.from_embeddings(lecture_embedding, question_embeddings,
+                                       resolution=25)
+    coords = np.vstack((lecture_embedding, question_embeddings))
+    np.testing.assert_array_equal(map_grid.lower, coords.min(axis=0) // 1 - 3)
+    np.testing.assert_array_equal(map_grid.upper, coords.max(axis=0) // 1 + 3)
+
+    # vertex grid as previously built in the knowledge maps notebook
+    xs = np.linspace(map_grid.lower[0], map_grid.upper[0], 25, endpoint=True)
+    ys = np.linspace(map_grid.lower[1], map_grid.upper[1], 25, endpoint=True)
+    X, Y = np.meshgrid(xs, ys)
+    xy_grid = np.empty((25, 25, 2), dtype=np.float64)
+    for (x_ix, y_ix), X_val in np.ndenumerate(X):
+        xy_grid[x_ix, y_ix] = (X_val, Y[x_ix, y_ix])
+    assert map_grid.shape == (25, 25)
+    np.testing.assert_array_equal(map_grid.grid, xy_grid)
+    np.testing.assert_array_equal(map_grid.vertices, xy_grid.reshape(-1, 2))
+
+    # the grid can be passed to `KnowledgeMapper` in place of its vertices
+    np.testing.assert_array_equal(
+        KnowledgeMapper(question_embeddings, map_grid, width=4).basis,
+        KnowledgeMapper(question_embeddings, xy_grid, width=4).basis
+    )
+
+
+def test_map_grid_transforms():
+    map_grid = MapGrid(lower=[-4, -2], upper=[6, 18], resolution=50)
+    np.testing.assert_allclose(map_grid.world_to_pixel([[-4, -2], [6, 18], [1, 8]]),
+                               [[0, 0], [50, 50], [25, 25]])
+    coords = np.random.default_rng(3).uniform(-10, 20, (4, 10, 2))
+    np.testing.assert_allclose(
+        map_grid.pixel_to_world(map_grid.world_to_pixel(coords)), coords
+    )
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from khan_helpers.functions import leave_one_out_knowledge, reconstruct_trace
+
+
+@pytest.fixture
+def question_vectors():
+    return np.random.default_rng(1).random((39, 15))
+
+
+@pytest.fixture
+def all_data():
+    rng = np.random.default_rng(0)
+    # question IDs 1-15 are about forces, 16-30 about bos, 31-39 general
+    lectures = np.repeat([1, 2, 0], [15, 15, 9])
+    dfs = {}
+    for subid in ('sub1', 'sub2', 'sub3', 'sub4'):
+        rows = []
+        for quiz in range(3):
+            n = rng.integers(5, 14)
+            for qid in rng.choice(np.arange(1, 40), n, replace=False):
+                rows.append([qid, int(rng.random() < 0.6), quiz, lectures[qid - 1]])
+        dfs[subid] = pd.DataFrame(rows, columns=['qID', 'accuracy', 'quiz', 'lecture'])
+    return pd.concat(dfs)
+
+
+def _reference(all_data, question_vectors):
+    # hold out each response & estimate knowledge from the rest
+    rows = []
+    for subid, data in all_data.groupby(level=0, sort=False):
+        for quiz, quiz_data in data.groupby('quiz'):
+            for i, target in enumerate(quiz_data.itertuples()):
+                others = quiz_data.drop(quiz_data.index[i])
+                row = {'quiz': f'Quiz{quiz + 1}',
+                       'qID': f'Q{target.qID}',
+                       'participant_id': subid}
+                subsets = {'all': others}
+                if target.lecture != 0:
+                    related = others.loc[others['lecture'] != 0]
+                    subsets['same'] = related.loc[related['lecture'] == target.lecture]
+                    subsets['other'] = related.loc[related['lecture'] != target.lecture]
+                for key in ('all', 'same', 'other'):
+                    held_out = subsets.get(key)
+                    if held_out is None or len(held_out) == 0:
+                        row[f'pcorrect_{key}'] = np.nan
+                        row[f'knowledge_{key}'] = np.nan
+                        continue
+                    row[f'pcorrect_{key}'] = held_out['accuracy'].mean()
+                    row[f'knowledge_{key}'] = reconstruct_trace(
+                        question_vectors[[target.qID - 1]],
+                        question_vectors[held_out['qID'] - 1],
+                        held_out['accuracy']
+                    ).item()
+                rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def test_matches_reconstruct_trace(all_data, question_vectors):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        expected = _reference(all_data, question_vectors)
+    result = leave_one_out_knowledge(all_data, question_vectors)
+    result = result.sort_values(['participant_id', 'quiz', 'qID'], ignore_index=True)
+    expected = expected.sort_values(['participant_id', 'quiz', 'qID'], ignore_index=True)
+    pd.testing.assert_frame_equal(result[expected.columns], expected,
+                                  check_dtype=False, rtol=1e-10)
+
+
+def test_exclude_qids(all_data, question_vectors):
+    result = leave_one_out_knowledge(all_data, question_vectors)
+    excluded = leave_one_out_knowledge(all_data, question_vectors,
+                                       exclude_qids=[1, 2, 3])
+    assert not excluded['qID'].isin(['Q1', 'Q2', 'Q3']).any()
+    kept = result.loc[~result['qID'].isin(['Q1', 'Q2', 'Q3'])]
+    pd.testing.assert_frame_equal(excluded, kept.reset_index(drop=True))
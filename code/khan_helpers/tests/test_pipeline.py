@@ -0,0 +1,181 @@
+from functools import partial
+from hashlib import sha1
+
+import numba
+import numpy as np
+import pytest
+from sklearn.decomposition import LatentDirichletAllocation
+from sklearn.feature_extraction.text import CountVectorizer
+
+from khan_helpers.functions import interp_lecture
+from khan_helpers.pipeline import ModelPipeline, _update_hash
+
+WORDS = ['force', 'mass', 'newton', 'friction', 'star', 'nebula', 'fusion',
+         'gravity', 'energy', 'hydrogen', 'cloud', 'motion']
+
+
+def _texts(n, rng):
+    return [' '.join(rng.choice(WORDS, rng.integers(3, 15))) for _ in range(n)]
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    lectures = {name: (_texts(n, rng), np.sort(rng.uniform(0, 3 * n, n)))
+                for name, n in (('forces', 40), ('bos', 30))}
+    quiz_text = np.array(_texts(10 * 5, rng)).reshape(10, 5)
+    return lectures, quiz_text
+
+
+def _pipeline(data, **kwargs):
+    lectures, quiz_text = data
+    kwargs.setdefault('n_topics', 3)
+    kwargs.setdefault('embedding_n_topics', 5)
+    kwargs.setdefault('lda_params', {'random_state': 0, 'max_iter': 5})
+    return ModelPipeline(lectures, quiz_text, **kwargs)
+
+
+def _key(obj):
+    digest = sha1()
+    _update_hash(digest, obj)
+    return digest.hexdigest()
+
+
+def test_matches_direct_fit(data):
+    lectures, quiz_text = data
+    pipeline = _pipeline(data)
+    trajs = pipeline.trajectories
+
+    corpus = lectures['forces'][0] + lectures['bos'][0]
+    cv = CountVectorizer().fit(corpus)
+    lda = LatentDirichletAllocation(n_components=3, random_state=0,
+                                    max_iter=5).fit(cv.transform(corpus))
+    np.testing.assert_array_equal(pipeline.cv.transform(corpus).toarray(),
+                                  cv.transform(corpus).toarray())
+    np.testing.assert_allclose(pipeline.lda.components_, lda.components_)
+    for name, (windows, timestamps) in lectures.items():
+        expected = interp_lecture(lda.transform(cv.transform(windows)), timestamps)
+        np.testing.assert_allclose(trajs[f'{name}_lecture'], expected)
+    np.testing.assert_allclose(trajs['all_questions'],
+                               lda.transform(cv.transform(quiz_text[:, 0])))
+    assert trajs['all_answers'].shape == (len(quiz_text), 4, 3)
+    np.testing.assert_allclose(trajs['all_answers'][:, 2],
+                               lda.transform(cv.transform(quiz_text[:, 3])))
+
+
+def test_disk_cache(data, tmp_path, monkeypatch):
+    first = _pipeline(data, cache_dir=tmp_path)
+    trajs = first.trajectories
+    # a new pipeline with the same inputs loads all artifacts from disk
+    second = _pipeline(data, cache_dir=tmp_path)
+    for runner in ('_build_corpus', '_fit_cv', '_fit_lda', '_transform_trajectories'):
+        monkeypatch.setattr(ModelPipeline, runner, pytest.fail)
+    for name, traj in second.trajectories.items():
+        np.testing.assert_array_equal(traj, trajs[name])
+    np.testing.assert_array_equal(second.lda.components_, first.lda.components_)
+
+
+def test_invalidation(data):
+    lectures, quiz_text = data
+    pipeline = _pipeline(data)
+    stages = ('corpus', 'cv', 'lda', 'trajectories', 'embedding_lda')
+    keys = {name: pipeline.stage_key(name) for name in stages}
+    # keys depend on content, not object identity
+    copied = _pipeline(({name: (list(windows), np.array(timestamps))
+                        for name, (windows, timestamps) in lectures.items()},
+                       quiz_text.copy()))
+    assert {name: copied.stage_key(name) for name in stages} == keys
+
+    # new quiz text only affects the stages that transform it
+    new_quiz = quiz_text.copy()
+    new_quiz[0, 0] = 'force mass'
+    changed = _pipeline((lectures, new_quiz))
+    assert [name for name in stages if changed.stage_key(name) != keys[name]] \
+        == ['trajectories']
+
+    # hyperparameters only affect their stage & downstream stages
+    changed = _pipeline(data, n_topics=4)
+    assert [name for name in stages if changed.stage_key(name) != keys[name]] \
+        == ['lda', 'trajectories']
+    changed = _pipeline(data, cv_params={'min_df': 2})
+    assert [name for name in stages if changed.stage_key(name) != keys[name]] \
+        == ['cv', 'lda', 'trajectories', 'embedding_lda']
+
+
+def test_stale_stages(data, tmp_path):
+    # doesn't require packages used by stages that aren't run (umap)
+    pipeline = _pipeline(data, cache_dir=tmp_path)
+    assert pipeline.stale_stages() == pipeline.stage_names
+    pipeline.trajectories
+    assert pipeline.stale_stages() == ['embedding_lda', 'embedding_vectors',
+                                       'umap', 'embeddings']
+
+
+def test_hash_callables():
+    def tokenize(text):
+        return text.split()
+    key = _key(tokenize)
+
+    def tokenize(text):
+        return text.split()
+    assert _key(tokenize) == key
+
+    # editing the function's body changes its key
+    def tokenize(text):
+        return text.lower().split()
+    assert _key(tokenize) != key
+
+    def tokenize(text):
+        return text.split(' ')
+    assert _key(tokenize) != key
+
+    # partials by their function & arguments
+    assert _key(partial(tokenize, sep=' ')) == _key(partial(tokenize, sep=' '))
+    assert _key(partial(tokenize, sep=' ')) != _key(partial(tokenize, sep=','))
+    assert _key(partial(tokenize, sep=' ')) != _key(tokenize)
+
+    # callable instances by class & attributes
+    class Tokenizer:
+        def __init__(self, lower):
+            self.lower = lower
+
+        def __call__(self, text):
+            return (text.lower() if self.lower else text).split()
+
+    assert _key(Tokenizer(True)) == _key(Tokenizer(True))
+    assert _key(Tokenizer(True)) != _key(Tokenizer(False))
+
+    # numba-compiled functions are hashed by their Python source function
+    def square(x):
+        return x * x
+    assert _key(numba.njit(square)) == _key(square)
+
+
+def test_hash_values():
+    arr = np.arange(10.)
+    assert _key({'a': arr, 'b': [1, 'x']}) == _key({'a': arr.copy(), 'b': [1, 'x']})
+    assert _key(arr) != _key(arr.astype(np.float32))
+    assert _key(arr) != _key(arr.reshape(2, 5))
+    assert _key([1, 2]) != _key((1, 2))
+    # dicts are hashed independently of insertion order
+    assert _key({'random_state': 0, 'max_iter': 5}) \
+        == _key({'max_iter': 5, 'random_state': 0})
+    assert _key({'random_state': 0, 'max_iter': 5}) \
+        != _key({'random_state': 0, 'max_iter': 6})
+    assert _key(np.array(['a', None], dtype=object)) \
+        == _key(np.array(['a', None], dtype=object))
+
+
+def test_dict_order(data):
+    pipeline = _pipeline(data, lda_params={'random_state': 0, 'max_iter': 5})
+    reordered = _pipeline(data, lda_params={'max_iter': 5, 'random_state': 0})
+    assert pipeline.stage_key('trajectories') == reordered.stage_key('trajectories')
+
+
+def test_partial_params(data):
+    tokenizer = partial(str.split, sep=' ')
+    pipeline = _pipeline(data, cv_params={'tokenizer': tokenizer})
+    assert pipeline.stage_key('cv') == _pipeline(
+        data, cv_params={'tokenizer': partial(str.split, sep=' ')}
+    ).stage_key('cv')
+    assert pipeline.stage_key('cv') != _pipeline(data).stage_key('cv')
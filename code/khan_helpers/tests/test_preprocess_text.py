@@ -0,0 +1,160 @@
+import re
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import nltk
+import nltk.stem
+import pytest
+
+from khan_helpers import functions
+from khan_helpers.constants import STOP_WORDS
+from khan_helpers.functions import preprocess_text
+
+CORPUS = [
+    "Newton's first law says an object in motion stays in motion.",
+    "Stars are forming in giant clouds of hydrogen gas and dust.",
+    "The stronger force is especially important when objects are accelerating.",
+    "Gravity pulls the collapsing cloud inward, heating the protostar quickly.",
+    "Frictional forces oppose motion between surfaces that are sliding.",
+    "Nuclear fusion converts hydrogen into helium, releasing energies.",
+    "The brightest stars burned their fuel fastest and exploded strongly.",
+    "Electromagnetic forces hold atoms together; 4 forces are fundamental.",
+]
+
+
+def reference_preprocess(textlist, correction_counter=None):
+    # `preprocess_text` before lemmas were cached
+    lemmatizer = nltk.stem.WordNetLemmatizer()
+    correctable_sfxs = ('s', 'ing', 'ly', 'ed', 'er', 'est')
+    dont_lemmatize = ['stronger', 'strongest', 'strongly', 'especially']
+    tagset_mapping = defaultdict(
+        lambda: 'n',
+        {'N': 'n', 'P': 'n', 'V': 'v', 'J': 'a', 'D': 'a', 'R': 'r'}
+    )
+    chunk_delimiter = 'chunkdelimiter'
+    processed_chunks = [[] for _ in textlist]
+    full_text = f' {chunk_delimiter} '.join(textlist).lower()
+    punc_stripped = re.sub("[^a-zA-Z\\s']+", '', full_text.replace('-', ' '))
+    words_tags = nltk.pos_tag(punc_stripped.split())
+
+    chunk_ix = 0
+    for word, tag in words_tags:
+        if word == chunk_delimiter:
+            chunk_ix += 1
+            continue
+        elif "'" in word:
+            word = word.split("'")[0]
+        if word in STOP_WORDS or word[0].isdigit():
+            continue
+
+        if word not in dont_lemmatize:
+            tag = tagset_mapping[tag[0]]
+            lemma = lemmatizer.lemmatize(word, tag)
+            if (
+                    lemma == word and
+                    any(word.endswith(sfx) for sfx in correctable_sfxs) and
+                    len(word) > 4
+            ):
+                lemma = functions.synset_match(word)
+                if lemma != word and correction_counter is not None:
+                    correction_counter[(word, lemma)] += 1
+        else:
+            lemma = word
+        processed_chunks[chunk_ix].append(lemma)
+    return [' '.join(c) for c in processed_chunks]
+
+
+class StubLemmatizer:
+    # strips plural nouns' 's'; leaves other words unchanged
+    calls = 0
+
+    def lemmatize(self, word, pos='n'):
+        type(self).calls += 1
+        if pos == 'n' and word.endswith('s') and len(word) > 3:
+            return word[:-1]
+        return word
+
+
+def stub_pos_tag(words):
+    tags = []
+    for word in words:
+        if word.endswith('ly'):
+            tags.append((word, 'RB'))
+        elif word.endswith(('ing', 'ed')):
+            tags.append((word, 'VBG'))
+        else:
+            tags.append((word, 'NN'))
+    return tags
+
+
+def stub_synset_match(word):
+    return re.sub('(ing|ly|ed|er|est)$', '', word)
+
+
+def has_nltk_data():
+    for resource in ('corpora/wordnet', 'taggers/averaged_perceptron_tagger'):
+        try:
+            nltk.data.find(resource)
+        except LookupError:
+            return False
+    return True
+
+
+@pytest.fixture(params=['stub', 'wordnet'])
+def backend(request, monkeypatch):
+    if request.param == 'stub':
+        monkeypatch.setattr(nltk, 'pos_tag', stub_pos_tag)
+        monkeypatch.setattr(nltk.stem, 'WordNetLemmatizer', StubLemmatizer)
+        monkeypatch.setattr(functions, 'synset_match', stub_synset_match)
+        StubLemmatizer.calls = 0
+    elif not has_nltk_data():
+        pytest.skip("NLTK WordNet and tagger data not installed")
+    return request.param
+
+
+@pytest.mark.parametrize('n_jobs', [None, 2])
+def test_matches_reference(backend, n_jobs, tmp_path, monkeypatch):
+    # run shards on threads: forking after numba's TBB threading layer
+    # has started (e.g., by the bootstrap tests) can hang this process
+    # at exit
+    monkeypatch.setattr(functions, 'ProcessPoolExecutor', ThreadPoolExecutor)
+    expected_counter = defaultdict(int)
+    expected = reference_preprocess(CORPUS, expected_counter)
+    cache_path = tmp_path.joinpath('lemmas.p')
+    # without a persisted cache, then with a cold and a warm one
+    for lemma_cache in (None, cache_path, cache_path):
+        counter = defaultdict(int)
+        processed = preprocess_text(CORPUS, correction_counter=counter,
+                                    n_jobs=n_jobs, lemma_cache=lemma_cache)
+        assert processed == expected
+        assert counter == expected_counter
+
+
+def test_cache_scoped_to_call(monkeypatch):
+    monkeypatch.setattr(nltk, 'pos_tag', stub_pos_tag)
+    monkeypatch.setattr(nltk.stem, 'WordNetLemmatizer', StubLemmatizer)
+    StubLemmatizer.calls = 0
+    preprocess_text(['forces forces forces', 'forces stars'])
+    # each distinct word is lemmatized once per call...
+    assert StubLemmatizer.calls == 2
+    # ...and nothing is kept between calls
+    preprocess_text(['forces'])
+    assert StubLemmatizer.calls == 3
+
+
+def test_persisted_cache_rules(monkeypatch, tmp_path):
+    monkeypatch.setattr(nltk, 'pos_tag', stub_pos_tag)
+    monkeypatch.setattr(nltk.stem, 'WordNetLemmatizer', StubLemmatizer)
+    StubLemmatizer.calls = 0
+    cache_path = tmp_path.joinpath('lemmas.p')
+    preprocess_text(['forces stars'], lemma_cache=cache_path)
+    assert StubLemmatizer.calls == 2
+    preprocess_text(['forces stars'], lemma_cache=cache_path)
+    assert StubLemmatizer.calls == 2
+
+    # lemmas found under different rules are discarded
+    monkeypatch.setattr(functions, '_LEMMA_RULES',
+                        (functions._LEMMA_RULES[0] + 1,
+                         *functions._LEMMA_RULES[1:]))
+    preprocess_text(['forces stars'], lemma_cache=cache_path)
+    assert StubLemmatizer.calls == 4
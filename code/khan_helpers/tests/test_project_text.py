@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from sklearn.decomposition import LatentDirichletAllocation
+from sklearn.feature_extraction.text import CountVectorizer
+
+import khan_helpers.experiment
+from khan_helpers import Experiment
+from khan_helpers.functions import interp_lecture, parse_windows
+
+WORDS = ['force', 'mass', 'newton', 'friction', 'star', 'nebula', 'fusion',
+         'gravity', 'energy', 'hydrogen', 'cloud', 'motion']
+
+
+@pytest.fixture
+def texts():
+    rng = np.random.default_rng(0)
+    return [' '.join(rng.choice(WORDS, rng.integers(3, 15))) for _ in range(60)]
+
+
+@pytest.fixture
+def exp(texts, tmp_path, monkeypatch):
+    monkeypatch.setattr(khan_helpers.experiment, 'TRAJS_DIR', tmp_path)
+    cv = CountVectorizer().fit(texts)
+    lda = LatentDirichletAllocation(n_components=4, random_state=0,
+                                    max_iter=5).fit(cv.transform(texts))
+    exp = Experiment()
+    # use the synthetic models in place of the saved ones
+    exp.__dict__.update(fit_cv=cv, fit_lda=lda)
+    return exp
+
+
+def test_samples(exp, texts):
+    vectors = exp.project_text(texts[:10], preprocess=False)
+    np.testing.assert_allclose(vectors,
+                               exp.fit_lda.transform(exp.fit_cv.transform(texts[:10])))
+
+
+def test_transcript(exp, texts):
+    timestamps = np.cumsum(np.random.default_rng(1).uniform(1, 8, len(texts)))
+    transcript = '\n'.join(f'{int(ts // 60)}:{ts % 60:05.2f}\n{text}'
+                           for ts, text in zip(timestamps, texts))
+    windows, window_tpts = parse_windows(transcript, wsize=10)
+    expected = interp_lecture(exp.fit_lda.transform(exp.fit_cv.transform(windows)),
+                              window_tpts)
+    np.testing.assert_allclose(exp.project_text(transcript, preprocess=False, wsize=10),
+                               expected)
+
+
+def test_save(exp, texts, tmp_path):
+    first = exp.project_text(texts[:3], preprocess=False, save_as='new_questions')
+    path = tmp_path.joinpath('new_questions.npy')
+    np.testing.assert_array_equal(np.load(path), first)
+
+    second = exp.project_text(texts[3:5], preprocess=False, save_as='new_questions',
+                              append=True)
+    np.testing.assert_array_equal(np.load(path), np.vstack((first, second)))
+    with pytest.raises(FileExistsError):
+        exp.project_text(texts[5:7], preprocess=False, save_as='new_questions')
+    np.testing.assert_array_equal(np.load(path), np.vstack((first, second)))
+
+    third = exp.project_text(texts[5:7], preprocess=False, save_as='new_questions',
+                             allow_overwrite=True)
+    np.testing.assert_array_equal(np.load(path), third)
+
+
+def test_append_shape_mismatch(exp, texts, tmp_path):
+    path = tmp_path.joinpath('all_answers.npy')
+    answers = np.random.default_rng(2).random((5, 4, 4))
+    np.save(path, answers)
+    with pytest.raises(ValueError):
+        exp.project_text(texts[:2], preprocess=False, save_as='all_answers',
+                         append=True)
+    np.testing.assert_array_equal(np.load(path), answers)
+
+
+def test_save_loaded_file_warns(exp, texts, tmp_path):
+    with pytest.warns(UserWarning, match='all_questions'):
+        vectors = exp.project_text(texts[:2], preprocess=False,
+                                   save_as='all_questions')
+    np.testing.assert_array_equal(exp.question_vectors, vectors)
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from scipy.spatial.distance import cdist
+
+from khan_helpers.functions import rbf_sum
+from khan_helpers.knowledge_maps import KnowledgeMapper
+
+
+@pytest.fixture
+def coords():
+    rng = np.random.default_rng(0)
+    return rng.uniform(-5, 5, (57, 2)), rng.uniform(-8, 8, (400, 2))
+
+
+def _truncated_rbfs(obs_coords, pred_coords, width, tol):
+    rbfs = np.exp(-cdist(obs_coords, pred_coords) ** 2 / width)
+    rbfs[rbfs < tol] = 0
+    return rbfs
+
+
+def test_dense(coords):
+    obs_coords, pred_coords = coords
+    expected = np.exp(-cdist(obs_coords, pred_coords) ** 2 / 3).sum(axis=0)
+    np.testing.assert_allclose(rbf_sum(obs_coords, pred_coords, width=3), expected)
+
+
+@pytest.mark.parametrize('chunk_size', [10, 1000])
+def test_truncated(coords, chunk_size):
+    obs_coords, pred_coords = coords
+    tol = 1e-3
+    summed = rbf_sum(obs_coords, pred_coords, width=3, tol=tol,
+                     chunk_size=chunk_size)
+    expected = _truncated_rbfs(obs_coords, pred_coords, 3, tol).sum(axis=0)
+    np.testing.assert_allclose(summed, expected, rtol=1e-10)
+    # each skipped RBF contributes less than `tol`
+    dense = rbf_sum(obs_coords, pred_coords, width=3)
+    assert (dense - summed < len(obs_coords) * tol).all()
+
+    with pytest.raises(ValueError):
+        rbf_sum(obs_coords, pred_coords, width=3, metric='cityblock', tol=tol)
+
+
+def test_truncated_knowledge_maps(coords):
+    obs_coords, pred_coords = coords
+    tol = 1e-3
+    grid = pred_coords.reshape(20, 20, 2)
+    rng = np.random.default_rng(1)
+    qids = rng.integers(0, len(obs_coords) + 1, (6, 10))
+    acc = rng.random(qids.shape) < 0.5
+    maps = KnowledgeMapper(obs_coords, grid, width=3, tol=tol).construct_maps(qids, acc)
+
+    rbfs = _truncated_rbfs(obs_coords, pred_coords, 3, tol)
+    for map_, map_qids, map_acc in zip(maps, qids, acc):
+        answered = map_qids > 0
+        with np.errstate(invalid='ignore'):
+            expected = (rbfs[map_qids[answered & map_acc] - 1].sum(axis=0)
+                        / rbfs[map_qids[answered] - 1].sum(axis=0))
+        # vertices out of range of all answered questions are NaN
+        np.testing.assert_allclose(map_.ravel(), expected, rtol=1e-10)
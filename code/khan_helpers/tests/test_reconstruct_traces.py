@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from khan_helpers.functions import reconstruct_trace, reconstruct_traces
+
+
+@pytest.fixture
+def responses():
+    rng = np.random.default_rng(0)
+    lecture = rng.random((50, 15))
+    question_vectors = rng.random((30, 15))
+    n_quizzes, n_participants, n_obs = 3, 8, 12
+    qids = np.zeros((n_quizzes, n_participants, n_obs), dtype=int)
+    acc = np.zeros_like(qids, dtype=bool)
+    for quiz in range(n_quizzes):
+        for part in range(n_participants):
+            # some participants answered fewer questions (0-padded)
+            n = rng.integers(2, n_obs + 1)
+            qids[quiz, part, :n] = rng.choice(np.arange(1, 31), n, replace=False)
+            acc[quiz, part, :n] = rng.random(n) < 0.6
+    return lecture, question_vectors, qids, acc
+
+
+def test_matches_reconstruct_trace(responses):
+    lecture, question_vectors, qids, acc = responses
+    traces = reconstruct_traces(lecture, question_vectors, qids, acc)
+    assert traces.shape == (*qids.shape[:2], len(lecture))
+    assert traces.flags.c_contiguous
+    for quiz in range(qids.shape[0]):
+        for part in range(qids.shape[1]):
+            answered = qids[quiz, part] > 0
+            expected = reconstruct_trace(lecture,
+                                         question_vectors[qids[quiz, part, answered] - 1],
+                                         acc[quiz, part, answered])
+            np.testing.assert_allclose(traces[quiz, part], expected, rtol=1e-10)
+
+
+def test_all_correct_or_incorrect(responses):
+    lecture, question_vectors, qids, acc = responses
+    all_correct = reconstruct_traces(lecture, question_vectors, qids, qids > 0)
+    none_correct = reconstruct_traces(lecture, question_vectors, qids,
+                                      np.zeros_like(acc))
+    np.testing.assert_allclose(all_correct, 1)
+    np.testing.assert_allclose(none_correct, 0, atol=1e-12)
+
+
+def test_repeated_questions(responses):
+    lecture, question_vectors, _, _ = responses
+    qids = np.array([[[3, 3, 7, 12], [5, 5, 9, 0]]])
+    acc = np.array([[[True, False, True, False], [False, True, True, False]]])
+    traces = reconstruct_traces(lecture, question_vectors, qids, acc)
+    for part in range(qids.shape[1]):
+        answered = qids[0, part] > 0
+        expected = reconstruct_trace(lecture,
+                                     question_vectors[qids[0, part, answered] - 1],
+                                     acc[0, part, answered])
+        np.testing.assert_allclose(traces[0, part], expected, rtol=1e-10)
@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+from scipy.stats import pearsonr
+
+from khan_helpers import stats
+from khan_helpers.functions import pearsonr_ci
+
+
+def _resample_ixs(seed, row, n_obs, n_boots):
+    # the indices the kernels draw for each resample of a row, using
+    # numpy's (identically seeded) legacy random number generator
+    np.random.seed(int(stats._row_seed(stats._resolve_seed(seed), row)))
+    return [[np.random.randint(0, n_obs) for _ in range(n_obs)]
+            for _ in range(n_boots)]
+
+
+@pytest.fixture
+def M():
+    rng = np.random.default_rng(0)
+    M = rng.normal(size=(6, 25))
+    M[rng.random(M.shape) < 0.1] = np.nan
+    return M
+
+
+@pytest.mark.parametrize('row_offset', [0, 4])
+def test_bootstrap_means(M, row_offset):
+    boot_means = stats.bootstrap_means(M, n_boots=20, ignore_nan=True,
+                                       random_state=3, row_offset=row_offset)
+    assert boot_means.shape == (len(M), 20)
+    for row, row_means in enumerate(boot_means):
+        ixs = _resample_ixs(3, row_offset + row, M.shape[1], 20)
+        expected = [np.nanmean(M[row, ix]) for ix in ixs]
+        np.testing.assert_allclose(row_means, expected, rtol=1e-12)
+
+    # without ignoring NaNs, means of resamples containing NaNs are NaN
+    boot_means = stats.bootstrap_means(M, n_boots=20, random_state=3)
+    ixs = _resample_ixs(3, 0, M.shape[1], 20)
+    np.testing.assert_allclose(boot_means[0], [M[0, ix].mean() for ix in ixs],
+                               rtol=1e-12)
+
+
+def test_bootstrap_pearsonr():
+    rng = np.random.default_rng(1)
+    x = rng.normal(size=(4, 30))
+    # large offset to check the single-pass sums of squares
+    y = 0.5 * x + rng.normal(size=x.shape) + 1e4
+    boot_rs = stats.bootstrap_pearsonr(x, y, n_boots=20, random_state=5)
+    for row, row_rs in enumerate(boot_rs):
+        ixs = _resample_ixs(5, row, x.shape[1], 20)
+        expected = [pearsonr(x[row, ix], y[row, ix])[0] for ix in ixs]
+        np.testing.assert_allclose(row_rs, expected, rtol=1e-9)
+
+    with pytest.raises(ValueError):
+        stats.bootstrap_pearsonr(x, y[:, :-1])
+
+
+def test_percentile_ci():
+    boots = np.random.default_rng(2).normal(size=(5, 200))
+    boots[0, :10] = np.nan
+    ci_low, ci_high = stats.percentile_ci(boots[1:], ci=90)
+    np.testing.assert_allclose(ci_low, np.percentile(boots[1:], 5, axis=1))
+    np.testing.assert_allclose(ci_high, np.percentile(boots[1:], 95, axis=1))
+    ci_low, ci_high = stats.percentile_ci(boots, ignore_nan=True)
+    np.testing.assert_allclose(ci_low, np.nanpercentile(boots, 2.5, axis=1))
+    np.testing.assert_allclose(ci_high, np.nanpercentile(boots, 97.5, axis=1))
+    # 1-D input gives scalar bounds
+    ci_low, ci_high = stats.percentile_ci(boots[1])
+    assert np.ndim(ci_low) == 0 and np.ndim(ci_high) == 0
+
+
+def test_bootstrap_mean_ci(M):
+    ci_low, ci_high = stats.bootstrap_mean_ci(M, n_boots=500, ignore_nan=True)
+    boot_means = stats.bootstrap_means(M, n_boots=500, ignore_nan=True)
+    np.testing.assert_allclose(ci_low, np.percentile(boot_means, 2.5, axis=1))
+    np.testing.assert_allclose(ci_high, np.percentile(boot_means, 97.5, axis=1))
+    assert (ci_low <= np.nanmean(M, axis=1)).all()
+    assert (ci_high >= np.nanmean(M, axis=1)).all()
+    # a 1-D array is treated like the first row of a 2-D array
+    row_ci = stats.bootstrap_mean_ci(M[2], n_boots=500, ignore_nan=True,
+                                     row_offset=2)
+    assert row_ci == (ci_low[2], ci_high[2])
+
+
+def test_random_state(M):
+    kwargs = dict(n_boots=50, ignore_nan=True)
+    assert not np.array_equal(stats.bootstrap_means(M, random_state=0, **kwargs),
+                              stats.bootstrap_means(M, random_state=1, **kwargs))
+    # any seed accepted by `np.random.seed`
+    np.testing.assert_array_equal(
+        stats.bootstrap_means(M, random_state=np.int64(7), **kwargs),
+        stats.bootstrap_means(M, random_state=7, **kwargs)
+    )
+    np.testing.assert_array_equal(
+        stats.bootstrap_means(M, random_state=[1, 2, 3], **kwargs),
+        stats.bootstrap_means(M, random_state=np.array([1, 2, 3]), **kwargs)
+    )
+    # None draws a seed from numpy's global random state
+    np.random.seed(0)
+    first = stats.bootstrap_means(M, random_state=None, **kwargs)
+    np.random.seed(0)
+    np.testing.assert_array_equal(
+        stats.bootstrap_means(M, random_state=None, **kwargs), first
+    )
+
+
+def test_pearsonr_ci():
+    rng = np.random.default_rng(3)
+    x = rng.normal(size=(3, 40))
+    y = x + rng.normal(size=x.shape)
+    ci_low, ci_high = pearsonr_ci(x, y, n_boots=1000)
+    rs = [pearsonr(x_row, y_row)[0] for x_row, y_row in zip(x, y)]
+    assert ((ci_low < rs) & (rs < ci_high)).all()
+    # the first pair of a batch is resampled like a single pair
+    assert pearsonr_ci(x[0], y[0], n_boots=1000) == (ci_low[0], ci_high[0])
@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from khan_helpers.participant import Participant
+from khan_helpers.store import ParticipantStore
+
+
+def _make_participant(subid, rng, n_responses=10):
+    data = pd.DataFrame({
+        'qID': rng.integers(1, 40, n_responses),
+        'accuracy': rng.integers(0, 2, n_responses),
+        'response': rng.choice(list('ABCD'), n_responses),
+        'quiz': np.repeat([0, 1], [n_responses // 2, n_responses - n_responses // 2]),
+        'lecture': rng.integers(0, 3, n_responses)
+    })
+    p = Participant(subid=subid,
+                    data=data,
+                    raw_data={'subid': subid, 'data': list(range(5))},
+                    date_collected='2020-01-01')
+    p.store_trace(rng.random(100), 'forces_quiz0')
+    p.store_kmap(rng.random((20, 20)), 'forces_quiz0')
+    return p
+
+
+@pytest.fixture
+def participants():
+    rng = np.random.default_rng(0)
+    return [_make_participant(f'sub{i}', rng, n_responses=6 + 2 * i)
+            for i in range(4)]
+
+
+def _assert_same(p, loaded):
+    assert str(loaded) == str(p)
+    assert loaded.date_collected == p.date_collected
+    pd.testing.assert_frame_equal(loaded.data, p.data, check_dtype=False)
+    assert loaded.traces.keys() == p.traces.keys()
+    for key, trace in p.traces.items():
+        np.testing.assert_array_equal(loaded.traces[key], trace)
+    assert loaded.knowledge_maps.keys() == p.knowledge_maps.keys()
+    for key, kmap in p.knowledge_maps.items():
+        np.testing.assert_array_equal(loaded.knowledge_maps[key], kmap)
+    assert loaded.raw_data == p.raw_data
+
+
+@pytest.mark.parametrize('mmap', [False, True])
+def test_round_trip(tmp_path, participants, mmap):
+    ParticipantStore(tmp_path).write(participants)
+    store = ParticipantStore(tmp_path, mmap=mmap)
+    assert len(store) == len(participants)
+    assert store.subids == [str(p) for p in participants]
+    for p in participants:
+        assert str(p) in store
+        _assert_same(p, store.load_participant(str(p)))
+    with pytest.raises(KeyError):
+        store.load_participant('not_a_subid')
+
+
+def test_load_responses(tmp_path, participants):
+    store = ParticipantStore(tmp_path)
+    store.write(participants)
+    expected = pd.concat({str(p): p.data for p in participants})
+    pd.testing.assert_frame_equal(store.load_responses(), expected,
+                                  check_dtype=False, check_names=False)
+    pd.testing.assert_frame_equal(store.load_responses(['sub2']),
+                                  expected.loc[['sub2']],
+                                  check_dtype=False, check_names=False)
+
+
+def test_update(tmp_path, participants):
+    store = ParticipantStore(tmp_path)
+    store.write(participants[:2])
+    # only new participants & trace keys are added without overwriting
+    new_p = _make_participant('sub0', np.random.default_rng(1))
+    new_p.store_trace(np.ones(50), 'bos_quiz1')
+    with pytest.warns(UserWarning, match='sub0'):
+        store.write([new_p, *participants[2:]])
+    _assert_same(participants[0], store.load_participant('sub0'))
+
+    store.write([new_p], allow_overwrite=True)
+    assert store.subids == [str(p) for p in participants]
+    _assert_same(new_p, store.load_participant('sub0'))
+    for p in participants[1:]:
+        _assert_same(p, store.load_participant(str(p)))
+    # participants without a stored trace don't get one
+    assert 'bos_quiz1' not in store.load_participant('sub1').traces
+
+
+def test_interrupted_update(tmp_path, participants, monkeypatch):
+    store = ParticipantStore(tmp_path)
+    store.write(participants[:3])
+    new_p = _make_participant('sub0', np.random.default_rng(1), n_responses=30)
+
+    # fail partway through writing the updated arrays
+    n_saved = []
+
+    def failing_save(gen_dir, relpath, arr):
+        if len(n_saved) == 3:
+            raise KeyboardInterrupt
+        n_saved.append(relpath)
+        path = gen_dir.joinpath(f'{relpath}.npy')
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.save(path, arr)
+
+    monkeypatch.setattr(ParticipantStore, '_save', staticmethod(failing_save))
+    with pytest.raises(KeyboardInterrupt):
+        store.write([new_p, participants[3]], allow_overwrite=True)
+    monkeypatch.undo()
+
+    # the store still holds the previous data
+    store = ParticipantStore(tmp_path)
+    assert store.subids == ['sub0', 'sub1', 'sub2']
+    for p in participants[:3]:
+        _assert_same(p, store.load_participant(str(p)))
+
+    store.write([new_p, participants[3]], allow_overwrite=True)
+    _assert_same(new_p, store.load_participant('sub0'))
+    _assert_same(participants[3], store.load_participant('sub3'))
+    # superseded files are removed
+    assert len(list(tmp_path.glob('gen-*'))) == 1
+    assert len(list(tmp_path.glob('raw/*.p'))) == 4
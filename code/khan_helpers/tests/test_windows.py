@@ -0,0 +1,93 @@
+from datetime import timedelta
+
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import CountVectorizer
+
+from khan_helpers.functions import iter_windows, parse_windows, window_term_matrix
+
+
+def _ts_to_sec(ts):
+    mins, secs = ts.split(':')
+    return timedelta(minutes=int(mins), seconds=float(secs)).total_seconds()
+
+
+def _reference_windows(transcript, wsize):
+    # the original (list-building) implementation of `parse_windows`
+    lines = transcript.splitlines()
+    text_lines = lines[1::2]
+    ts_lines = list(map(_ts_to_sec, lines[::2]))
+    ts_lines = [ts - ts_lines[0] for ts in ts_lines]
+
+    windows = []
+    timestamps = []
+    for ix in range(1, wsize):
+        start, end = 0, ix
+        windows.append(' '.join(text_lines[start:end]))
+        timestamps.append((ts_lines[start] + ts_lines[end - 1]) / 2)
+
+    for ix in range(len(ts_lines)):
+        start = ix
+        end = ix + wsize if ix + wsize <= len(text_lines) else len(text_lines)
+        windows.append(' '.join(text_lines[start:end]))
+        timestamps.append((ts_lines[start] + ts_lines[end - 1]) / 2)
+
+    return windows, timestamps
+
+
+def _make_transcript(n_lines, trailing_timestamp=False, seed=0):
+    rng = np.random.default_rng(seed)
+    words = ['force', 'mass', 'bond', 'atom', 'star', 'energy', 'the', 'a']
+    secs = np.cumsum(rng.uniform(0.5, 6, n_lines + trailing_timestamp)) + 3.25
+    lines = []
+    for i, sec in enumerate(secs):
+        lines.append(f'{int(sec // 60)}:{sec % 60:05.2f}')
+        if i < n_lines:
+            lines.append(' '.join(rng.choice(words, rng.integers(1, 12))))
+    return '\n'.join(lines)
+
+
+@pytest.mark.parametrize('n_lines', [50, 51, 200])
+@pytest.mark.parametrize('wsize', [1, 10, 50])
+@pytest.mark.parametrize('trailing_timestamp', [False, True])
+def test_matches_reference(n_lines, wsize, trailing_timestamp):
+    transcript = _make_transcript(n_lines, trailing_timestamp)
+    windows, timestamps = _reference_windows(transcript, wsize)
+
+    result = list(iter_windows(transcript, wsize=wsize))
+    assert [w for w, _ in result] == windows
+    np.testing.assert_allclose([t for _, t in result], timestamps, rtol=1e-12)
+
+    result = parse_windows(transcript, wsize=wsize)
+    assert result[0] == windows
+    np.testing.assert_allclose(result[1], timestamps, rtol=1e-12)
+
+
+def test_generator():
+    transcript = _make_transcript(100)
+    windows = iter_windows(transcript, wsize=20)
+    assert iter(windows) is windows
+    first_window, first_timestamp = next(windows)
+    all_windows, all_timestamps = parse_windows(transcript, wsize=20)
+    assert (first_window, first_timestamp) == (all_windows[0], all_timestamps[0])
+
+
+@pytest.mark.parametrize('cv_kwargs', [
+    {},
+    {'binary': True},
+    {'stop_words': ['the', 'a']},
+    {'ngram_range': (1, 2)},
+    {'analyzer': 'char_wb', 'ngram_range': (2, 3)}
+])
+@pytest.mark.parametrize('wsize', [1, 10, 50])
+def test_window_term_matrix(cv_kwargs, wsize):
+    cv = CountVectorizer(**cv_kwargs).fit([_make_transcript(80, seed=1)])
+    transcript = _make_transcript(120, trailing_timestamp=True)
+    windows, timestamps = parse_windows(transcript, wsize=wsize)
+
+    dtm, dtm_timestamps = window_term_matrix(transcript, cv, wsize=wsize)
+    expected = cv.transform(windows)
+    assert dtm.shape == expected.shape
+    assert dtm.dtype == expected.dtype
+    assert (dtm != expected).nnz == 0
+    np.testing.assert_allclose(dtm_timestamps, timestamps, rtol=1e-12)
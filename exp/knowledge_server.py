@@ -0,0 +1,377 @@
+"""
+Local HTTP service that estimates learners' knowledge from their quiz
+responses as they answer questions. Runs separately from the psiTurk
+experiment server (see `custom.py`). It keeps the lecture trajectories,
+question topic vectors, knowledge-map basis, and fit text models in
+memory, so requests don't pay to load them.
+
+Concurrent requests are micro-batched: requests that arrive within
+`--max-wait-ms` of each other (up to `--max-batch-size`) are estimated
+with a single vectorized call to
+`khan_helpers.functions.reconstruct_traces` and
+`khan_helpers.knowledge_maps.KnowledgeMapper.construct_maps`.
+
+Endpoints
+---------
+GET /health
+    `{"status": "ok"}` once the models are loaded.
+GET /info
+    Lecture lengths (in seconds), the number of questions, and the
+    bounds and resolution of the knowledge-map grid.
+POST /estimate
+    Body: `{"lecture": "forces" | "bos", "qID": [int, ...],
+    "accuracy": [0 | 1, ...], "timepoints": [float, ...] (optional),
+    "knowledge_map": bool (optional)}`. Returns `{"trace": [...]}`, the
+    estimated knowledge at each second of the lecture (or at each of
+    `timepoints`, interpolated), plus `"knowledge_map"`, an (H, W)
+    nested list, if requested. Undefined estimates (e.g., from no
+    responses) are `null`.
+POST /project
+    Body: `{"texts": [str, ...], "preprocess": bool (optional)}`.
+    Returns `{"topic_vectors": [[...], ...]}` (see
+    `khan_helpers.Experiment.project_text`).
+
+Usage:
+    python knowledge_server.py [--host HOST] [--port PORT]
+                               [--max-batch-size N] [--max-wait-ms MS]
+"""
+import argparse
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from khan_helpers import Experiment
+from khan_helpers.functions import reconstruct_traces
+from khan_helpers.knowledge_maps import KnowledgeMapper, MapGrid
+
+
+LECTURES = ('forces', 'bos')
+# knowledge map parameters used in notebook 7
+GRID_RESOLUTION = 100
+RBF_WIDTH = 50
+
+
+def _json_values(arr):
+    # converts an array to (nested) lists, with NaNs as None
+    arr = np.asarray(arr, dtype=np.float64)
+    nans = np.isnan(arr)
+    if not nans.any():
+        return arr.tolist()
+    arr = arr.astype(object)
+    arr[nans] = None
+    return arr.tolist()
+
+
+def _pad_responses(requests):
+    # (n_requests, n_observations) question ID & accuracy arrays, padded
+    # with 0s
+    n_obs = max(1, max(len(req['qID']) for req in requests))
+    qids = np.zeros((len(requests), n_obs), dtype=int)
+    acc = np.zeros((len(requests), n_obs), dtype=bool)
+    for row, req in enumerate(requests):
+        qids[row, :len(req['qID'])] = req['qID']
+        acc[row, :len(req['accuracy'])] = req['accuracy']
+    return qids, acc
+
+
+class KnowledgeEstimator:
+    """
+    Holds the data and models used to estimate knowledge in memory and
+    computes estimates for batches of requests.
+    """
+    def __init__(self, exp=None):
+        """
+        Parameters
+        ----------
+        exp : khan_helpers.Experiment, optional
+            The `Experiment` from which to load data and models. If None
+            (default), a new one is created.
+        """
+        exp = Experiment() if exp is None else exp
+        self.exp = exp
+        self.trajectories = {lecture: np.asarray(exp.get_lecture_traj(lecture))
+                             for lecture in LECTURES}
+        self.question_vectors = np.asarray(exp.question_vectors)
+        self.map_grid = MapGrid.from_embeddings(exp.forces_embedding,
+                                                exp.bos_embedding,
+                                                exp.question_embeddings,
+                                                resolution=GRID_RESOLUTION)
+        self.mapper = KnowledgeMapper(exp.question_embeddings,
+                                      self.map_grid,
+                                      width=RBF_WIDTH)
+        # load text models, import dependencies, and compile kernels now
+        # rather than during the first requests
+        self.project([{'texts': ['warm up'], 'preprocess': False}])
+        self.estimate([{'lecture': lecture,
+                        'qID': [1],
+                        'accuracy': [True],
+                        'timepoints': None,
+                        'knowledge_map': True} for lecture in LECTURES])
+
+    @property
+    def info(self):
+        return {
+            'lecture_lengths': {lecture: len(traj)
+                                for lecture, traj in self.trajectories.items()},
+            'n_questions': len(self.question_vectors),
+            'map_grid': {'lower': self.map_grid.lower.tolist(),
+                         'upper': self.map_grid.upper.tolist(),
+                         'resolution': self.map_grid.resolution}
+        }
+
+    def estimate(self, requests):
+        """Computes knowledge estimates for a batch of validated requests."""
+        results = [{} for _ in requests]
+        for lecture, traj in self.trajectories.items():
+            rows = [i for i, req in enumerate(requests) if req['lecture'] == lecture]
+            if not rows:
+                continue
+            qids, acc = _pad_responses([requests[i] for i in rows])
+            with np.errstate(invalid='ignore'):
+                traces = reconstruct_traces(traj,
+                                            self.question_vectors,
+                                            qids[None],
+                                            acc[None])[0]
+            for i, trace in zip(rows, traces):
+                timepoints = requests[i]['timepoints']
+                if timepoints is not None:
+                    trace = np.interp(timepoints, np.arange(len(trace)), trace)
+                results[i]['trace'] = _json_values(trace)
+
+        rows = [i for i, req in enumerate(requests) if req['knowledge_map']]
+        if rows:
+            qids, acc = _pad_responses([requests[i] for i in rows])
+            with np.errstate(invalid='ignore'):
+                kmaps = self.mapper.construct_maps(qids, acc)
+            for i, kmap in zip(rows, kmaps):
+                results[i]['knowledge_map'] = _json_values(kmap)
+        return results
+
+    def project(self, requests):
+        """Computes topic vectors for a batch of validated requests."""
+        results = [{'topic_vectors': []} for _ in requests]
+        for preprocess in (False, True):
+            rows = [i for i, req in enumerate(requests)
+                    if req['preprocess'] == preprocess]
+            texts = [text for i in rows for text in requests[i]['texts']]
+            if not texts:
+                continue
+            vectors = self.exp.project_text(texts, preprocess=preprocess)
+            splits = np.cumsum([len(requests[i]['texts']) for i in rows])[:-1]
+            for i, vecs in zip(rows, np.split(vectors, splits)):
+                results[i] = {'topic_vectors': vecs.tolist()}
+        return results
+
+    def validate_estimate(self, body):
+        """
+        Checks and normalizes the body of an /estimate request. Raises
+        a `ValueError` describing the problem for invalid requests.
+        """
+        lecture = body.get('lecture')
+        if lecture not in self.trajectories:
+            raise ValueError(f"lecture must be one of {list(self.trajectories)}")
+        qids = body.get('qID', [])
+        accuracy = body.get('accuracy', [])
+        if len(qids) != len(accuracy):
+            raise ValueError("qID and accuracy must have the same length")
+        n_questions = len(self.question_vectors)
+        # (JSON true/false are parsed as bools, a subclass of int)
+        if not all(isinstance(q, int) and not isinstance(q, bool)
+                   and 1 <= q <= n_questions for q in qids):
+            raise ValueError(f"qIDs must be integers from 1 to {n_questions}")
+        timepoints = body.get('timepoints')
+        if timepoints is not None:
+            timepoints = np.asarray(timepoints, dtype=np.float64)
+            if timepoints.ndim != 1:
+                raise ValueError("timepoints must be a list of numbers")
+        return {'lecture': lecture,
+                'qID': qids,
+                'accuracy': [bool(a) for a in accuracy],
+                'timepoints': timepoints,
+                'knowledge_map': bool(body.get('knowledge_map', False))}
+
+    def validate_project(self, body):
+        """Checks and normalizes the body of a /project request."""
+        texts = body.get('texts')
+        if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+            raise ValueError("texts must be a list of strings")
+        return {'texts': texts, 'preprocess': bool(body.get('preprocess', True))}
+
+
+class MicroBatcher:
+    """
+    Collects items submitted from concurrent request handler threads
+    into batches and processes each batch with a single call in a
+    background thread. If processing a batch raises an exception, its
+    items are processed individually so that only the items that cause
+    the exception fail.
+    """
+    def __init__(self, func, max_batch_size=64, max_wait=0.002):
+        """
+        Parameters
+        ----------
+        func : callable
+            Takes a list of items and returns a list of results in the
+            same order.
+        max_batch_size : int, optional
+            The maximum number of items to process at once (default:
+            64).
+        max_wait : float, optional
+            The maximum time (in seconds) to wait for more items after
+            the first item of a batch arrives (default: 0.002).
+        """
+        self.func = func
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.n_batches = 0
+        self.n_items = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        """Queues an item and returns a `Future` for its result."""
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(
+                        self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                    )
+                except queue.Empty:
+                    break
+            self.n_batches += 1
+            self.n_items += len(batch)
+            self._process(batch)
+
+    def _process(self, batch):
+        items, futures = zip(*batch)
+        try:
+            results = self.func(list(items))
+        except Exception as e:
+            if len(batch) == 1:
+                futures[0].set_exception(e)
+                return
+            # process items individually so only the item(s) that caused
+            # the error fail
+            for item_future in batch:
+                self._process([item_future])
+        else:
+            for future, result in zip(futures, results):
+                future.set_result(result)
+
+
+class KnowledgeRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # headers and body are sent in separate writes, which would
+    # otherwise stall on delayed ACKs on persistent connections
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, {'status': 'ok'})
+        elif self.path == '/info':
+            info = dict(self.server.estimator.info,
+                        batches={name: {'n_batches': b.n_batches, 'n_items': b.n_items}
+                                 for name, b in self.server.batchers.items()})
+            self._send_json(200, info)
+        else:
+            self._send_json(404, {'error': f"no such endpoint: {self.path}"})
+
+    def do_POST(self):
+        endpoint = self.path.lstrip('/')
+        if endpoint not in self.server.batchers:
+            self._send_json(404, {'error': f"no such endpoint: {self.path}"})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length))
+            if not isinstance(body, dict):
+                raise ValueError("request body must be a JSON object")
+            validate = getattr(self.server.estimator, f'validate_{endpoint}')
+            item = validate(body)
+        except (ValueError, TypeError) as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        try:
+            result = self.server.batchers[endpoint].submit(item).result()
+        except Exception as e:
+            self._send_json(500, {'error': f"{type(e).__name__}: {e}"})
+            return
+        self._send_json(200, result)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, obj):
+        payload = json.dumps(obj).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class KnowledgeServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # allow many learners to connect at once
+    request_queue_size = 128
+
+    def __init__(
+            self,
+            address,
+            estimator=None,
+            max_batch_size=64,
+            max_wait=0.002,
+            verbose=False
+    ):
+        self.estimator = KnowledgeEstimator() if estimator is None else estimator
+        self.batchers = {
+            'estimate': MicroBatcher(self.estimator.estimate,
+                                     max_batch_size=max_batch_size,
+                                     max_wait=max_wait),
+            'project': MicroBatcher(self.estimator.project,
+                                    max_batch_size=max_batch_size,
+                                    max_wait=max_wait)
+        }
+        self.verbose = verbose
+        super().__init__(address, KnowledgeRequestHandler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=22364)
+    parser.add_argument('--max-batch-size', type=int, default=64)
+    parser.add_argument('--max-wait-ms', type=float, default=2)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    server = KnowledgeServer((args.host, args.port),
+                             max_batch_size=args.max_batch_size,
+                             max_wait=args.max_wait_ms / 1000,
+                             verbose=args.verbose)
+    print(f"Serving knowledge estimates on http://{args.host}:{args.port}",
+          flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Load test for the knowledge-estimation server (`knowledge_server.py`).
+
+Starts a local server instance for each configuration, sends it
+randomly generated response batches from many concurrent clients over
+persistent connections, and reports throughput and latency percentiles.
+By default, compares micro-batching against processing each request
+individually (`--max-batch-size 1`).
+
+Usage:
+    python knowledge_server_load.py [--clients N] [--requests N]
+                                    [--knowledge-maps]
+"""
+import argparse
+import http.client
+import json
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+
+SERVER_PATH = Path(__file__).resolve().with_name('knowledge_server.py')
+N_QUESTIONS = 39
+
+
+def start_server(port, max_batch_size):
+    proc = subprocess.Popen([sys.executable, str(SERVER_PATH),
+                             '--port', str(port),
+                             '--max-batch-size', str(max_batch_size)],
+                            stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("server didn't start")
+
+
+def make_requests(n_requests, knowledge_maps, seed=0):
+    rng = np.random.default_rng(seed)
+    bodies = []
+    for _ in range(n_requests):
+        n_obs = rng.integers(1, 14)
+        bodies.append(json.dumps({
+            'lecture': str(rng.choice(['forces', 'bos'])),
+            'qID': rng.choice(np.arange(1, N_QUESTIONS + 1), n_obs, replace=False).tolist(),
+            'accuracy': rng.integers(0, 2, n_obs).tolist(),
+            'timepoints': np.sort(rng.uniform(0, 470, 10)).tolist(),
+            'knowledge_map': knowledge_maps
+        }))
+    return bodies
+
+
+def run_client(port, bodies):
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    latencies = []
+    for body in bodies:
+        start = time.perf_counter()
+        conn.request('POST', '/estimate', body=body,
+                     headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        response.read()
+        if response.status != 200:
+            raise RuntimeError(f"request failed with status {response.status}")
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+    return latencies
+
+
+def load_test(port, bodies, n_clients):
+    per_client = [bodies[i::n_clients] for i in range(n_clients)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(n_clients) as executor:
+        latencies = np.concatenate(list(executor.map(run_client,
+                                                     [port] * n_clients,
+                                                     per_client)))
+    elapsed = time.perf_counter() - start
+    return len(bodies) / elapsed, np.percentile(latencies, [50, 95, 99]) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--knowledge-maps', action='store_true',
+                        help="also request a knowledge map with each estimate")
+    parser.add_argument('--port', type=int, default=22365)
+    args = parser.parse_args()
+
+    bodies = make_requests(args.requests, args.knowledge_maps)
+    for label, max_batch_size in (('micro-batched', 64), ('unbatched', 1)):
+        proc = start_server(args.port, max_batch_size)
+        try:
+            # warm up connections & server threads
+            load_test(args.port, bodies[:args.clients], args.clients)
+            throughput, (p50, p95, p99) = load_test(args.port, bodies, args.clients)
+        finally:
+            proc.terminate()
+            proc.wait()
+        print(f"{label:>13}: {throughput:8.1f} requests/s, latency "
+              f"p50 {p50:.1f} ms, p95 {p95:.1f} ms, p99 {p99:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+import http.client
+import json
+import threading
+
+import numpy as np
+import pytest
+
+from khan_helpers.functions import reconstruct_trace
+from knowledge_server import (
+    KnowledgeEstimator,
+    KnowledgeRequestHandler,
+    KnowledgeServer,
+    MicroBatcher
+)
+
+N_QUESTIONS = 39
+
+
+class StubExperiment:
+    # the data & models `KnowledgeEstimator` uses, at a smaller scale
+    def __init__(self):
+        rng = np.random.default_rng(0)
+        self.trajs = {'forces': rng.random((60, 15)), 'bos': rng.random((50, 15))}
+        self.question_vectors = rng.random((N_QUESTIONS, 15))
+        self.forces_embedding = rng.uniform(-5, 5, (60, 2))
+        self.bos_embedding = rng.uniform(-5, 5, (50, 2))
+        self.question_embeddings = rng.uniform(-5, 5, (N_QUESTIONS, 2))
+
+    def get_lecture_traj(self, lecture):
+        return self.trajs[lecture]
+
+    def project_text(self, texts, preprocess=True):
+        if any(text == 'fail' for text in texts):
+            raise RuntimeError("can't project text")
+        return np.array([[len(text), preprocess] for text in texts], dtype=float)
+
+
+@pytest.fixture(scope='module')
+def estimator():
+    return KnowledgeEstimator(StubExperiment())
+
+
+def _request(lecture='forces', qids=(1, 2, 20), accuracy=(1, 0, 1), **kwargs):
+    return dict(lecture=lecture, qID=list(qids), accuracy=list(accuracy), **kwargs)
+
+
+def test_estimate(estimator):
+    exp = estimator.exp
+    rng = np.random.default_rng(1)
+    requests = []
+    for _ in range(8):
+        n = rng.integers(1, 10)
+        requests.append(estimator.validate_estimate(_request(
+            lecture=rng.choice(['forces', 'bos']),
+            qids=rng.choice(np.arange(1, N_QUESTIONS + 1), n, replace=False).tolist(),
+            accuracy=rng.integers(0, 2, n).tolist(),
+            knowledge_map=bool(rng.integers(0, 2))
+        )))
+    results = estimator.estimate(requests)
+    for req, result in zip(requests, results):
+        with np.errstate(invalid='ignore'):
+            expected = reconstruct_trace(exp.trajs[req['lecture']],
+                                         exp.question_vectors[np.array(req['qID']) - 1],
+                                         req['accuracy'])
+        np.testing.assert_allclose(np.array(result['trace'], dtype=float), expected,
+                                   rtol=1e-10)
+        # batching doesn't change results
+        single = estimator.estimate([req])[0]
+        assert single.keys() == result.keys()
+        assert ('knowledge_map' in result) == req['knowledge_map']
+        for key, values in single.items():
+            np.testing.assert_allclose(np.array(result[key], dtype=float),
+                                       np.array(values, dtype=float), rtol=1e-10)
+
+
+@pytest.mark.parametrize('body', [
+    _request(lecture='calculus'),
+    _request(qids=(1, 2), accuracy=(1,)),
+    _request(qids=(0, 2, 3)),
+    _request(qids=(1, 2, N_QUESTIONS + 1)),
+    _request(qids=(1.0, 2, 3)),
+    _request(qids=(True, 2, 3)),
+    _request(timepoints=[[1, 2]])
+])
+def test_validate_estimate(estimator, body):
+    with pytest.raises(ValueError):
+        estimator.validate_estimate(body)
+
+
+def test_micro_batcher():
+    batches = []
+    started = threading.Event()
+
+    def func(items):
+        started.wait()
+        batches.append(items)
+        if 'bad' in items:
+            raise ValueError("bad item")
+        return [item.upper() for item in items]
+
+    batcher = MicroBatcher(func, max_batch_size=4, max_wait=1)
+    futures = [batcher.submit(item) for item in ['a', 'b', 'bad', 'c', 'd']]
+    started.set()
+    assert [f.result() for f in futures if f.exception() is None] == ['A', 'B', 'C', 'D']
+    assert isinstance(futures[2].exception(), ValueError)
+    # first batch fails, then its items are processed individually
+    assert batches == [['a', 'b', 'bad', 'c'], ['a'], ['b'], ['bad'], ['c'], ['d']]
+    assert batcher.n_batches == 2 and batcher.n_items == 5
+
+
+@pytest.fixture(scope='module')
+def server(estimator):
+    server = KnowledgeServer(('127.0.0.1', 0), estimator=estimator, max_wait=0.001)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _post(conn, endpoint, body):
+    conn.request('POST', endpoint, body=json.dumps(body),
+                 headers={'Content-Type': 'application/json'})
+    response = conn.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def test_server(server, estimator):
+    assert KnowledgeRequestHandler.disable_nagle_algorithm
+    conn = http.client.HTTPConnection(*server.server_address)
+    conn.request('GET', '/health')
+    response = conn.getresponse()
+    assert (response.status, json.loads(response.read())) == (200, {'status': 'ok'})
+
+    # requests share a persistent connection
+    status, result = _post(conn, '/estimate', _request(timepoints=[0, 10.5]))
+    assert status == 200
+    expected = estimator.estimate([estimator.validate_estimate(_request())])[0]
+    np.testing.assert_allclose(result['trace'],
+                               np.interp([0, 10.5], np.arange(60), expected['trace']))
+    assert _post(conn, '/estimate', _request(qids=(True, 2, 3)))[0] == 400
+    assert _post(conn, '/estimate', [1, 2])[0] == 400
+    assert _post(conn, '/project', {'texts': ['abc'], 'preprocess': False}) \
+        == (200, {'topic_vectors': [[3.0, 0.0]]})
+    assert _post(conn, '/project', {'texts': ['fail']})[0] == 500
+    assert _post(conn, '/nothing', {})[0] == 404
+    conn.close()